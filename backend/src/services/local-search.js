@@ -1,7 +1,8 @@
 import { marked } from 'marked';
+import { createHash } from 'node:crypto';
 import fs from 'node:fs';
 import path from 'node:path';
-import { processText } from '../utils/nlp.js';
+import { processText, extractMaritimeTerms } from '../utils/nlp.js';
 
 // Simple vocabulary used for deterministic embeddings. In production,
 // vectors are generated using bge-base or text-embedding-3-small and
@@ -18,14 +19,21 @@ const EMBEDDING_VOCAB = [
     'passenger'
 ];
 
+// Written by `python data-local/keyword_index.py build`
+const PREBUILT_INDEX_FORMAT = 'arrowreg-keyword-index-v1';
+
 class LocalSearchService {
-    constructor() {
+    constructor(options = {}) {
         this.searchIndex = new Map(); // word -> Map(sectionId -> { tf, documentId, title, sectionNumber })
         this.documents = new Map();
         this.sectionWordCounts = new Map();
         this.totalSections = 0;
         this.initialized = false;
         this.embeddingIndex = new Map(); // sectionId -> { vector, documentId }
+        this.usePrebuiltIndex = options.usePrebuiltIndex ?? true;
+        this.prebuiltPostings = null; // term -> [ordinal, tf, ...] not yet materialized
+        this.prebuiltSections = null; // ordinal -> section
+        this.indexSource = null;
     }
 
     async initialize() {
@@ -34,9 +42,20 @@ class LocalSearchService {
         const documentsPath = path.join(process.cwd(), '..', 'data-local');
         
         try {
-            await this.loadDocument(path.join(documentsPath, 'ABS-Part-7-Structured.md'), 'abs_part7');
-            await this.loadDocument(path.join(documentsPath, 'ECFR-title33.md'), 'cfr33');
-            await this.loadDocument(path.join(documentsPath, 'ECFR-title46.md'), 'cfr46');
+            await this.loadDocument(path.join(documentsPath, 'ABS-Part-7-Structured.md'), 'abs_part7', { index: false });
+            await this.loadDocument(path.join(documentsPath, 'ECFR-title33.md'), 'cfr33', { index: false });
+            await this.loadDocument(path.join(documentsPath, 'ECFR-title46.md'), 'cfr46', { index: false });
+
+            // Use the prebuilt keyword index when it matches these documents, else tokenize them now
+            const prebuiltPath = path.join(documentsPath, 'index', 'keyword-index.json');
+            if (await this.loadPrebuiltIndex(prebuiltPath)) {
+                this.indexSource = 'prebuilt';
+            } else {
+                for (const document of this.documents.values()) {
+                    this.indexDocument(document.id, document.sections);
+                }
+                this.indexSource = 'runtime';
+            }
 
             // Load precomputed embedding vectors
             await this.loadEmbeddings(path.join(documentsPath, 'embeddings', 'abs_part7.json'));
@@ -51,7 +70,7 @@ class LocalSearchService {
         }
     }
 
-    async loadDocument(filePath, documentId) {
+    async loadDocument(filePath, documentId, { index = true } = {}) {
         try {
             const content = await fs.promises.readFile(filePath, 'utf8');
             const sections = this.parseMarkdownSections(content, documentId);
@@ -64,12 +83,86 @@ class LocalSearchService {
             });
 
             // Build search index for this document
-            this.indexDocument(documentId, sections);
+            if (index) {
+                this.indexDocument(documentId, sections);
+            }
         } catch (error) {
             console.error(`Failed to load document ${documentId}:`, error);
         }
     }
 
+    async loadPrebuiltIndex(filePath) {
+        if (!this.usePrebuiltIndex) return false;
+
+        let index;
+        try {
+            index = JSON.parse(await fs.promises.readFile(filePath, 'utf8'));
+        } catch (error) {
+            if (error.code !== 'ENOENT') {
+                console.warn(`Ignoring prebuilt keyword index: ${error.message}`);
+            }
+            return false;
+        }
+        if (index.format !== PREBUILT_INDEX_FORMAT) {
+            console.warn(`Ignoring prebuilt keyword index with format ${index.format}`);
+            return false;
+        }
+
+        // The index must have been built from exactly the Markdown loaded here
+        const builtFrom = Object.keys(index.documents);
+        if (builtFrom.length !== this.documents.size) return false;
+        for (const [documentId, document] of this.documents) {
+            const hash = createHash('sha256').update(document.fullContent, 'utf8').digest('hex');
+            if (index.documents[documentId] !== hash) {
+                console.log(`Prebuilt keyword index is stale for ${documentId}; indexing at startup`);
+                return false;
+            }
+        }
+
+        const sectionsById = new Map();
+        for (const document of this.documents.values()) {
+            for (const section of document.sections) {
+                sectionsById.set(section.id, section);
+            }
+        }
+        const sections = index.sections.map(sectionId => sectionsById.get(sectionId));
+        if (sections.some(section => !section) || sections.length !== sectionsById.size) return false;
+
+        sections.forEach((section, ordinal) => {
+            this.sectionWordCounts.set(section.id, index.section_lengths[ordinal]);
+        });
+        this.totalSections += sections.length;
+        this.prebuiltSections = sections;
+        this.prebuiltPostings = new Map(index.terms.map((term, i) => [term, index.postings[i]]));
+        return true;
+    }
+
+    // Postings for a term, materializing prebuilt postings on first use
+    getPostings(term, create = false) {
+        let postings = this.searchIndex.get(term);
+        if (!postings && this.prebuiltPostings?.has(term)) {
+            const flat = this.prebuiltPostings.get(term);
+            postings = new Map();
+            for (let i = 0; i < flat.length; i += 2) {
+                const section = this.prebuiltSections[flat[i]];
+                postings.set(section.id, {
+                    documentId: section.documentId,
+                    sectionId: section.id,
+                    title: section.title,
+                    sectionNumber: section.sectionNumber,
+                    tf: flat[i + 1]
+                });
+            }
+            this.prebuiltPostings.delete(term);
+            this.searchIndex.set(term, postings);
+        }
+        if (!postings && create) {
+            postings = new Map();
+            this.searchIndex.set(term, postings);
+        }
+        return postings;
+    }
+
     async loadEmbeddings(filePath) {
         try {
             const data = await fs.promises.readFile(filePath, 'utf8');
@@ -174,10 +267,7 @@ class LocalSearchService {
                 counts.set(token, (counts.get(token) || 0) + 1);
             }
             for (const [word, count] of counts) {
-                if (!this.searchIndex.has(word)) {
-                    this.searchIndex.set(word, new Map());
-                }
-                this.searchIndex.get(word).set(section.id, {
+                this.getPostings(word, true).set(section.id, {
                     documentId: documentId,
                     sectionId: section.id,
                     title: section.title,
@@ -190,26 +280,7 @@ class LocalSearchService {
     }
 
     extractMaritimeTerms(text) {
-        const maritimePatterns = [
-            /\b(fire\s+detection|life\s+saving|oil\s+discharge|manning\s+requirements)\b/gi,
-            /\b(osv|offshore\s+supply\s+vessel|supply\s+vessel)\b/gi,
-            /\b(cfr|code\s+of\s+federal\s+regulations)\b/gi,
-            /\b(abs|american\s+bureau\s+of\s+shipping)\b/gi,
-            /\b(solas|safety\s+of\s+life\s+at\s+sea)\b/gi,
-            /\b(nvic|navigation\s+and\s+vessel\s+inspection\s+circular)\b/gi,
-            /\b(machinery\s+space|accommodation|emergency\s+equipment)\b/gi,
-            /\b(drydocking|survey|inspection|certification)\b/gi
-        ];
-
-        const terms = [];
-        for (const pattern of maritimePatterns) {
-            const matches = text.matchAll(pattern);
-            for (const match of matches) {
-                terms.push(match[0].toLowerCase().replace(/\s+/g, '_'));
-            }
-        }
-
-        return terms;
+        return extractMaritimeTerms(text);
     }
 
     computeQueryEmbedding(query) {
@@ -243,8 +314,8 @@ class LocalSearchService {
         const results = new Map();
 
         for (const term of queryTokens) {
-            if (!this.searchIndex.has(term)) continue;
-            const postings = this.searchIndex.get(term);
+            const postings = this.getPostings(term);
+            if (!postings) continue;
             const df = postings.size;
             const idf = Math.log((this.totalSections + 1) / (df + 1)) + 1;
             for (const [sectionId, data] of postings) {
@@ -24,3 +24,26 @@ export function stem(word) {
 export function processText(text) {
   return removeStopWords(tokenize(text)).map(stem);
 }
+
+const maritimePatterns = [
+  /\b(fire\s+detection|life\s+saving|oil\s+discharge|manning\s+requirements)\b/gi,
+  /\b(osv|offshore\s+supply\s+vessel|supply\s+vessel)\b/gi,
+  /\b(cfr|code\s+of\s+federal\s+regulations)\b/gi,
+  /\b(abs|american\s+bureau\s+of\s+shipping)\b/gi,
+  /\b(solas|safety\s+of\s+life\s+at\s+sea)\b/gi,
+  /\b(nvic|navigation\s+and\s+vessel\s+inspection\s+circular)\b/gi,
+  /\b(machinery\s+space|accommodation|emergency\s+equipment)\b/gi,
+  /\b(drydocking|survey|inspection|certification)\b/gi
+];
+
+// Multi-word domain terms as single tokens (e.g. "fire_detection").
+// data-local/nlp.py mirrors these rules for the prebuilt keyword index.
+export function extractMaritimeTerms(text) {
+  const terms = [];
+  for (const pattern of maritimePatterns) {
+    for (const match of text.matchAll(pattern)) {
+      terms.push(match[0].toLowerCase().replace(/\s+/g, '_'));
+    }
+  }
+  return terms;
+}
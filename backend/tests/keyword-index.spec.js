@@ -0,0 +1,56 @@
+import test from 'node:test';
+import assert from 'node:assert/strict';
+import fs from 'node:fs';
+import LocalSearchService from '../src/services/local-search.js';
+
+// The prebuilt index (data-local/index/keyword-index.json) must reproduce the
+// index the service builds at startup, so scores are identical either way.
+const runtime = new LocalSearchService({ usePrebuiltIndex: false });
+const prebuilt = new LocalSearchService();
+
+const golden = JSON.parse(
+  fs.readFileSync(new URL('../../data-local/golden_queries.json', import.meta.url), 'utf8')
+);
+
+test.before(async () => {
+  await runtime.initialize();
+  await prebuilt.initialize();
+});
+
+test('prebuilt index is used when it matches the documents', () => {
+  assert.equal(runtime.indexSource, 'runtime');
+  assert.equal(prebuilt.indexSource, 'prebuilt');
+});
+
+test('section counts and lengths match', () => {
+  assert.equal(prebuilt.totalSections, runtime.totalSections);
+  assert.deepEqual([...prebuilt.sectionWordCounts], [...runtime.sectionWordCounts]);
+});
+
+test('postings match term by term', () => {
+  const runtimeTerms = [...runtime.searchIndex.keys()].sort();
+  const prebuiltTerms = [...prebuilt.prebuiltPostings.keys(), ...prebuilt.searchIndex.keys()].sort();
+  assert.deepEqual(prebuiltTerms, runtimeTerms);
+  for (const term of runtimeTerms) {
+    assert.deepEqual([...prebuilt.getPostings(term)], [...runtime.searchIndex.get(term)], term);
+  }
+});
+
+for (const { query } of golden.queries) {
+  test(`identical scores: ${query}`, async () => {
+    const expected = await runtime.search(query, { maxResults: 10 });
+    const actual = await prebuilt.search(query, { maxResults: 10 });
+    assert.deepEqual(
+      actual.map(r => [r.sectionId, r.score]),
+      expected.map(r => [r.sectionId, r.score])
+    );
+  });
+}
+
+test('stale prebuilt index falls back to runtime indexing', async () => {
+  const service = new LocalSearchService();
+  await service.loadDocument('../data-local/ECFR-title33.md', 'cfr33', { index: false });
+  const loaded = await service.loadPrebuiltIndex('../data-local/index/keyword-index.json');
+  assert.equal(loaded, false);
+  assert.equal(service.prebuiltPostings, null);
+});
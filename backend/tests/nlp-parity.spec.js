@@ -0,0 +1,22 @@
+import test from 'node:test';
+import assert from 'node:assert/strict';
+import fs from 'node:fs';
+import { processText, extractMaritimeTerms } from '../src/utils/nlp.js';
+
+// Expected output comes from data-local/nlp.py, which the prebuilt keyword
+// index is built with. Regenerate with:
+//   python data-local/keyword_index.py parity-fixture
+const cases = JSON.parse(
+  fs.readFileSync(new URL('./fixtures/nlp-parity.json', import.meta.url), 'utf8')
+);
+
+test('parity fixture is not empty', () => {
+  assert.ok(cases.length > 0);
+});
+
+for (const [i, testCase] of cases.entries()) {
+  test(`tokenizer parity #${i}: ${JSON.stringify(testCase.text.slice(0, 40))}`, () => {
+    assert.deepEqual(processText(testCase.text), testCase.process_text);
+    assert.deepEqual(extractMaritimeTerms(testCase.text), testCase.maritime_terms);
+  });
+}
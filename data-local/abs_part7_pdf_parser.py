@@ -5,25 +5,32 @@ Extracts and structures text from ABS Rules for Survey After Construction Part 7
 Optimized for vector search and retrieval.
 """
 
-import fitz  # PyMuPDF
+import argparse
 import re
 import os
 import sys
+from pathlib import Path
 from typing import List, Dict, Tuple
 import logging
 
+from render_cache import DEFAULT_RENDER_CACHE_PATH, RenderCache, code_version
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class ABSPart7Parser:
-    def __init__(self, pdf_path: str):
+    def __init__(self, pdf_path: str, render_cache: RenderCache = None):
         self.pdf_path = pdf_path
         self.doc = None
         self.sections = []
+        # Cleaned page text keyed by the page's content stream, reused for unchanged pages
+        self.render_cache = render_cache
         
     def open_pdf(self) -> bool:
         """Open the PDF document."""
+        import fitz  # PyMuPDF, only needed once there is a PDF to read
+
         try:
             self.doc = fitz.open(self.pdf_path)
             logger.info(f"Opened PDF: {self.pdf_path} ({len(self.doc)} pages)")
@@ -43,6 +50,22 @@ class ABSPart7Parser:
             logger.error(f"Error extracting text from page {page_num}: {e}")
             return ""
     
+    def page_text(self, page_num: int) -> str:
+        """Cleaned text of one page, from the render cache when the page is unchanged."""
+        key = None
+        if self.render_cache is not None:
+            page = self.doc[page_num]
+            key = self.render_cache.key(page.read_contents() + self.doc.xref_object(page.xref).encode('utf-8'))
+            cached = self.render_cache.get(key)
+            if cached is not None:
+                return cached
+        
+        page_text = self.extract_text_from_page(page_num)
+        cleaned_text = self.clean_text(page_text) if page_text else ""
+        if key is not None:
+            self.render_cache.put(key, cleaned_text)
+        return cleaned_text
+    
     def clean_text(self, text: str) -> str:
         """Clean and normalize extracted text."""
         # Remove excessive whitespace
@@ -214,11 +237,9 @@ class ABSPart7Parser:
             if page_num % 10 == 0:
                 logger.info(f"Processing page {page_num + 1}/{len(self.doc)}")
             
-            page_text = self.extract_text_from_page(page_num)
-            if page_text:
-                cleaned_text = self.clean_text(page_text)
-                if cleaned_text:
-                    all_text.append(cleaned_text)
+            cleaned_text = self.page_text(page_num)
+            if cleaned_text:
+                all_text.append(cleaned_text)
         
         # Combine all text
         full_text = '\n\n'.join(all_text)
@@ -245,8 +266,11 @@ class ABSPart7Parser:
     def save_to_file(self, content: str, output_path: str):
         """Save formatted content to file."""
         try:
-            with open(output_path, 'w', encoding='utf-8') as f:
+            # Swap in a complete file so readers never see a partial one
+            tmp_path = f"{output_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
                 f.write(content)
+            os.replace(tmp_path, output_path)
             logger.info(f"Saved formatted content to: {output_path}")
             logger.info(f"File size: {len(content)} characters")
         except Exception as e:
@@ -254,8 +278,16 @@ class ABSPart7Parser:
 
 def main():
     # Configuration
-    pdf_path = "/Users/dp/Downloads/part-7-july20.pdf"
-    output_path = "/Users/dp/Downloads/ABS-Part-7-Structured.md"
+    arg_parser = argparse.ArgumentParser(description="Parse the ABS Part 7 PDF into structured Markdown")
+    arg_parser.add_argument('--pdf', default="/Users/dp/Downloads/part-7-july20.pdf")
+    arg_parser.add_argument('--output', default="/Users/dp/Downloads/ABS-Part-7-Structured.md")
+    arg_parser.add_argument('--no-citation-table', action='store_true',
+                            help="Skip rebuilding the citation table (e.g. when the pipeline builds it)")
+    arg_parser.add_argument('--render-cache', nargs='?', const=DEFAULT_RENDER_CACHE_PATH, default=None,
+                            help="Reuse extracted text of unchanged pages (see render_cache.py)")
+    args = arg_parser.parse_args()
+    pdf_path = args.pdf
+    output_path = args.output
     
     # Check if PDF exists
     if not os.path.exists(pdf_path):
@@ -263,17 +295,25 @@ def main():
         sys.exit(1)
     
     # Initialize parser
-    parser = ABSPart7Parser(pdf_path)
+    render_cache = None
+    if args.render_cache:
+        render_cache = RenderCache(args.render_cache, 'abs', code_version(__file__))
+    parser = ABSPart7Parser(pdf_path, render_cache)
     
     # Parse document
     print("Starting ABS Part 7 PDF parsing...")
     print("This may take several minutes for large documents...")
     
     formatted_content = parser.parse_full_document()
+    if render_cache is not None:
+        render_cache.close()
     
     if formatted_content:
         # Save to file
         parser.save_to_file(formatted_content, output_path)
+        if not args.no_citation_table:
+            from citation_table import build_citation_table
+            build_citation_table(data_dir=Path(output_path).parent)
         
         # Print summary
         print(f"\n✅ Successfully processed ABS Part 7 PDF!")
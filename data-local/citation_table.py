@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Citation Lookup Table
+
+Maps normalized citations to where they live in the converted corpus, so a
+cited section is a binary search away instead of a scan over section titles:
+
+    46 CFR 109          the PART 109 heading in ECFR-title46.md
+    46 CFR 109.213      the § 109.213 heading
+    ABS 7-1             ABS Part 7, Chapter 1
+    ABS 7-1-2           Chapter 1, Section 2
+    ABS 7-1-2/3.1       paragraph 3.1 of that section
+
+Each entry records the document ID, backend section ID, UTF-8 byte offset of
+the heading line in the Markdown file and the hierarchy path (enclosing
+heading titles, then the section's own title).
+
+The converters write the table after converting; the file is little-endian:
+
+    header    magic b'ARCIT\\0\\0\\1', version, entry count, blob bytes (<8sIII)
+    offsets   uint32 x (count + 1), start of each record in the blob
+    blob      UTF-8 records sorted by citation bytes:
+              citation \\x1f documentId \\x1f sectionId \\x1f byte offset \\x1f path titles joined by \\x1e
+
+Usage:
+    python citation_table.py build
+    python citation_table.py lookup "46 CFR 109.213" "ABS 7-1-2"
+    python citation_table.py resolve < answer.txt
+"""
+
+import argparse
+import json
+import logging
+import re
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from embedding_store import atomic_write_bytes
+from sections import BUILD_DIR, DATA_DIR, iter_sections
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+CITATION_MAGIC = b'ARCIT\x00\x00\x01'
+CITATION_VERSION = 1
+CITATION_TABLE_PATH = BUILD_DIR / 'citations.bin'
+HEADER = struct.Struct('<8sIII')
+FIELD_SEPARATOR = '\x1f'
+PATH_SEPARATOR = '\x1e'
+
+# documentId -> CFR title number / ABS part number
+CFR_TITLES = {'cfr33': 33, 'cfr46': 46}
+ABS_PARTS = {'abs_part7': 7}
+
+# Headings the converters write (ecfr_xml_to_markdown.py, abs_part7_pdf_parser.py)
+CFR_SECTION_HEADING = re.compile(r'§\s*(\d+(?:\.\d+)*(?:-\d+)*)', re.ASCII)
+CFR_PART_HEADING = re.compile(r'PART\s+(\d+)', re.IGNORECASE | re.ASCII)
+ABS_CHAPTER_HEADING = re.compile(r'Chapter\s+(\d+)', re.IGNORECASE | re.ASCII)
+ABS_SECTION_HEADING = re.compile(r'Section\s+(\d+)', re.IGNORECASE | re.ASCII)
+ABS_PARAGRAPH_HEADING = re.compile(r'(\d+(?:\.\d+)*)\s', re.ASCII)
+
+# Citations as they appear in answers: "46 CFR 109.213", "Title 46, C.F.R. § 109.213", "ABS Part 7-1-2/3.1"
+CFR_CITATION = re.compile(
+    r'\b(?:Title\s+)?(\d+),?\s*C\.?F\.?R\.?\s*(?:Part\s+|§+\s*)?(\d+(?:\.\d+)*(?:-\d+)*)\b',
+    re.IGNORECASE | re.ASCII,
+)
+ABS_CITATION = re.compile(
+    r'\bABS\s+(?:Rules\s+)?(?:Part\s+)?(\d+(?:-\d+)*)(?:\s*/\s*(\d+(?:\.\d+)*))?\b',
+    re.IGNORECASE | re.ASCII,
+)
+
+
+def format_cfr(title, number: str) -> str:
+    return f"{int(title)} CFR {number}"
+
+
+def format_abs(numbers: str, paragraph: Optional[str] = None) -> str:
+    return f"ABS {numbers}/{paragraph}" if paragraph else f"ABS {numbers}"
+
+
+def normalize_citation(text: str) -> Optional[str]:
+    """Canonical form of a single citation, or None if it is not a CFR/ABS citation."""
+    text = text.strip()
+    match = CFR_CITATION.fullmatch(text)
+    if match:
+        return format_cfr(match.group(1), match.group(2))
+    match = ABS_CITATION.fullmatch(text)
+    if match:
+        return format_abs(match.group(1), match.group(2))
+    return None
+
+
+def find_citations(text: str) -> List[str]:
+    """Normalized citations in free text, in order of appearance, without repeats."""
+    found = []
+    for match in CFR_CITATION.finditer(text):
+        found.append((match.start(), format_cfr(match.group(1), match.group(2))))
+    for match in ABS_CITATION.finditer(text):
+        found.append((match.start(), format_abs(match.group(1), match.group(2))))
+    return list(dict.fromkeys(citation for _, citation in sorted(found)))
+
+
+def section_citations(sections: Iterable[Dict]) -> Iterable[Tuple[str, Dict]]:
+    """(citation, section) for every heading the converters number."""
+    abs_context = {}
+    for section in sections:
+        document_id = section['document_id']
+        title = section['title']
+        if document_id in CFR_TITLES:
+            match = CFR_SECTION_HEADING.match(title) or CFR_PART_HEADING.match(title)
+            if match:
+                yield format_cfr(CFR_TITLES[document_id], match.group(1)), section
+        elif document_id in ABS_PARTS:
+            context = abs_context.setdefault(document_id, {'chapter': None, 'section': None})
+            part = ABS_PARTS[document_id]
+            match = ABS_CHAPTER_HEADING.match(title)
+            if match:
+                context.update(chapter=int(match.group(1)), section=None)
+                yield format_abs(f"{part}-{context['chapter']}"), section
+                continue
+            match = ABS_SECTION_HEADING.match(title)
+            if match and context['chapter'] is not None:
+                context['section'] = int(match.group(1))
+                yield format_abs(f"{part}-{context['chapter']}-{context['section']}"), section
+                continue
+            match = ABS_PARAGRAPH_HEADING.match(title)
+            if match and context['section'] is not None:
+                yield format_abs(f"{part}-{context['chapter']}-{context['section']}", match.group(1)), section
+
+
+def build_citation_table(output: Path = CITATION_TABLE_PATH, data_dir: Path = DATA_DIR) -> int:
+    """Write the sorted table for every converted document on disk; return the entry count."""
+    entries = {}
+    duplicates = 0
+    for citation, section in section_citations(iter_sections(data_dir=data_dir)):
+        if citation in entries:
+            duplicates += 1
+            continue
+        path = PATH_SEPARATOR.join(section['parents'] + [section['title']])
+        entries[citation] = FIELD_SEPARATOR.join(
+            [citation, section['document_id'], section['id'], str(section['offset']), path]
+        ).encode('utf-8')
+
+    records = [entries[citation] for citation in sorted(entries, key=lambda c: c.encode('utf-8'))]
+    offsets = array('I', [0])
+    for record in records:
+        offsets.append(offsets[-1] + len(record))
+    if sys.byteorder == 'big':
+        offsets.byteswap()
+
+    def writer(f):
+        f.write(HEADER.pack(CITATION_MAGIC, CITATION_VERSION, len(records), offsets[-1] if records else 0))
+        f.write(offsets.tobytes())
+        f.write(b''.join(records))
+
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_bytes(output, writer)
+    logger.info(f"Wrote {len(records)} citations to {output}"
+                + (f" ({duplicates} duplicate headings skipped)" if duplicates else ""))
+    return len(records)
+
+
+class CitationTable:
+    """Binary search over the sorted citation records, decoding only the probed keys."""
+
+    def __init__(self, data: bytes):
+        magic, version, count, blob_bytes = HEADER.unpack_from(data)
+        if magic != CITATION_MAGIC or version != CITATION_VERSION:
+            raise ValueError(f"Not a version {CITATION_VERSION} citation table")
+        self.count = count
+        self.offsets = array('I')
+        self.offsets.frombytes(data[HEADER.size:HEADER.size + 4 * (count + 1)])
+        if sys.byteorder == 'big':
+            self.offsets.byteswap()
+        self.blob = data[HEADER.size + 4 * (count + 1):]
+
+    @classmethod
+    def open(cls, path: Path = CITATION_TABLE_PATH) -> 'CitationTable':
+        return cls(Path(path).read_bytes())
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _key(self, i: int) -> bytes:
+        start = self.offsets[i]
+        return self.blob[start:self.blob.index(b'\x1f', start)]
+
+    def _entry(self, i: int) -> Dict:
+        record = self.blob[self.offsets[i]:self.offsets[i + 1]].decode('utf-8')
+        citation, document_id, section_id, offset, path = record.split(FIELD_SEPARATOR)
+        return {
+            'citation': citation,
+            'document_id': document_id,
+            'section_id': section_id,
+            'offset': int(offset),
+            'path': path.split(PATH_SEPARATOR),
+        }
+
+    def _lower_bound(self, key: bytes) -> int:
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def lookup(self, citation: str) -> Optional[Dict]:
+        """Entry for a citation in any accepted spelling, or None."""
+        normalized = normalize_citation(citation)
+        if normalized is None:
+            return None
+        key = normalized.encode('utf-8')
+        i = self._lower_bound(key)
+        if i < self.count and self._key(i) == key:
+            return self._entry(i)
+        return None
+
+    def with_prefix(self, prefix: str, limit: Optional[int] = None) -> List[Dict]:
+        """Entries whose citation starts with prefix, e.g. "46 CFR 109." for a part's sections."""
+        key = prefix.encode('utf-8')
+        entries = []
+        i = self._lower_bound(key)
+        while i < self.count and self._key(i).startswith(key) and (limit is None or len(entries) < limit):
+            entries.append(self._entry(i))
+            i += 1
+        return entries
+
+    def resolve(self, text: str) -> List[Tuple[str, Optional[Dict]]]:
+        """Every citation in an answer with its entry (None when the corpus lacks it)."""
+        return [(citation, self.lookup(citation)) for citation in find_citations(text)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Citation -> section lookup table")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help="Write the table for the converted documents")
+    build.add_argument('--data-dir', type=Path, default=DATA_DIR)
+    build.add_argument('--output', type=Path, default=CITATION_TABLE_PATH)
+
+    lookup = subparsers.add_parser('lookup', help="Look up citations")
+    lookup.add_argument('citations', nargs='+')
+    lookup.add_argument('--table', type=Path, default=CITATION_TABLE_PATH)
+
+    resolve = subparsers.add_parser('resolve', help="Resolve every citation in text read from stdin")
+    resolve.add_argument('--table', type=Path, default=CITATION_TABLE_PATH)
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        build_citation_table(args.output, args.data_dir)
+        return 0
+
+    table = CitationTable.open(args.table)
+    if args.command == 'lookup':
+        pairs = [(citation, table.lookup(citation)) for citation in args.citations]
+    else:
+        pairs = table.resolve(sys.stdin.read())
+    for citation, entry in pairs:
+        print(json.dumps({'citation': citation, 'entry': entry}, ensure_ascii=False))
+    return 0 if all(entry for _, entry in pairs) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Block-Compressed Corpus Archive
+
+Stores the converted Markdown in independently compressed blocks (stdlib
+zlib or lzma) whose boundaries fall on section boundaries, with an index
+from backend section ID to (block, offset, length). The archive is several
+times smaller than the Markdown, but unlike whole-file gzip a single section
+is read with one seek and one block decompression. Whole documents can be
+extracted byte-for-byte.
+
+Sections are the byte ranges between consecutive heading offsets from
+sections.py (text before the first heading belongs to no section but is
+kept in the document's first block). Consecutive sections are packed into a
+block until it reaches --block-size; a larger section gets a block of its
+own, so no section spans two blocks.
+
+Layout (little-endian):
+
+    header    magic b'ARBLK\\0\\0\\1', version, codec (0 zlib, 1 lzma)  (<8sII)
+    blocks    compressed blocks back to back
+    index     codec-compressed UTF-8 JSON:
+                {"documents": {documentId: {"file", "bytes", "sha256", "blocks": [first, count]}},
+                 "blocks": [[file offset, compressed bytes, raw bytes], ...],
+                 "sections": {sectionId: [block, offset in block, length]}}
+    footer    index offset, index bytes, magic  (<QQ8s)
+
+Usage:
+    python corpus_archive.py build [--codec lzma] [--block-size 65536]
+    python corpus_archive.py section cfr46_120
+    python corpus_archive.py extract cfr46 > ECFR-title46.md
+    python corpus_archive.py benchmark --data-dir build/synthetic
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import lzma
+import random
+import struct
+import sys
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from embedding_store import atomic_write_bytes
+from sections import BUILD_DIR, DATA_DIR, DOCUMENTS, SCRIPTS_DIR, parse_markdown_sections
+
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+from perf_stats import latency_summary  # noqa: E402
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+ARCHIVE_MAGIC = b'ARBLK\x00\x00\x01'
+ARCHIVE_VERSION = 1
+ARCHIVE_PATH = BUILD_DIR / 'corpus.arblk'
+HEADER = struct.Struct('<8sII')
+FOOTER = struct.Struct('<QQ8s')
+BLOCK_SIZE = 64 * 1024
+
+# codec ID -> (name, compress, decompress)
+CODECS = {
+    0: ('zlib', lambda data: zlib.compress(data, 9), zlib.decompress),
+    1: ('lzma', lambda data: lzma.compress(data, preset=6), lzma.decompress),
+}
+CODEC_IDS = {name: codec_id for codec_id, (name, _, _) in CODECS.items()}
+
+
+def section_ranges(data: bytes, document_id: str) -> List[tuple]:
+    """(sectionId, start, end) byte ranges of a document's sections, in file order."""
+    sections = parse_markdown_sections(data.decode('utf-8'), document_id)
+    starts = [section['offset'] for section in sections] + [len(data)]
+    return [(section['id'], starts[i], starts[i + 1]) for i, section in enumerate(sections)]
+
+
+def pack_blocks(ranges: List[tuple], size: int, block_size: int) -> List[tuple]:
+    """Split [0, size) into (start, end) blocks that end on section boundaries."""
+    cuts = [start for _, start, _ in ranges[1:]] + [size]
+    blocks, start = [], 0
+    for cut in cuts:
+        if cut - start >= block_size:
+            blocks.append((start, cut))
+            start = cut
+    if start < size or not blocks:
+        blocks.append((start, size))
+    return blocks
+
+
+def build_archive(output: Path = ARCHIVE_PATH, data_dir: Path = DATA_DIR, codec: str = 'zlib',
+                  block_size: int = BLOCK_SIZE) -> Dict:
+    """Write the archive for every converted document in data_dir; returns its index."""
+    codec_id = CODEC_IDS[codec]
+    compress = CODECS[codec_id][1]
+    index = {'documents': {}, 'blocks': [], 'sections': {}}
+    chunks = [HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, codec_id)]
+    position = HEADER.size
+    raw_total = 0
+    for document_id, filename in DOCUMENTS.items():
+        path = Path(data_dir) / filename
+        if not path.exists():
+            continue
+        data = path.read_bytes()
+        ranges = section_ranges(data, document_id)
+        blocks = pack_blocks(ranges, len(data), block_size)
+        first = len(index['blocks'])
+        block_starts = [start for start, _ in blocks]
+        b = 0
+        for section_id, start, end in ranges:
+            while b + 1 < len(blocks) and blocks[b + 1][0] <= start:
+                b += 1
+            index['sections'][section_id] = [first + b, start - block_starts[b], end - start]
+        for start, end in blocks:
+            compressed = compress(data[start:end])
+            index['blocks'].append([position, len(compressed), end - start])
+            chunks.append(compressed)
+            position += len(compressed)
+        index['documents'][document_id] = {
+            'file': filename,
+            'bytes': len(data),
+            'sha256': hashlib.sha256(data).hexdigest(),
+            'blocks': [first, len(blocks)],
+        }
+        raw_total += len(data)
+
+    index_bytes = compress(json.dumps(index, separators=(',', ':')).encode('utf-8'))
+    chunks.append(index_bytes)
+    chunks.append(FOOTER.pack(position, len(index_bytes), ARCHIVE_MAGIC))
+
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_bytes(output, lambda f: f.writelines(chunks))
+    size = output.stat().st_size
+    logger.info(f"Wrote {len(index['sections'])} sections in {len(index['blocks'])} {codec} blocks to {output} "
+                f"({raw_total / 1e6:.1f} MB -> {size / 1e6:.2f} MB, {raw_total / max(size, 1):.1f}x)")
+    return index
+
+
+class CorpusArchive:
+    """Random access to sections of a block-compressed archive; keeps the last block decompressed."""
+
+    def __init__(self, path: Path = ARCHIVE_PATH):
+        self.path = Path(path)
+        self.file = open(self.path, 'rb')
+        magic, version, codec_id = HEADER.unpack(self.file.read(HEADER.size))
+        if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION or codec_id not in CODECS:
+            raise ValueError(f"{self.path} is not a version {ARCHIVE_VERSION} corpus archive")
+        self.codec, _, self.decompress = CODECS[codec_id]
+        self.file.seek(-FOOTER.size, 2)
+        index_offset, index_size, magic = FOOTER.unpack(self.file.read(FOOTER.size))
+        if magic != ARCHIVE_MAGIC:
+            raise ValueError(f"{self.path} is truncated")
+        self.file.seek(index_offset)
+        index = json.loads(self.decompress(self.file.read(index_size)))
+        self.documents = index['documents']
+        self.blocks = index['blocks']
+        self.sections = index['sections']
+        self._cached_block: Optional[int] = None
+        self._cached_data = b''
+
+    def __enter__(self) -> 'CorpusArchive':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.file.close()
+
+    def block(self, i: int) -> bytes:
+        if i != self._cached_block:
+            offset, size, _ = self.blocks[i]
+            self.file.seek(offset)
+            self._cached_data = self.decompress(self.file.read(size))
+            self._cached_block = i
+        return self._cached_data
+
+    def section_bytes(self, section_id: str) -> bytes:
+        block, start, length = self.sections[section_id]
+        return self.block(block)[start:start + length]
+
+    def section(self, section_id: str) -> str:
+        """Markdown of one section: its heading line through the line before the next heading."""
+        return self.section_bytes(section_id).decode('utf-8')
+
+    def document(self, document_id: str) -> bytes:
+        """The original Markdown file, verified against its recorded SHA-256."""
+        entry = self.documents[document_id]
+        first, count = entry['blocks']
+        data = b''.join(self.block(i) for i in range(first, first + count))
+        if hashlib.sha256(data).hexdigest() != entry['sha256']:
+            raise ValueError(f"{document_id} does not match its recorded checksum")
+        return data
+
+
+def benchmark(archive_path: Path, data_dir: Path, reads: int = 2000, seed: int = 0) -> Dict:
+    """Archive size against raw and whole-file gzip, and single-section read latency for each."""
+    raw = {document_id: (Path(data_dir) / filename).read_bytes()
+           for document_id, filename in DOCUMENTS.items() if (Path(data_dir) / filename).exists()}
+    gzipped = {document_id: gzip.compress(data, 9) for document_id, data in raw.items()}
+    rng = random.Random(seed)
+
+    with CorpusArchive(archive_path) as archive:
+        section_ids = rng.choices(sorted(archive.sections), k=reads)
+        archive_latencies = []
+        for section_id in section_ids:
+            archive._cached_block = None
+            start = time.perf_counter()
+            archive.section(section_id)
+            archive_latencies.append(time.perf_counter() - start)
+
+        gzip_latencies = []
+        for section_id in section_ids[:max(1, reads // 20)]:
+            document_id = section_id.rsplit('_', 1)[0]
+            _, offset, length = archive.sections[section_id]
+            start = time.perf_counter()
+            gzip.decompress(gzipped[document_id])[offset:offset + length]
+            gzip_latencies.append(time.perf_counter() - start)
+        blocks, codec = len(archive.blocks), archive.codec
+
+    raw_bytes = sum(len(data) for data in raw.values())
+    archive_bytes = Path(archive_path).stat().st_size
+    return {
+        'codec': codec,
+        'blocks': blocks,
+        'raw_bytes': raw_bytes,
+        'gzip_bytes': sum(len(data) for data in gzipped.values()),
+        'archive_bytes': archive_bytes,
+        'ratio': round(raw_bytes / archive_bytes, 2),
+        'section_read': latency_summary(archive_latencies),
+        'gzip_section_read': latency_summary(gzip_latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Block-compressed, seekable archive of the converted corpus")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help="Write the archive for the converted documents")
+    build.add_argument('--data-dir', type=Path, default=DATA_DIR)
+    build.add_argument('--output', type=Path, default=ARCHIVE_PATH)
+    build.add_argument('--codec', choices=sorted(CODEC_IDS), default='zlib')
+    build.add_argument('--block-size', type=int, default=BLOCK_SIZE,
+                       help="Target uncompressed bytes per block (blocks end on section boundaries)")
+
+    section = subparsers.add_parser('section', help="Print sections by backend section ID")
+    section.add_argument('section_ids', nargs='+')
+    section.add_argument('--archive', type=Path, default=ARCHIVE_PATH)
+
+    extract = subparsers.add_parser('extract', help="Write a whole document to stdout")
+    extract.add_argument('document_id', choices=sorted(DOCUMENTS))
+    extract.add_argument('--archive', type=Path, default=ARCHIVE_PATH)
+
+    bench = subparsers.add_parser('benchmark', help="Compare size and section reads with whole-file gzip")
+    bench.add_argument('--data-dir', type=Path, default=DATA_DIR)
+    bench.add_argument('--codec', choices=sorted(CODEC_IDS), default='zlib')
+    bench.add_argument('--block-size', type=int, default=BLOCK_SIZE)
+    bench.add_argument('--reads', type=int, default=2000)
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        build_archive(args.output, args.data_dir, args.codec, args.block_size)
+    elif args.command == 'section':
+        with CorpusArchive(args.archive) as archive:
+            missing = [section_id for section_id in args.section_ids if section_id not in archive.sections]
+            for section_id in args.section_ids:
+                if section_id in archive.sections:
+                    sys.stdout.write(archive.section(section_id))
+        for section_id in missing:
+            logger.error(f"No section {section_id} in {args.archive}")
+        return 1 if missing else 0
+    elif args.command == 'extract':
+        with CorpusArchive(args.archive) as archive:
+            sys.stdout.buffer.write(archive.document(args.document_id))
+    else:
+        output = BUILD_DIR / f"corpus-benchmark.{args.codec}.arblk"
+        build_archive(output, args.data_dir, args.codec, args.block_size)
+        print(json.dumps(benchmark(output, args.data_dir, args.reads), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,12 +6,22 @@ This script converts Electronic Code of Federal Regulations (ECFR) XML files
 to clean, well-formatted Markdown optimized for vector search and retrieval.
 
 Usage:
-    python ecfr_xml_to_markdown.py
+    python ecfr_xml_to_markdown.py [--no-citation-table] [--render-cache] [--intern-boilerplate]
+    python ecfr_xml_to_markdown.py --expand ECFR-title46.md > expanded.md
 
 The script will process ECFR-title33.xml and ECFR-title46.xml files in the
-current directory and output corresponding .md files.
+current directory and output corresponding .md files, then rebuild the
+citation lookup table (see citation_table.py).
+
+With --intern-boilerplate, Authority, Source and Editorial Note text that
+repeats within a title is written once to a side table
+(ECFR-title46.boilerplate.json) and referenced from the Markdown as
+[boilerplate:<id>]; --expand renders such a file back to the full text.
 """
 
+import argparse
+import hashlib
+import json
 import xml.etree.ElementTree as ET
 import re
 import os
@@ -19,14 +29,95 @@ import sys
 from pathlib import Path
 import logging
 
+from render_cache import DEFAULT_RENDER_CACHE_PATH, RenderCache, code_version
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+BOILERPLATE_FORMAT = 'arrowreg-boilerplate-v1'
+# Shorter text is not worth a reference
+MIN_BOILERPLATE_CHARS = 40
+# Label line written by process_authority / process_source / process_editorial_note, then the text lines
+BOILERPLATE_BLOCK = re.compile(
+    r'^(\*\*(?:Authority|Source|Editorial Notes?):\*\*)\n((?:[^\n]+\n)*[^\n]+)$', re.MULTILINE
+)
+BOILERPLATE_REFERENCE = re.compile(r'\[boilerplate:([0-9a-f]{12})\]')
+
+
+def estimate_tokens(text):
+    """Rough embedding token count (~4 characters per token for English text)."""
+    return (len(text) + 3) // 4
+
+
+def boilerplate_path(markdown_file):
+    return Path(markdown_file).with_suffix('.boilerplate.json')
+
+
+def intern_boilerplate(markdown, min_chars=MIN_BOILERPLATE_CHARS):
+    """Replace repeated boilerplate text with references; returns (markdown, blocks, stats)."""
+    counts = {}
+    for match in BOILERPLATE_BLOCK.finditer(markdown):
+        text = match.group(2)
+        if len(text) >= min_chars:
+            counts[text] = counts.get(text, 0) + 1
+    repeated = {text for text, count in counts.items() if count > 1}
+    
+    blocks = {}
+    saved_tokens = 0
+    
+    def replace(match):
+        nonlocal saved_tokens
+        label, text = match.groups()
+        if text not in repeated:
+            return match.group(0)
+        block_id = hashlib.sha256(text.encode('utf-8')).hexdigest()[:12]
+        reference = f"[boilerplate:{block_id}]"
+        blocks.setdefault(block_id, {'label': label.strip('*:'), 'text': text, 'count': 0})['count'] += 1
+        saved_tokens += estimate_tokens(text) - estimate_tokens(reference)
+        return f"{label}\n{reference}"
+    
+    interned = BOILERPLATE_BLOCK.sub(replace, markdown)
+    stats = {
+        'blocks': sum(block['count'] for block in blocks.values()),
+        'unique': len(blocks),
+        'bytes_saved': len(markdown.encode('utf-8')) - len(interned.encode('utf-8')),
+        'table_bytes': len(json.dumps(blocks, ensure_ascii=False).encode('utf-8')),
+        'tokens_saved': saved_tokens,
+    }
+    stats['net_bytes_saved'] = stats['bytes_saved'] - stats['table_bytes']
+    return interned, blocks, stats
+
+
+def expand_boilerplate(markdown, blocks):
+    """Render interned Markdown with every reference replaced by its full text."""
+    return BOILERPLATE_REFERENCE.sub(lambda match: blocks[match.group(1)]['text'], markdown)
+
+
+def load_boilerplate(markdown_file):
+    table = json.loads(boilerplate_path(markdown_file).read_text(encoding='utf-8'))
+    if table.get('format') != BOILERPLATE_FORMAT:
+        raise ValueError(f"{boilerplate_path(markdown_file)} is not an {BOILERPLATE_FORMAT} table")
+    return table['blocks']
+
+
+def write_atomic(path, text):
+    """Write to a temporary file and swap it in, so readers never see a partial file."""
+    tmp_file = f"{path}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_file, path)
+
+
 class ECFRToMarkdownConverter:
     """Converts ECFR XML files to structured Markdown format."""
     
-    def __init__(self):
+    def __init__(self, render_cache=None, intern=False):
+        # Rendered PART divisions keyed by their XML, reused when a part is unchanged
+        self.render_cache = render_cache
+        # Write repeated AUTH/SOURCE/EDNOTE text once to a side table (see intern_boilerplate)
+        self.intern = intern
+        
         # Define heading levels for different XML elements
         self.heading_levels = {
             'TITLE': 1,
@@ -106,6 +197,17 @@ class ECFRToMarkdownConverter:
     
     def process_division(self, div_element, level=1):
         """Process a division element and return formatted markdown."""
+        if self.render_cache is not None and div_element.get('TYPE', '').upper() == 'PART':
+            key = self.render_cache.key(ET.tostring(div_element) + f"|{level}".encode('ascii'))
+            rendered = self.render_cache.get(key)
+            if rendered is None:
+                rendered = self.render_division(div_element, level)
+                self.render_cache.put(key, rendered)
+            return rendered
+        return self.render_division(div_element, level)
+    
+    def render_division(self, div_element, level=1):
+        """Render a division element and its children as markdown."""
         content = []
         div_type = div_element.get('TYPE', '').upper()
         div_number = div_element.get('N', '')
@@ -286,9 +388,21 @@ class ECFRToMarkdownConverter:
                 if not already_processed:
                     content.append(self.process_section(section))
             
-            # Write to output file
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write('\n'.join(content))
+            markdown = '\n'.join(content)
+            if self.intern:
+                # Interned over the whole title, after rendering, so cached parts are interned too
+                markdown, blocks, stats = intern_boilerplate(markdown)
+                table = {'format': BOILERPLATE_FORMAT, 'source': os.path.basename(input_file),
+                         'stats': stats, 'blocks': blocks}
+                write_atomic(boilerplate_path(output_file), json.dumps(table, indent=1, ensure_ascii=False))
+                logger.info(f"{output_file}: interned {stats['blocks']} boilerplate blocks ({stats['unique']} unique), "
+                            f"{stats['bytes_saved']:,} bytes smaller, "
+                            f"{stats['net_bytes_saved']:,} net of the side table, "
+                            f"~{stats['tokens_saved']:,} tokens saved")
+            elif boilerplate_path(output_file).exists():
+                # A side table left by an earlier interned run no longer matches the output
+                os.remove(boilerplate_path(output_file))
+            write_atomic(output_file, markdown)
             
             logger.info(f"Successfully converted {input_file}")
             
@@ -322,7 +436,26 @@ class ECFRToMarkdownConverter:
 
 def main():
     """Main function to convert ECFR XML files to Markdown."""
-    converter = ECFRToMarkdownConverter()
+    parser = argparse.ArgumentParser(description="Convert ECFR XML files to Markdown")
+    parser.add_argument('--no-citation-table', action='store_true',
+                        help="Skip rebuilding the citation table (e.g. when the pipeline builds it)")
+    parser.add_argument('--render-cache', nargs='?', const=DEFAULT_RENDER_CACHE_PATH, default=None,
+                        help="Reuse rendered parts whose XML is unchanged (see render_cache.py)")
+    parser.add_argument('--intern-boilerplate', action='store_true',
+                        help="Write repeated Authority/Source/Editorial Note text once to a side table")
+    parser.add_argument('--expand', metavar='MARKDOWN', default=None,
+                        help="Print an interned Markdown file with its boilerplate expanded, then exit")
+    args = parser.parse_args()
+    
+    if args.expand:
+        markdown = Path(args.expand).read_text(encoding='utf-8')
+        sys.stdout.write(expand_boilerplate(markdown, load_boilerplate(args.expand)))
+        return 0
+    
+    render_cache = None
+    if args.render_cache:
+        render_cache = RenderCache(args.render_cache, 'ecfr', code_version(__file__))
+    converter = ECFRToMarkdownConverter(render_cache, intern=args.intern_boilerplate)
     
     # Define input and output files
     files_to_convert = [
@@ -356,6 +489,14 @@ def main():
         except Exception as e:
             logger.error(f"Failed to convert {input_file}: {e}")
     
+    if render_cache is not None:
+        render_cache.close()
+    
+    if success_count and not args.no_citation_table:
+        # Citation -> section table over every converted document next to the output
+        from citation_table import build_citation_table
+        build_citation_table(data_dir=Path(files_to_convert[0][1]).resolve().parent)
+    
     if success_count == len(files_to_convert):
         logger.info("All files converted successfully!")
         logger.info("Markdown files are optimized for vector search and retrieval.")
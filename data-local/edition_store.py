@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Multi-Edition Corpus Store
+
+Keeps every edition of the converted documents ("what did 46 CFR say on
+2024-03-01?") without keeping full copies. An edition is a small manifest
+pointing into a shared content-addressed object store:
+
+    blob     one section's Markdown (heading line to the next heading), as
+             split by sections.py, or the text before the first heading
+    tree     consecutive section entries [[citation, blob], ...]; tree
+             boundaries are content-defined (a section whose blob hash ends
+             a chunk), so inserting or editing a section only changes the
+             trees around it
+    edition  editions/<documentId>/<date>.json: file digest, preamble blob
+             and the list of trees
+
+Objects are zlib-compressed and named by the SHA-256 of their uncompressed
+content, so unchanged sections and runs of sections are stored once across
+editions and the store grows with the amount of change, not with the
+number of editions. Section IDs are not stored (they are positional and
+shift when sections are inserted); they are recomputed on read.
+
+Objects are not files of their own (thousands of small files cost a disk
+block each): every `add` appends one pack, packs/pack-<ns>.pack holding
+the new objects back to back, and its index pack-<ns>.idx (sorted SHA-256,
+offset, length records). The index is written after the pack, so a pack
+without an index is an interrupted add and is ignored.
+
+The edition in effect on a date is the latest one dated on or before it.
+
+Usage:
+    python edition_store.py add --date 2025-01-02 [cfr46 ...] [--data-dir DIR]
+    python edition_store.py list
+    python edition_store.py materialize cfr46 --date 2024-06-30 > ECFR-title46.md
+    python edition_store.py section cfr46 "46 CFR 109.213" --date 2024-06-30
+    python edition_store.py stats
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import struct
+import sys
+import time
+import zlib
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from citation_table import normalize_citation, section_citations
+from corpus_archive import section_ranges
+from embedding_store import atomic_write_bytes
+from sections import BUILD_DIR, DATA_DIR, DOCUMENTS, parse_markdown_sections
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+EDITION_FORMAT = 'arrowreg-edition-v2'
+# Pack index record: SHA-256 digest, offset and length of the compressed object
+PACK_ENTRY = struct.Struct('<32sQI')
+DEFAULT_STORE_DIR = BUILD_DIR / 'editions'
+# A section whose blob hash is 0 mod TREE_DIVISOR ends a tree (~16 sections per tree)
+TREE_DIVISOR = 16
+
+
+class EditionStore:
+    """Content-addressed section blobs and trees plus dated edition manifests."""
+
+    def __init__(self, root: Path = DEFAULT_STORE_DIR):
+        self.root = Path(root)
+        self.packs_dir = self.root / 'packs'
+        self.editions_dir = self.root / 'editions'
+        self._index: Optional[Dict[str, Tuple[Path, int, int]]] = None
+        # Objects put since the last flush: the next pack's bytes and digest -> (offset, length)
+        self._pending = bytearray()
+        self._pending_index: Dict[str, Tuple[int, int]] = {}
+
+    # Objects
+
+    @property
+    def index(self) -> Dict[str, Tuple[Path, int, int]]:
+        """digest -> (pack, offset, length) over every complete pack."""
+        if self._index is None:
+            self._index = {}
+            for index_path in sorted(self.packs_dir.glob('*.idx')):
+                pack = index_path.with_suffix('.pack')
+                for digest, offset, length in PACK_ENTRY.iter_unpack(index_path.read_bytes()):
+                    self._index.setdefault(digest.hex(), (pack, offset, length))
+        return self._index
+
+    def put(self, content: bytes) -> Tuple[str, bool]:
+        """Store content once; returns (digest, whether it was new). New objects are written by flush()."""
+        digest = hashlib.sha256(content).hexdigest()
+        if digest in self.index or digest in self._pending_index:
+            return digest, False
+        compressed = zlib.compress(content, 9)
+        self._pending_index[digest] = (len(self._pending), len(compressed))
+        self._pending += compressed
+        return digest, True
+
+    def flush(self):
+        """Write the objects put since the last flush as one pack and its index."""
+        if not self._pending_index:
+            return
+        self.packs_dir.mkdir(parents=True, exist_ok=True)
+        name = f"pack-{time.time_ns():016x}"
+        pack = self.packs_dir / f"{name}.pack"
+        data = bytes(self._pending)
+        atomic_write_bytes(pack, lambda f: f.write(data))
+        entries = b''.join(PACK_ENTRY.pack(bytes.fromhex(digest), offset, length)
+                           for digest, (offset, length) in sorted(self._pending_index.items()))
+        atomic_write_bytes(self.packs_dir / f"{name}.idx", lambda f: f.write(entries))
+        for digest, (offset, length) in self._pending_index.items():
+            self.index[digest] = (pack, offset, length)
+        self._pending = bytearray()
+        self._pending_index = {}
+
+    def stored_size(self, digest: str) -> int:
+        """Compressed size of an object."""
+        pending = self._pending_index.get(digest)
+        return pending[1] if pending else self.index[digest][2]
+
+    def get(self, digest: str) -> bytes:
+        pending = self._pending_index.get(digest)
+        if pending is not None:
+            offset, length = pending
+            compressed = bytes(self._pending[offset:offset + length])
+        else:
+            pack, offset, length = self.index[digest]
+            with open(pack, 'rb') as f:
+                f.seek(offset)
+                compressed = f.read(length)
+        content = zlib.decompress(compressed)
+        if hashlib.sha256(content).hexdigest() != digest:
+            raise ValueError(f"Object {digest} is corrupt")
+        return content
+
+    def _tree(self, digest: str) -> List[list]:
+        return json.loads(self.get(digest))
+
+    # Editions
+
+    def _edition_path(self, document_id: str, edition: str) -> Path:
+        return self.editions_dir / document_id / f"{edition}.json"
+
+    def editions(self, document_id: str) -> List[str]:
+        directory = self.editions_dir / document_id
+        return sorted(path.stem for path in directory.glob('*.json')) if directory.exists() else []
+
+    def edition_at(self, document_id: str, on: str) -> str:
+        """Date of the edition in effect on `on` (ISO date)."""
+        earlier = [edition for edition in self.editions(document_id) if edition <= date.fromisoformat(on).isoformat()]
+        if not earlier:
+            raise KeyError(f"No edition of {document_id} on or before {on}")
+        return earlier[-1]
+
+    def has_edition_at(self, document_id: str, on: str) -> bool:
+        editions = self.editions(document_id)
+        return bool(editions) and editions[0] <= date.fromisoformat(on).isoformat()
+
+    def manifest(self, document_id: str, on: str) -> Dict:
+        path = self._edition_path(document_id, self.edition_at(document_id, on))
+        manifest = json.loads(path.read_text(encoding='utf-8'))
+        if manifest.get('format') != EDITION_FORMAT:
+            raise ValueError(f"{path} is not an {EDITION_FORMAT} manifest")
+        return manifest
+
+    def add_edition(self, document_id: str, data: bytes, edition: str) -> Dict:
+        """Record a document's Markdown as the edition dated `edition`; returns the manifest."""
+        edition = date.fromisoformat(edition).isoformat()
+        ranges = section_ranges(data, document_id)
+        sections = parse_markdown_sections(data.decode('utf-8'), document_id)
+        citations = {section['id']: citation for citation, section in section_citations(sections)}
+
+        stored = {'objects': 0, 'reused': 0, 'bytes': 0}
+
+        def put(content: bytes) -> str:
+            digest, new = self.put(content)
+            stored['objects' if new else 'reused'] += 1
+            stored['bytes'] += self.stored_size(digest) if new else 0
+            return digest
+
+        preamble = put(data[:ranges[0][1]] if ranges else data)
+        trees, entries = [], []
+        for section_id, start, end in ranges:
+            blob = put(data[start:end])
+            entries.append([citations.get(section_id), blob])
+            if int(blob[-8:], 16) % TREE_DIVISOR == 0:
+                trees.append(put(json.dumps(entries, separators=(',', ':')).encode('utf-8')))
+                entries = []
+        if entries:
+            trees.append(put(json.dumps(entries, separators=(',', ':')).encode('utf-8')))
+
+        manifest = {
+            'format': EDITION_FORMAT,
+            'document_id': document_id,
+            'edition': edition,
+            'file': DOCUMENTS[document_id],
+            'bytes': len(data),
+            'sha256': hashlib.sha256(data).hexdigest(),
+            'sections': len(ranges),
+            'preamble': preamble,
+            'trees': trees,
+            'stored': stored,
+        }
+        # Objects first: a manifest is only written once everything it points to is stored
+        self.flush()
+        path = self._edition_path(document_id, edition)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        content = json.dumps(manifest, indent=1).encode('utf-8')
+        atomic_write_bytes(path, lambda f: f.write(content))
+        return manifest
+
+    def entries(self, manifest: Dict) -> List[list]:
+        return [entry for tree in manifest['trees'] for entry in self._tree(tree)]
+
+    def materialize(self, document_id: str, on: str) -> bytes:
+        """The document's Markdown as of a date, byte-for-byte as it was added."""
+        manifest = self.manifest(document_id, on)
+        data = self.get(manifest['preamble']) + b''.join(self.get(blob) for _, blob in self.entries(manifest))
+        if hashlib.sha256(data).hexdigest() != manifest['sha256']:
+            raise ValueError(f"{document_id} edition {manifest['edition']} does not match its recorded checksum")
+        return data
+
+    def section_at(self, document_id: str, key: str, on: str) -> Optional[str]:
+        """A section as of a date, by citation ("46 CFR 109.213") or by that edition's section ID."""
+        entries = self.entries(self.manifest(document_id, on))
+        citation = normalize_citation(key)
+        if citation is not None:
+            blob = next((blob for entry_citation, blob in entries if entry_citation == citation), None)
+        else:
+            prefix = f"{document_id}_"
+            index = int(key[len(prefix):]) if key.startswith(prefix) and key[len(prefix):].isdigit() else -1
+            blob = entries[index][1] if 0 <= index < len(entries) else None
+        return self.get(blob).decode('utf-8') if blob else None
+
+    def stats(self) -> Dict:
+        """Bytes the editions represent against bytes actually stored (apparent and allocated on disk)."""
+        manifests = [json.loads(path.read_text(encoding='utf-8')) for path in self.editions_dir.glob('*/*.json')]
+        files = list(self.editions_dir.glob('*/*.json'))
+        if self.packs_dir.exists():
+            files += [path for path in self.packs_dir.iterdir() if path.suffix in ('.pack', '.idx')]
+        stored = sum(path.stat().st_size for path in files)
+        allocated = sum(path.stat().st_blocks * 512 for path in files)
+        logical = sum(manifest['bytes'] for manifest in manifests)
+        return {
+            'editions': {document_id: self.editions(document_id) for document_id in DOCUMENTS
+                         if self.editions(document_id)},
+            'logical_bytes': logical,
+            'stored_bytes': stored,
+            'allocated_bytes': allocated,
+            'files': len(files),
+            'objects': len(self.index),
+            'ratio': round(logical / allocated, 2) if allocated else None,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dated editions of the corpus in a content-addressed store")
+    parser.add_argument('--store', type=Path, default=DEFAULT_STORE_DIR)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    add = subparsers.add_parser('add', help="Record the converted documents as an edition")
+    add.add_argument('documents', nargs='*', help=f"Documents (default: all of {', '.join(DOCUMENTS)})")
+    add.add_argument('--date', required=True, help="Date the edition takes effect (YYYY-MM-DD)")
+    add.add_argument('--data-dir', type=Path, default=DATA_DIR)
+
+    subparsers.add_parser('list', help="Show the recorded editions")
+
+    materialize = subparsers.add_parser('materialize', help="Write a document as of a date to stdout")
+    materialize.add_argument('document_id', choices=sorted(DOCUMENTS))
+    materialize.add_argument('--date', required=True)
+
+    section = subparsers.add_parser('section', help="Print one section as of a date")
+    section.add_argument('document_id', choices=sorted(DOCUMENTS))
+    section.add_argument('key', help="Citation (46 CFR 109.213) or section ID in that edition")
+    section.add_argument('--date', required=True)
+
+    subparsers.add_parser('stats', help="Logical vs stored and allocated size")
+
+    args = parser.parse_args()
+    store = EditionStore(args.store)
+
+    if args.command == 'add':
+        for document_id in args.documents or DOCUMENTS:
+            path = args.data_dir / DOCUMENTS[document_id]
+            if not path.exists():
+                logger.warning(f"Skipping {document_id}: {path} does not exist")
+                continue
+            manifest = store.add_edition(document_id, path.read_bytes(), args.date)
+            stored = manifest['stored']
+            logger.info(f"{document_id} {manifest['edition']}: {manifest['sections']} sections in "
+                        f"{len(manifest['trees'])} trees; {stored['objects']} new objects "
+                        f"({stored['bytes']:,} bytes), {stored['reused']} reused")
+    elif args.command == 'list':
+        for document_id in DOCUMENTS:
+            for edition in store.editions(document_id):
+                print(f"{document_id:10} {edition}")
+    elif args.command in ('materialize', 'section') and not store.has_edition_at(args.document_id, args.date):
+        logger.error(f"No edition of {args.document_id} on or before {args.date}")
+        return 1
+    elif args.command == 'materialize':
+        sys.stdout.buffer.write(store.materialize(args.document_id, args.date))
+    elif args.command == 'section':
+        text = store.section_at(args.document_id, args.key, args.date)
+        if text is None:
+            logger.error(f"No section {args.key} in {args.document_id} as of {args.date}")
+            return 1
+        sys.stdout.write(text)
+    else:
+        print(json.dumps(store.stats(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
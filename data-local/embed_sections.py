@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Offline Batched Section Embedding Generator
+
+Embeds the section records produced from the converted Markdown (see
+sections.py) in batches and writes vectors keyed by the backend's
+`documentId_index` section IDs: one JSON file per document, in the same
+format as data-local/embeddings/*.json, and a binary memory-mapped
+embedding store (see embedding_store.py). With --quantize the store also
+gets int8 and product-quantized variants (see quantize_embeddings.py).
+
+Vectors are cached by (model ID, section text hash) in a SQLite cache (see
+embedding_cache.py); only sections whose text is not cached are sent to the
+backend. A full-corpus run over the default data directory evicts entries
+for text that no longer exists; runs over other workspaces (synthetic or
+benchmark corpora) share the cache but only evict with --evict.
+
+Backends:
+    hashing                 Fully offline, deterministic feature-hashing embedder
+    openai                  OpenAI embeddings API (default text-embedding-3-small)
+    sentence-transformers   Local model such as BAAI/bge-base-en-v1.5
+
+Usage:
+    python embed_sections.py --backend hashing
+    python embed_sections.py --backend openai --model text-embedding-3-small --batch-size 512
+    python embed_sections.py --backend sentence-transformers --model BAAI/bge-base-en-v1.5
+    python embed_sections.py --backend hashing --quantize --pq 16 32
+
+Requires numpy; the openai and sentence-transformers backends import their
+libraries only when selected.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+import numpy as np
+
+from ecfr_xml_to_markdown import estimate_tokens
+from embedding_cache import DEFAULT_CACHE_PATH, EmbeddingCache, text_hash
+from embedding_store import write_store
+from near_duplicates import load_representatives
+from quantize_embeddings import quantize_store
+from sections import BUILD_DIR, DATA_DIR, DOCUMENTS, SCRIPTS_DIR, iter_sections, section_text
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+class HashingBackend:
+    """Deterministic offline embedder: signed feature hashing of words and word bigrams.
+
+    No model or network is needed and the same text always maps to the same
+    vector, which makes it suitable for tests, benchmarks and air-gapped builds.
+    """
+
+    def __init__(self, dim: int = 768):
+        self.dim = dim
+        self.model_id = f"hashing-{dim}-v1"
+        self._word_hashes = {}
+
+    def _word_hash(self, word: str) -> int:
+        cached = self._word_hashes.get(word)
+        if cached is None:
+            digest = hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest()
+            cached = self._word_hashes[word] = int.from_bytes(digest, 'little')
+        return cached
+
+    @staticmethod
+    def _mix(values: np.ndarray) -> np.ndarray:
+        """splitmix64 finalizer, vectorized over uint64 arrays."""
+        values = values ^ (values >> np.uint64(30))
+        values = values * np.uint64(0xBF58476D1CE4E5B9)
+        values = values ^ (values >> np.uint64(27))
+        values = values * np.uint64(0x94D049BB133111EB)
+        return values ^ (values >> np.uint64(31))
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        word_hash = self._word_hash
+        hashes, lengths = [], []
+        for text in texts:
+            words = WORD_PATTERN.findall(text.lower())
+            hashes.extend(word_hash(word) for word in words)
+            lengths.append(len(words))
+
+        unigrams = np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+        rows = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)
+
+        # Bigrams pair each word with its successor inside the same text
+        same_text = rows[1:] == rows[:-1]
+        with np.errstate(over='ignore'):
+            bigrams = self._mix(unigrams[:-1][same_text] * np.uint64(31) + unigrams[1:][same_text])
+        features = np.concatenate([unigrams, bigrams])
+        feature_rows = np.concatenate([rows, rows[1:][same_text]])
+
+        cols = (features % np.uint64(self.dim)).astype(np.int64)
+        signs = np.where(features >> np.uint64(63), 1.0, -1.0)
+
+        # One bincount over flattened (row, col) indices accumulates every feature at once
+        counts = np.bincount(feature_rows * self.dim + cols, weights=signs, minlength=len(texts) * self.dim)
+        matrix = counts.reshape(len(texts), self.dim).astype(np.float32)
+        # Sublinear term frequency keeps long sections from dominating
+        return np.sign(matrix) * np.log1p(np.abs(matrix))
+
+
+class OpenAIBackend:
+    """OpenAI embeddings API using the shared pooled client from scripts/api_client.py.
+
+    The API rejects an input over the model's token limit and a request over
+    its token budget, so sections longer than MAX_INPUT_TOKENS are split into
+    chunks whose vectors are averaged (weighted by length), and each batch is
+    sent as however many requests keep under MAX_REQUEST_TOKENS. Both limits
+    sit below the API's (8,191 per input, 300,000 per request) because
+    estimate_tokens is only approximate for dense regulatory text.
+    """
+
+    MAX_INPUT_TOKENS = 6000
+    MAX_REQUEST_TOKENS = 200_000
+    MAX_REQUEST_INPUTS = 2048
+
+    def __init__(self, model: str = 'text-embedding-3-small', dim: int = None):
+        if str(SCRIPTS_DIR) not in sys.path:
+            sys.path.insert(0, str(SCRIPTS_DIR))
+        from api_client import create_client, load_settings
+
+        self.client = create_client(load_settings())
+        self.model = model
+        self.dim = dim
+        self.model_id = f"openai:{model}" + (f":{dim}" if dim else '')
+
+    def _request(self, inputs: List[str]) -> List[List[float]]:
+        kwargs = {'dimensions': self.dim} if self.dim else {}
+        response = self.client.embeddings.create(model=self.model, input=inputs, **kwargs)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        chunks, owners = [], []
+        for i, text in enumerate(texts):
+            pieces = split_to_token_limit(text, self.MAX_INPUT_TOKENS)
+            chunks.extend(pieces)
+            owners.extend([i] * len(pieces))
+
+        vectors, request, request_tokens = [], [], 0
+        for chunk in chunks:
+            tokens = estimate_tokens(chunk)
+            if request and (request_tokens + tokens > self.MAX_REQUEST_TOKENS
+                            or len(request) >= self.MAX_REQUEST_INPUTS):
+                vectors.extend(self._request(request))
+                request, request_tokens = [], 0
+            request.append(chunk)
+            request_tokens += tokens
+        if request:
+            vectors.extend(self._request(request))
+
+        if len(chunks) == len(texts):
+            return np.asarray(vectors, dtype=np.float32)
+        # Length-weighted mean of each text's chunk vectors
+        matrix = np.zeros((len(texts), len(vectors[0])), dtype=np.float32)
+        weights = np.asarray([max(len(chunk), 1) for chunk in chunks], dtype=np.float32)
+        np.add.at(matrix, owners, np.asarray(vectors, dtype=np.float32) * weights[:, None])
+        return matrix / np.bincount(owners, weights=weights, minlength=len(texts))[:, None].astype(np.float32)
+
+
+class SentenceTransformerBackend:
+    """Local sentence-transformers model (e.g. bge-base) on CPU or GPU."""
+
+    def __init__(self, model: str = 'BAAI/bge-base-en-v1.5', dim: int = None):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model)
+        self.model_id = f"st:{model}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(
+            self.model.encode(texts, batch_size=len(texts), convert_to_numpy=True, normalize_embeddings=False),
+            dtype=np.float32,
+        )
+
+
+BACKENDS = {
+    'hashing': HashingBackend,
+    'openai': OpenAIBackend,
+    'sentence-transformers': SentenceTransformerBackend,
+}
+
+DEFAULT_BATCH_SIZES = {
+    'hashing': 1024,
+    'openai': 256,
+    'sentence-transformers': 64,
+}
+
+
+def create_backend(name: str, model: str = None, dim: int = None):
+    """Instantiate an embedding backend by name."""
+    backend_class = BACKENDS[name]
+    if name == 'hashing':
+        return backend_class(dim or 768)
+    kwargs = {'dim': dim}
+    if model:
+        kwargs['model'] = model
+    return backend_class(**kwargs)
+
+
+def backend_for_model_id(model_id: str):
+    """Recreate the backend that produced a store from its recorded model ID."""
+    match = re.fullmatch(r'hashing-(\d+)-v1', model_id or '')
+    if match:
+        return HashingBackend(int(match.group(1)))
+    if model_id and model_id.startswith('openai:'):
+        parts = model_id.split(':')
+        return OpenAIBackend(parts[1], int(parts[2]) if len(parts) > 2 else None)
+    if model_id and model_id.startswith('st:'):
+        return SentenceTransformerBackend(model_id[len('st:'):])
+    raise ValueError(f"Cannot infer an embedding backend from model ID {model_id!r}; pass --backend")
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize every row in place; all-zero rows are left as zeros."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def split_to_token_limit(text: str, max_tokens: int) -> List[str]:
+    """Split text into pieces of at most max_tokens estimated tokens, at whitespace where possible."""
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+    max_chars = max_tokens * 4
+    pieces, start = [], 0
+    while start < len(text):
+        end = min(start + max_chars, len(text))
+        if end < len(text):
+            # Prefer a paragraph, then a line, then a word boundary in the back half of the window
+            for separator in ('\n\n', '\n', ' '):
+                cut = text.rfind(separator, start + max_chars // 2, end)
+                if cut > start:
+                    end = cut + len(separator)
+                    break
+        pieces.append(text[start:end])
+        start = end
+    return pieces
+
+
+def batched(items: List, batch_size: int) -> Iterator[List]:
+    for start in range(0, len(items), batch_size):
+        yield items[start:start + batch_size]
+
+
+def embed_texts(texts: List[str], backend, batch_size: int) -> np.ndarray:
+    """Embed texts in batches and return the backend's raw float32 vectors."""
+    batches = []
+    for i, batch in enumerate(batched(texts, batch_size)):
+        batches.append(np.asarray(backend.embed(batch), dtype=np.float32))
+        if (i + 1) % 10 == 0:
+            logger.info(f"Embedded {min((i + 1) * batch_size, len(texts))}/{len(texts)} sections")
+    return np.vstack(batches)
+
+
+def embed_sections(sections: List[Dict], backend, batch_size: int, cache: EmbeddingCache = None) -> np.ndarray:
+    """Embed section texts in batches and return an L2-normalized float32 matrix.
+
+    With a cache, only texts missing from it are embedded (each distinct text
+    once), and new vectors are stored batch by batch so an interrupted run
+    keeps its progress.
+    """
+    texts = [section_text(section) for section in sections]
+    if not texts:
+        return np.zeros((0, getattr(backend, 'dim', None) or 0), dtype=np.float32)
+    if cache is None:
+        return normalize_rows(embed_texts(texts, backend, batch_size))
+
+    hashes = [text_hash(text) for text in texts]
+    vectors = cache.get_many(backend.model_id, hashes)
+    misses = {key: text for key, text in zip(hashes, texts) if key not in vectors}
+    hits = sum(key in vectors for key in hashes)
+    logger.info(f"Embedding cache: {hits} hits, {len(misses)} distinct texts to embed")
+
+    miss_keys = list(misses)
+    for keys in batched(miss_keys, batch_size * 10):
+        embedded = embed_texts([misses[key] for key in keys], backend, batch_size)
+        new_vectors = dict(zip(keys, embedded))
+        cache.put_many(backend.model_id, new_vectors)
+        vectors.update(new_vectors)
+
+    return normalize_rows(np.vstack([vectors[key] for key in hashes]).astype(np.float32))
+
+
+def write_embedding_json(section_ids: List[str], matrix: np.ndarray, output_path: Path, precision: int = 6):
+    """Write vectors as {sectionId: [floats]} like data-local/embeddings/*.json."""
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    rounded = np.round(matrix, precision).tolist()
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(dict(zip(section_ids, rounded)), f, separators=(',', ':'))
+
+
+def default_output_dir(model_id: str) -> Path:
+    slug = re.sub(r'[^A-Za-z0-9.-]+', '-', model_id).strip('-')
+    return BUILD_DIR / 'embeddings' / slug
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Embed regulation sections in batches")
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='hashing')
+    parser.add_argument('--model', default=None, help="Model name for the openai/sentence-transformers backends")
+    parser.add_argument('--dim', type=int, default=None, help="Embedding dimension (hashing, or openai v3 models)")
+    parser.add_argument('--batch-size', type=int, default=None)
+    parser.add_argument('--documents', nargs='*', default=None, choices=sorted(DOCUMENTS))
+    parser.add_argument('--data-dir', type=Path, default=DATA_DIR, help="Directory with the converted Markdown")
+    parser.add_argument('--output-dir', type=Path, default=None)
+    parser.add_argument('--format', choices=['json', 'store', 'both'], default='both',
+                        help="Per-document JSON files, a binary embedding store, or both")
+    parser.add_argument('--cache', type=Path, default=DEFAULT_CACHE_PATH, help="Embedding cache database")
+    parser.add_argument('--no-cache', action='store_true', help="Embed every section, bypassing the cache")
+    parser.add_argument('--near-duplicates', type=Path, default=None,
+                        help="Clusters from near_duplicates.py; members reuse their representative's vector")
+    evict = parser.add_mutually_exclusive_group()
+    evict.add_argument('--evict', action='store_true',
+                       help="Evict cache entries for text not in this corpus, even outside the default data dir")
+    evict.add_argument('--no-evict', action='store_true',
+                       help="Keep cache entries for text no longer in the corpus")
+    parser.add_argument('--swap', action='store_true',
+                        help="Write the store as a new generation and swap it in atomically (store format only)")
+    parser.add_argument('--quantize', action='store_true',
+                        help="Also write int8 and PQ variants of the store with a recall@10 report")
+    parser.add_argument('--pq', type=int, nargs='*', default=[8, 16, 32],
+                        help="PQ subquantizer counts used with --quantize")
+    args = parser.parse_args()
+    if args.swap and args.format != 'store':
+        parser.error("--swap requires --format store")
+
+    backend = create_backend(args.backend, args.model, args.dim)
+    batch_size = args.batch_size or DEFAULT_BATCH_SIZES[args.backend]
+    output_dir = args.output_dir or default_output_dir(backend.model_id)
+
+    sections = list(iter_sections(args.documents, args.data_dir))
+    logger.info(f"Embedding {len(sections)} sections with {backend.model_id} (batch size {batch_size})")
+
+    duplicate_of = {}
+    if args.near_duplicates:
+        section_ids = {section['id'] for section in sections}
+        duplicate_of = {
+            member: representative for member, representative in load_representatives(args.near_duplicates).items()
+            if member in section_ids and representative in section_ids
+        }
+        logger.info(f"Collapsing {len(duplicate_of)} near-duplicate sections onto their representatives")
+    unique = [section for section in sections if section['id'] not in duplicate_of]
+
+    cache = None if args.no_cache else EmbeddingCache(args.cache)
+    start = time.perf_counter()
+    matrix = embed_sections(unique, backend, batch_size, cache)
+    if duplicate_of:
+        row = {section['id']: i for i, section in enumerate(unique)}
+        matrix = matrix[[row[duplicate_of.get(section['id'], section['id'])] for section in sections]]
+    elapsed = time.perf_counter() - start
+    if cache is not None:
+        # Only a full run over the cache's own corpus knows which texts are gone for good
+        own_corpus = args.data_dir.resolve() == DATA_DIR.resolve() or args.evict
+        if args.documents is None and own_corpus and not args.no_evict:
+            evicted = cache.evict(backend.model_id, (text_hash(section_text(s)) for s in sections))
+            logger.info(f"Evicted {evicted} stale cache entries")
+        cache.close()
+    logger.info(f"Embedded {len(sections)} sections in {elapsed:.2f}s "
+                f"({len(sections) / elapsed if elapsed else 0:.0f} sections/s)")
+
+    if args.format in ('json', 'both'):
+        for document_id in args.documents or DOCUMENTS:
+            rows = [i for i, s in enumerate(sections) if s['document_id'] == document_id]
+            if not rows:
+                continue
+            output_path = output_dir / f"{document_id}.json"
+            write_embedding_json([sections[i]['id'] for i in rows], matrix[rows], output_path)
+            logger.info(f"Wrote {len(rows)} vectors to {output_path}")
+
+    if args.format in ('store', 'both'):
+        write_store(output_dir, [s['id'] for s in sections], matrix, backend.model_id, swap=args.swap)
+        logger.info(f"Wrote {len(sections)} x {matrix.shape[1]} embedding store to {output_dir}")
+        if args.quantize:
+            quantize_store(output_dir, args.pq)
+    elif args.quantize:
+        logger.warning("--quantize requires --format store or both; skipping quantization")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Persistent Embedding Cache
+
+SQLite table of embedding vectors keyed by (model ID, hash of the normalized
+section text). The embedding stage looks every section up here and sends only
+the misses to the model, so a weekly eCFR refresh re-embeds just the sections
+whose text changed. Entries for text that no longer exists in the corpus are
+evicted after a full run.
+
+Usage:
+    python embedding_cache.py stats
+    python embedding_cache.py clear --model-id hashing-768-v1
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from sections import BUILD_DIR
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = BUILD_DIR / 'embedding-cache.sqlite'
+WHITESPACE_PATTERN = re.compile(r'\s+')
+# SQLite's default limit on host parameters per statement is 999 on older builds
+QUERY_CHUNK = 500
+
+
+def text_hash(text: str) -> str:
+    """SHA-256 of the text with whitespace runs collapsed, so reflowed Markdown still hits."""
+    normalized = WHITESPACE_PATTERN.sub(' ', text).strip()
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def chunked(items: List, size: int = QUERY_CHUNK) -> Iterable[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class EmbeddingCache:
+    """Vectors are stored as raw float32 blobs exactly as the backend returned them."""
+
+    def __init__(self, path: Path = DEFAULT_CACHE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(self.path))
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model_id TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model_id, text_hash)
+            ) WITHOUT ROWID
+        """)
+        self.connection.commit()
+
+    def __enter__(self) -> 'EmbeddingCache':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def get_many(self, model_id: str, hashes: List[str]) -> Dict[str, np.ndarray]:
+        """Return cached vectors for the given hashes and mark them as used."""
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        for chunk in chunked(unique):
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.connection.execute(
+                f"SELECT text_hash, dim, vector FROM embeddings WHERE model_id = ? AND text_hash IN ({placeholders})",
+                [model_id, *chunk],
+            )
+            for key, dim, blob in rows:
+                found[key] = np.frombuffer(blob, dtype='<f4', count=dim)
+
+        now = time.time()
+        with self.connection:
+            self.connection.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE model_id = ? AND text_hash = ?",
+                [(now, model_id, key) for key in found],
+            )
+        return found
+
+    def put_many(self, model_id: str, vectors: Dict[str, np.ndarray]):
+        now = time.time()
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (model_id, text_hash, dim, vector, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (model_id, key, len(vector), np.asarray(vector, dtype='<f4').tobytes(), now)
+                    for key, vector in vectors.items()
+                ],
+            )
+
+    def evict(self, model_id: str, keep_hashes: Iterable[str]) -> int:
+        """Delete this model's entries whose text is not in keep_hashes; return the count removed."""
+        with self.connection:
+            self.connection.execute("CREATE TEMP TABLE IF NOT EXISTS keep (text_hash TEXT PRIMARY KEY)")
+            self.connection.execute("DELETE FROM keep")
+            self.connection.executemany("INSERT OR IGNORE INTO keep VALUES (?)", [(h,) for h in keep_hashes])
+            cursor = self.connection.execute(
+                "DELETE FROM embeddings WHERE model_id = ? AND text_hash NOT IN (SELECT text_hash FROM keep)",
+                (model_id,),
+            )
+            self.connection.execute("DELETE FROM keep")
+        return cursor.rowcount
+
+    def clear(self, model_id: Optional[str] = None) -> int:
+        with self.connection:
+            if model_id:
+                cursor = self.connection.execute("DELETE FROM embeddings WHERE model_id = ?", (model_id,))
+            else:
+                cursor = self.connection.execute("DELETE FROM embeddings")
+        return cursor.rowcount
+
+    def stats(self) -> Dict[str, Dict]:
+        rows = self.connection.execute(
+            "SELECT model_id, COUNT(*), SUM(LENGTH(vector)), MAX(last_used) FROM embeddings GROUP BY model_id"
+        )
+        return {
+            model_id: {'entries': count, 'vector_bytes': size, 'last_used': last_used}
+            for model_id, count, size, last_used in rows
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the embedding cache")
+    parser.add_argument('command', choices=['stats', 'clear'])
+    parser.add_argument('--cache', type=Path, default=DEFAULT_CACHE_PATH)
+    parser.add_argument('--model-id', default=None, help="Limit clear to one model")
+    args = parser.parse_args()
+
+    with EmbeddingCache(args.cache) as cache:
+        if args.command == 'stats':
+            print(json.dumps(cache.stats(), indent=2))
+        else:
+            removed = cache.clear(args.model_id)
+            logger.info(f"Removed {removed} cached embeddings from {args.cache}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Binary Memory-Mapped Embedding Store
+
+Stores section embeddings as one contiguous float32 matrix in NumPy .npy
+format plus a small JSON sidecar with the section IDs (row order) and each
+document's row offset and count. Loading uses np.load(mmap_mode='r'), so
+startup does not parse any numbers and the pages are shared by every
+process that opens the same store.
+
+Layout of a store directory:
+    embeddings.npy   float32 matrix, shape (sections, dim), C order
+    ids.json         {"format", "model_id", "dim", "count", "ids", "documents"}
+
+Written with swap=True, the store path is a symlink to a generation directory
+(<name>.<hex timestamp>) that is re-pointed with one atomic rename, so readers
+that resolve it see either the old or the new matrix and sidecar, never a mix.
+
+Usage:
+    python embedding_store.py convert embeddings/*.json --output build/embedding-store/toy
+    python embedding_store.py info build/embedding-store/toy
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+STORE_FORMAT = 'arrowreg-embeddings-v1'
+MATRIX_FILE = 'embeddings.npy'
+SIDECAR_FILE = 'ids.json'
+GENERATION_PATTERN = re.compile(r'\.[0-9a-f]{16}\Z')
+
+
+def document_of(section_id: str) -> str:
+    """Document ID of a `documentId_index` section ID."""
+    return section_id.rsplit('_', 1)[0]
+
+
+class EmbeddingStore:
+    """Read-only view of an embedding store; the matrix is memory-mapped by default."""
+
+    def __init__(self, matrix: np.ndarray, ids: List[str], documents: Dict[str, Dict], model_id: str = None):
+        self.matrix = matrix
+        self.ids = ids
+        self.documents = documents
+        self.model_id = model_id
+        self._rows = None
+
+    @classmethod
+    def open(cls, directory, mmap: bool = True) -> 'EmbeddingStore':
+        # Resolve a swapped store's symlink once so both files come from one generation
+        directory = Path(directory).resolve()
+        with open(directory / SIDECAR_FILE, 'r', encoding='utf-8') as f:
+            sidecar = json.load(f)
+        if sidecar.get('format') != STORE_FORMAT:
+            raise ValueError(f"{directory} is not an {STORE_FORMAT} store")
+
+        matrix = np.load(directory / MATRIX_FILE, mmap_mode='r' if mmap else None)
+        if matrix.shape != (sidecar['count'], sidecar['dim']):
+            raise ValueError(f"Matrix shape {matrix.shape} does not match sidecar in {directory}")
+        return cls(matrix, sidecar['ids'], sidecar['documents'], sidecar.get('model_id'))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1]
+
+    def row_of(self, section_id: str) -> int:
+        if self._rows is None:
+            self._rows = {section_id: row for row, section_id in enumerate(self.ids)}
+        return self._rows[section_id]
+
+    def vector(self, section_id: str) -> np.ndarray:
+        return self.matrix[self.row_of(section_id)]
+
+    def document_rows(self, document_id: str) -> slice:
+        entry = self.documents[document_id]
+        return slice(entry['offset'], entry['offset'] + entry['count'])
+
+    def document_matrix(self, document_id: str) -> np.ndarray:
+        return self.matrix[self.document_rows(document_id)]
+
+
+def atomic_write_bytes(path: Path, writer):
+    """Write a file via a temporary sibling and os.replace so readers never see a partial file."""
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, 'wb') as f:
+        writer(f)
+    os.replace(tmp_path, path)
+
+
+def swap_directory(link: Path, target: Path, keep: int = 2):
+    """Point link at target with an atomic rename, keeping the previous generation for open readers."""
+    if link.exists() and not link.is_symlink():
+        # A store written before swaps were used: move it aside once
+        link.rename(link.with_name(f"{link.name}.{time.time_ns():016x}"))
+    tmp_link = link.with_name(f".{link.name}.link")
+    if tmp_link.is_symlink():
+        tmp_link.unlink()
+    tmp_link.symlink_to(target.name)
+    os.replace(tmp_link, link)
+
+    previous = sorted(
+        (path for path in link.parent.glob(f"{link.name}.*")
+         if GENERATION_PATTERN.search(path.name[len(link.name):]) and path.is_dir() and path.name != target.name),
+        key=lambda path: path.stat().st_mtime_ns,
+    )
+    for old in previous[:len(previous) - (keep - 1)]:
+        shutil.rmtree(old)
+
+
+def write_store(directory, ids: List[str], matrix: np.ndarray, model_id: Optional[str] = None,
+                swap: bool = False) -> Path:
+    """Write a store, grouping rows by document so each document is one contiguous slice."""
+    directory = Path(directory)
+    if swap:
+        generation = directory.with_name(f"{directory.name}.{time.time_ns():016x}")
+        write_store(generation, ids, matrix, model_id)
+        swap_directory(directory, generation)
+        return directory
+    directory.mkdir(parents=True, exist_ok=True)
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim != 2 or matrix.shape[0] != len(ids):
+        raise ValueError(f"Expected a ({len(ids)}, dim) matrix, got {matrix.shape}")
+
+    # Stable grouping by document keeps section order within each document
+    document_order = list(dict.fromkeys(document_of(section_id) for section_id in ids))
+    rank = {document_id: i for i, document_id in enumerate(document_order)}
+    order = sorted(range(len(ids)), key=lambda i: rank[document_of(ids[i])])
+    ids = [ids[i] for i in order]
+    matrix = np.ascontiguousarray(matrix[order])
+
+    documents = {}
+    for row, section_id in enumerate(ids):
+        entry = documents.setdefault(document_of(section_id), {'offset': row, 'count': 0})
+        entry['count'] += 1
+
+    sidecar = {
+        'format': STORE_FORMAT,
+        'model_id': model_id,
+        'dim': int(matrix.shape[1]),
+        'count': len(ids),
+        'ids': ids,
+        'documents': documents,
+    }
+    atomic_write_bytes(directory / MATRIX_FILE, lambda f: np.save(f, matrix))
+    atomic_write_bytes(directory / SIDECAR_FILE, lambda f: f.write(json.dumps(sidecar).encode('utf-8')))
+    return directory
+
+
+def convert_json_embeddings(json_paths: List[Path], directory, model_id: Optional[str] = None) -> Path:
+    """Convert {sectionId: [floats]} JSON files into a single binary store."""
+    ids, vectors = [], []
+    for json_path in json_paths:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            embeddings = json.load(f)
+        for section_id, vector in embeddings.items():
+            ids.append(section_id)
+            vectors.append(vector)
+        logger.info(f"Read {len(embeddings)} vectors from {json_path}")
+
+    dims = {len(v) for v in vectors}
+    if len(dims) > 1:
+        raise ValueError(f"Inconsistent vector dimensions: {sorted(dims)}")
+    matrix = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), dims.pop() if dims else 0)
+    return write_store(directory, ids, matrix, model_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Binary memory-mapped embedding store")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert = subparsers.add_parser('convert', help="Convert JSON embedding files into a store")
+    convert.add_argument('inputs', nargs='+', type=Path)
+    convert.add_argument('--output', type=Path, required=True)
+    convert.add_argument('--model-id', default=None)
+
+    info = subparsers.add_parser('info', help="Describe a store")
+    info.add_argument('store', type=Path)
+
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        directory = convert_json_embeddings(args.inputs, args.output, args.model_id)
+        store = EmbeddingStore.open(directory)
+        json_bytes = sum(p.stat().st_size for p in args.inputs)
+        store_bytes = (directory / MATRIX_FILE).stat().st_size + (directory / SIDECAR_FILE).stat().st_size
+        logger.info(f"Wrote {len(store)} x {store.dim} store to {directory} "
+                    f"({json_bytes:,} JSON bytes -> {store_bytes:,} store bytes)")
+    else:
+        store = EmbeddingStore.open(args.store)
+        print(json.dumps({
+            'model_id': store.model_id,
+            'count': len(store),
+            'dim': store.dim,
+            'documents': store.documents,
+        }, indent=2))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Offline Retrieval Evaluation
+
+Runs the golden queries (golden_queries.json) through keyword, vector and
+hybrid retrieval over the local artifacts and reports recall@k, MRR and
+nDCG@k against the graded relevant sections, plus per-query latency
+percentiles for each method. Golden expectations name a document and a
+section number or heading title, never a positional section ID; they are
+resolved against the sections at load time. Queries whose expectations are
+not all in the corpus are reported as unresolved and left out of the
+metrics rather than scored against the wrong sections. Retrieval mirrors LocalSearchService:
+
+    keyword   TF-IDF over nlp.index_terms (see keyword_index.py)
+    vector    cosine similarity, sections with cosine <= 0 dropped
+    hybrid    keyword score + cosine, as the backend adds them
+
+Vectors come from the committed data-local/embeddings/*.json with the
+backend's vocabulary query embedding (what the Worker serves today), or from
+an embedding store built by embed_sections.py (--store).
+
+Reports are versioned JSON written under reports/; pass --baseline with an
+earlier report to print quality and latency deltas.
+
+Usage:
+    python evaluate_retrieval.py
+    python evaluate_retrieval.py --store build/embeddings/hashing-768-v1 --baseline ../reports/retrieval-eval-20250101-120000.json
+"""
+
+import argparse
+import json
+import logging
+import math
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from embed_sections import backend_for_model_id, normalize_rows
+from embedding_store import EmbeddingStore
+from keyword_index import KeywordIndex, rank
+from nlp import process_text
+from search_embeddings import embed_queries
+from sections import DATA_DIR, DOCUMENTS, SCRIPTS_DIR, iter_sections
+
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+from perf_stats import latency_summary  # noqa: E402
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+REPORT_VERSION = 1
+REPO_ROOT = DATA_DIR.parent
+GOLDEN_PATH = DATA_DIR / 'golden_queries.json'
+
+# Vocabulary of the backend's deterministic query embedding (LocalSearchService EMBEDDING_VOCAB)
+EMBEDDING_VOCAB = [
+    'survey', 'inspection', 'vessel', 'navigation', 'mariners',
+    'bridge', 'lighting', 'stability', 'passenger',
+]
+
+
+def vocabulary_query_embedding(query: str) -> np.ndarray:
+    """Port of LocalSearchService.computeQueryEmbedding."""
+    vector = np.zeros(len(EMBEDDING_VOCAB), dtype=np.float32)
+    positions = {term: i for i, term in enumerate(EMBEDDING_VOCAB)}
+    for token in process_text(query):
+        if token in positions:
+            vector[positions[token]] += 1
+    return vector
+
+
+class VectorRetriever:
+    """Cosine similarity of a query embedding against row-normalized section vectors."""
+
+    def __init__(self, ids: List[str], matrix: np.ndarray, embed_query: Callable[[str], np.ndarray],
+                 description: str):
+        self.ids = ids
+        self.matrix = normalize_rows(np.array(matrix, dtype=np.float32))
+        self.embed_query = embed_query
+        self.description = description
+
+    @classmethod
+    def from_backend_json(cls, embeddings_dir: Path = DATA_DIR / 'embeddings') -> 'VectorRetriever':
+        ids, vectors = [], []
+        for document_id in DOCUMENTS:
+            path = embeddings_dir / f"{document_id}.json"
+            if path.exists():
+                embeddings = json.loads(path.read_text(encoding='utf-8'))
+                ids.extend(embeddings)
+                vectors.extend(embeddings.values())
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(len(ids), len(EMBEDDING_VOCAB))
+        return cls(ids, matrix, vocabulary_query_embedding, f"backend-json:{embeddings_dir.name}")
+
+    @classmethod
+    def from_store(cls, directory: Path) -> 'VectorRetriever':
+        store = EmbeddingStore.open(directory)
+        backend = backend_for_model_id(store.model_id)
+        return cls(store.ids, store.matrix, lambda query: embed_queries([query], backend)[0],
+                   f"store:{store.model_id}")
+
+    def score(self, query: str) -> Dict[str, float]:
+        vector = np.asarray(self.embed_query(query), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return {}
+        cosines = self.matrix @ (vector / norm)
+        positive = np.flatnonzero(cosines > 0)
+        return {self.ids[i]: float(cosines[i]) for i in positive}
+
+
+def hybrid_scores(keyword: Dict[str, float], vector: Dict[str, float]) -> Dict[str, float]:
+    """Keyword scores with cosine added, new sections appended in embedding order like the backend."""
+    scores = dict(keyword)
+    for section_id, cosine in vector.items():
+        scores[section_id] = scores.get(section_id, 0.0) + cosine
+    return scores
+
+
+def title_key(title: str) -> str:
+    return ' '.join(title.split()).casefold()
+
+
+def resolve_golden(golden: Dict, sections: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """Golden queries with `relevant` as {sectionId: grade}, and the queries that could not be resolved.
+
+    An expectation {"document", "section" | "title", "grade"} must match
+    exactly one section of its document, by section_number or by heading
+    title (whitespace and case folded); no match or several is unresolved.
+    """
+    by_number: Dict[Tuple[str, str], List[str]] = {}
+    by_title: Dict[Tuple[str, str], List[str]] = {}
+    for section in sections:
+        document_id = section['document_id']
+        if section.get('section_number'):
+            by_number.setdefault((document_id, section['section_number']), []).append(section['id'])
+        by_title.setdefault((document_id, title_key(section['title'])), []).append(section['id'])
+
+    cases, unresolved = [], []
+    for case in golden['queries']:
+        relevant, problems = {}, []
+        for expected in case['relevant']:
+            if 'section' in expected:
+                label = f"{expected['document']} {expected['section']}"
+                matches = by_number.get((expected['document'], expected['section']), [])
+            else:
+                label = f"{expected['document']} \"{expected['title']}\""
+                matches = by_title.get((expected['document'], title_key(expected['title'])), [])
+            if len(matches) == 1:
+                relevant[matches[0]] = expected['grade']
+            else:
+                problems.append(f"{label}: {'no section' if not matches else f'{len(matches)} sections'}")
+        if problems:
+            unresolved.append({'id': case['id'], 'problems': problems})
+        else:
+            cases.append({**case, 'relevant': relevant})
+    return cases, unresolved
+
+
+def recall_at(ranked: List[str], relevant: Dict[str, int], k: int) -> float:
+    return len(set(ranked[:k]) & set(relevant)) / len(relevant) if relevant else 0.0
+
+
+def reciprocal_rank(ranked: List[str], relevant: Dict[str, int]) -> float:
+    for position, section_id in enumerate(ranked, start=1):
+        if relevant.get(section_id, 0) > 0:
+            return 1.0 / position
+    return 0.0
+
+
+def ndcg_at(ranked: List[str], relevant: Dict[str, int], k: int) -> float:
+    """nDCG with exponential gain (2^grade - 1) and log2 position discount."""
+    dcg = sum((2 ** relevant.get(section_id, 0) - 1) / math.log2(i + 2) for i, section_id in enumerate(ranked[:k]))
+    ideal = sorted(relevant.values(), reverse=True)[:k]
+    idcg = sum((2 ** grade - 1) / math.log2(i + 2) for i, grade in enumerate(ideal))
+    return dcg / idcg if idcg else 0.0
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def evaluate(cases: List[Dict], methods: Dict[str, Callable[[str], Dict[str, float]]], ks: List[int],
+             repeat: int = 5) -> Tuple[Dict, List[Dict]]:
+    """Run every resolved golden query through every method; return (per-method summary, per-query rows)."""
+    max_k = max(ks)
+    timings: Dict[str, List[float]] = {name: [] for name in methods}
+    totals: Dict[str, Dict[str, float]] = {name: {} for name in methods}
+    per_query = []
+
+    for case in cases:
+        relevant = case['relevant']
+        row = {'id': case['id'], 'query': case['query'], 'methods': {}}
+        for name, score_fn in methods.items():
+            ranked = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                ranked = [section_id for section_id, _ in rank(score_fn(case['query']), max_k)]
+                timings[name].append(time.perf_counter() - start)
+
+            metrics = {'mrr': reciprocal_rank(ranked, relevant)}
+            for k in ks:
+                metrics[f'recall@{k}'] = recall_at(ranked, relevant, k)
+                metrics[f'ndcg@{k}'] = ndcg_at(ranked, relevant, k)
+            for metric, value in metrics.items():
+                totals[name][metric] = totals[name].get(metric, 0.0) + value
+            row['methods'][name] = {'ranked': ranked, **{m: round(v, 4) for m, v in metrics.items()}}
+        per_query.append(row)
+
+    count = len(cases) or 1
+    summary = {
+        name: {
+            'metrics': {metric: round(total / count, 4) for metric, total in totals[name].items()},
+            'latency': latency_summary(timings[name]),
+        }
+        for name in methods
+    }
+    return summary, per_query
+
+
+def print_summary(summary: Dict, baseline: Optional[Dict] = None):
+    for name, result in summary.items():
+        previous = (baseline or {}).get('methods', {}).get(name)
+        print(f"\n{name}")
+        for metric, value in result['metrics'].items():
+            delta = ''
+            if previous and metric in previous['metrics']:
+                delta = f"  ({value - previous['metrics'][metric]:+.4f})"
+            print(f"  {metric:<12} {value:.4f}{delta}")
+        latency = result['latency']
+        delta = ''
+        if previous:
+            delta = f"  (p95 {latency['p95_ms'] - previous['latency']['p95_ms']:+.3f} ms)"
+        print(f"  latency      p50 {latency['p50_ms']:.3f} ms  p95 {latency['p95_ms']:.3f} ms  "
+              f"p99 {latency['p99_ms']:.3f} ms{delta}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate keyword, vector and hybrid retrieval on golden queries")
+    parser.add_argument('--golden', type=Path, default=GOLDEN_PATH)
+    parser.add_argument('--store', type=Path, default=None,
+                        help="Embedding store for vector retrieval (default: committed backend embeddings)")
+    parser.add_argument('--k', type=int, nargs='+', default=[1, 3, 5, 10])
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per query and method")
+    parser.add_argument('--output', type=Path, default=None, help="Report path (default reports/retrieval-eval-<ts>.json)")
+    parser.add_argument('--baseline', type=Path, default=None, help="Earlier report to compare against")
+    args = parser.parse_args()
+
+    golden = json.loads(args.golden.read_text(encoding='utf-8'))
+    sections = list(iter_sections())
+    cases, unresolved = resolve_golden(golden, sections)
+    for case in unresolved:
+        logger.warning(f"Skipping golden query {case['id']}: {'; '.join(case['problems'])}")
+    keyword_index = KeywordIndex.from_sections(sections)
+    vectors = VectorRetriever.from_store(args.store) if args.store else VectorRetriever.from_backend_json()
+    logger.info(f"Evaluating {len(cases)} of {len(golden['queries'])} queries over {len(sections)} sections "
+                f"(vectors: {vectors.description})")
+
+    methods = {
+        'keyword': keyword_index.score,
+        'vector': vectors.score,
+        'hybrid': lambda query: hybrid_scores(keyword_index.score(query), vectors.score(query)),
+    }
+    summary, per_query = evaluate(cases, methods, sorted(set(args.k)), args.repeat)
+
+    report = {
+        'report_version': REPORT_VERSION,
+        'generated_at': datetime.now().isoformat(),
+        'git_commit': git_commit(),
+        'golden': {'path': str(args.golden), 'version': golden.get('version'), 'queries': len(golden['queries']),
+                   'evaluated': len(cases), 'unresolved': unresolved},
+        'corpus': {'sections': len(sections), 'documents': sorted({s['document_id'] for s in sections})},
+        'vectors': vectors.description,
+        'k': sorted(set(args.k)),
+        'repeat': args.repeat,
+        'methods': summary,
+        'queries': per_query,
+    }
+
+    baseline = None
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+        if baseline.get('report_version') != REPORT_VERSION:
+            logger.warning(f"Baseline report version {baseline.get('report_version')} != {REPORT_VERSION}; "
+                           "deltas may not be comparable")
+    print_summary(summary, baseline)
+
+    output = args.output or REPO_ROOT / 'reports' / f"retrieval-eval-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding='utf-8')
+    logger.info(f"Wrote report to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Keyword Index Mirroring LocalSearchService
+
+In-memory inverted index over section records (see sections.py) that counts
+the same terms (nlp.index_terms) and scores queries with the same formula as
+the backend: for every distinct query term, tf / section length * idf with
+idf = ln((sections + 1) / (df + 1)) + 1, summed per section.
+
+The `build` command writes the index as a prebuilt artifact that
+LocalSearchService loads at startup instead of tokenizing every section:
+
+    {
+      "format": "arrowreg-keyword-index-v1",
+      "documents": {documentId: sha256 of the Markdown source},
+      "sections": [sectionId, ...],        section ordinals, in backend load order
+      "section_lengths": [terms, ...],     per ordinal
+      "terms": [term, ...],                sorted
+      "df": [sections containing term, ...],
+      "postings": [[ordinal, tf, ordinal, tf, ...], ...]
+    }
+
+The backend uses the artifact only when every document hash matches the
+Markdown it loaded, and otherwise falls back to indexing at startup.
+
+Usage:
+    python keyword_index.py build
+    python keyword_index.py search "stability tests passenger vessels"
+    python keyword_index.py parity-fixture
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import math
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from embedding_store import atomic_write_bytes, document_of
+from nlp import extract_maritime_terms, index_terms, process_text
+from sections import DATA_DIR, DOCUMENTS, iter_sections, section_text
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT = 'arrowreg-keyword-index-v1'
+INDEX_PATH = DATA_DIR / 'index' / 'keyword-index.json'
+PARITY_FIXTURE_PATH = DATA_DIR.parent / 'backend' / 'tests' / 'fixtures' / 'nlp-parity.json'
+
+# Edge cases for the JS/Python tokenizer parity test, on top of the corpus sections
+PARITY_SAMPLES = [
+    "Fire detection requirements for OSVs according to 46 CFR 109?",
+    "The vessel's surveys, inspections & drydocking (ABS 7-1-2).",
+    "fire\u00a0detection and LIFE   SAVING appliances; Offshore\tSupply\nVessel",
+    "Machinery\u2028space, emergency equipment and\ufeffaccommodation",
+    "Code of Federal Regulations \u00a7 151.10 \u2014 oil discharge",
+    "caf\u00e9 na\u00efve \u00c5ngstr\u00f6m \u0130stanbul \u017fhip \u212aelvin",
+    "snake_case words_with_underscores and digits 2024 0.5",
+    "Tabs\tand\x1cfile\x1dseparators\x85next line",
+    "SOLAS safety of life at sea NVIC navigation and vessel inspection circular",
+    "surveying surveyed surveys survey is was ing ed s",
+    "\ud83d\udea2 emoji ship \U0001f6a2 astral",
+    "",
+]
+
+
+class KeywordIndex:
+    """Postings of term -> {section ID: tf}, plus per-section term counts."""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.section_lengths: Dict[str, int] = {}
+        self.section_documents: Dict[str, str] = {}
+
+    @classmethod
+    def from_sections(cls, sections: Iterable[Dict]) -> 'KeywordIndex':
+        index = cls()
+        for section in sections:
+            index.add_section(section)
+        return index
+
+    @property
+    def total_sections(self) -> int:
+        return len(self.section_lengths)
+
+    def add_section(self, section: Dict):
+        terms = index_terms(section_text(section))
+        self.section_lengths[section['id']] = len(terms)
+        self.section_documents[section['id']] = section['document_id']
+        counts: Dict[str, int] = {}
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+        for term, count in counts.items():
+            self.postings.setdefault(term, {})[section['id']] = count
+
+    def idf(self, term: str) -> float:
+        return math.log((self.total_sections + 1) / (len(self.postings.get(term, ())) + 1)) + 1
+
+    def score(self, query: str, sources: Optional[List[str]] = None) -> Dict[str, float]:
+        """Keyword score per matching section, in the backend's accumulation order."""
+        scores: Dict[str, float] = {}
+        for term in dict.fromkeys(process_text(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            for section_id, tf in postings.items():
+                if sources and self.section_documents[section_id] not in sources:
+                    continue
+                score = tf / self.section_lengths[section_id] * idf
+                scores[section_id] = scores.get(section_id, 0.0) + score
+        return scores
+
+    def search(self, query: str, k: int = 10, sources: Optional[List[str]] = None) -> List[Tuple[str, float]]:
+        return rank(self.score(query, sources), k)
+
+    def to_artifact(self, document_hashes: Dict[str, str]) -> Dict:
+        """Serialize with postings in section load order, the order the backend would insert them."""
+        section_ids = list(self.section_lengths)
+        ordinals = {section_id: i for i, section_id in enumerate(section_ids)}
+        terms = sorted(self.postings)
+        return {
+            'format': INDEX_FORMAT,
+            'documents': document_hashes,
+            'sections': section_ids,
+            'section_lengths': [self.section_lengths[section_id] for section_id in section_ids],
+            'terms': terms,
+            'df': [len(self.postings[term]) for term in terms],
+            'postings': [
+                [value for section_id, tf in self.postings[term].items() for value in (ordinals[section_id], tf)]
+                for term in terms
+            ],
+        }
+
+    @classmethod
+    def from_artifact(cls, artifact: Dict) -> 'KeywordIndex':
+        if artifact.get('format') != INDEX_FORMAT:
+            raise ValueError(f"Not an {INDEX_FORMAT} artifact")
+        index = cls()
+        section_ids = artifact['sections']
+        for section_id, length in zip(section_ids, artifact['section_lengths']):
+            index.section_lengths[section_id] = length
+            index.section_documents[section_id] = document_of(section_id)
+        for term, flat in zip(artifact['terms'], artifact['postings']):
+            index.postings[term] = {section_ids[flat[i]]: flat[i + 1] for i in range(0, len(flat), 2)}
+        return index
+
+
+def rank(scores: Dict[str, float], k: int) -> List[Tuple[str, float]]:
+    """Highest scores first; ties keep insertion order, like the backend's stable sort."""
+    return sorted(scores.items(), key=lambda item: -item[1])[:k]
+
+
+def document_hashes(data_dir: Path = DATA_DIR) -> Dict[str, str]:
+    """SHA-256 of each converted Markdown document present on disk, as the backend computes it."""
+    hashes = {}
+    for document_id, filename in DOCUMENTS.items():
+        path = Path(data_dir) / filename
+        if path.exists():
+            hashes[document_id] = hashlib.sha256(path.read_text(encoding='utf-8').encode('utf-8')).hexdigest()
+    return hashes
+
+
+def build_index_artifact(output: Path = INDEX_PATH, data_dir: Path = DATA_DIR) -> Dict:
+    index = KeywordIndex.from_sections(iter_sections(data_dir=data_dir))
+    artifact = index.to_artifact(document_hashes(data_dir))
+    output.parent.mkdir(parents=True, exist_ok=True)
+    data = (json.dumps(artifact, separators=(',', ':'), ensure_ascii=False) + '\n').encode('utf-8')
+    atomic_write_bytes(output, lambda f: f.write(data))
+    logger.info(f"Wrote keyword index with {len(artifact['terms'])} terms over "
+                f"{len(artifact['sections'])} sections to {output}")
+    return artifact
+
+
+def write_parity_fixture(output: Path = PARITY_FIXTURE_PATH):
+    """Expected processText/extractMaritimeTerms output for the backend's parity test."""
+    texts = PARITY_SAMPLES + [section_text(section) for section in iter_sections()]
+    cases = [
+        {'text': text, 'process_text': process_text(text), 'maritime_terms': extract_maritime_terms(text)}
+        for text in texts
+    ]
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(cases, indent=2, ensure_ascii=True) + '\n', encoding='utf-8')
+    logger.info(f"Wrote {len(cases)} tokenizer parity cases to {output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend-compatible keyword index")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help="Write the prebuilt index artifact for the backend")
+    build.add_argument('--output', type=Path, default=INDEX_PATH)
+    build.add_argument('--data-dir', type=Path, default=DATA_DIR)
+
+    search = subparsers.add_parser('search', help="Search the converted documents")
+    search.add_argument('query', nargs='+')
+    search.add_argument('-k', type=int, default=10)
+
+    fixture = subparsers.add_parser('parity-fixture', help="Write the JS tokenizer parity fixture")
+    fixture.add_argument('--output', type=Path, default=PARITY_FIXTURE_PATH)
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        build_index_artifact(args.output, args.data_dir)
+    elif args.command == 'search':
+        index = KeywordIndex.from_sections(iter_sections())
+        for section_id, score in index.search(' '.join(args.query), args.k):
+            print(json.dumps({'id': section_id, 'score': score}))
+    else:
+        write_parity_fixture(args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Near-Duplicate Section Detection (MinHash + LSH)
+
+Finds clusters of near-identical sections (reserved sections, parallel
+vessel-class requirements, repeated definitions) so later stages can embed
+and upload one representative per cluster instead of every copy.
+
+    shingles     word 3-grams of the section title (without its numbering)
+                 and content, hashed to 64 bits
+    signatures   --permutations multiply-shift hash functions; each section's
+                 signature is the per-function minimum over its shingles
+                 (NumPy, in section-aligned chunks)
+    LSH          signatures cut into --bands bands; sections sharing a band
+                 bucket become candidates (each compared with the bucket's
+                 first member, so huge buckets stay linear)
+    verify       candidates whose estimated Jaccard similarity (fraction of
+                 equal signature entries) reaches --threshold are merged
+                 with union-find
+
+Everything is linear in corpus size apart from sorting the band keys. The
+representative of a cluster is its longest section (first in corpus order
+on ties).
+
+Artifact (build/near-duplicates.json):
+    {
+      "format": "arrowreg-near-duplicates-v1",
+      "documents": {documentId: sha256},
+      "params": {...},
+      "clusters": [{"representative": sectionId, "members": [sectionId, ...],
+                    "min_similarity": float}, ...]
+    }
+
+Usage:
+    python near_duplicates.py build [--threshold 0.8] [--data-dir build/synthetic]
+    python near_duplicates.py show [-n 20]
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from embedding_store import atomic_write_bytes
+from keyword_index import document_hashes
+from nlp import tokenize
+from sections import BUILD_DIR, DATA_DIR, iter_sections
+from typeahead_index import title_key
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+NEAR_DUPLICATES_FORMAT = 'arrowreg-near-duplicates-v1'
+NEAR_DUPLICATES_PATH = BUILD_DIR / 'near-duplicates.json'
+SHINGLE_SIZE = 3
+PERMUTATIONS = 128
+BANDS = 16
+# Bands of 8 rows make ~0.7 the similarity at which a pair becomes a candidate with probability 1/2
+THRESHOLD = 0.8
+CHUNK_SHINGLES = 16384
+SEED = 0
+
+MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def section_tokens(section: Dict) -> List[str]:
+    return tokenize(f"{title_key(section['title'])} {section['content']}")
+
+
+def shingle_hashes(sections: List[Dict], k: int = SHINGLE_SIZE):
+    """64-bit hashes of every section's word k-shingles and the offset of each section's run.
+
+    A section shorter than k words contributes one shingle of all its words;
+    a section without words contributes none.
+    """
+    vocabulary: Dict[str, int] = {}
+    ids, offsets = [], [0]
+    for section in sections:
+        for token in section_tokens(section):
+            ids.append(vocabulary.setdefault(token, len(vocabulary) + 1))
+        offsets.append(len(ids))
+    ids = np.asarray(ids, dtype=np.uint64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+
+    lengths = np.diff(offsets)
+    counts = np.where(lengths >= k, lengths - k + 1, (lengths > 0).astype(np.int64))
+    owner = np.repeat(np.arange(len(sections)), counts)
+    run_starts = np.concatenate(([0], np.cumsum(counts)))
+    positions = offsets[owner] + (np.arange(run_starts[-1]) - run_starts[owner])
+
+    # Positions past the end of a section read the padding ID 0
+    padded = np.append(ids, np.uint64(0))
+    ends = offsets[owner + 1]
+    hashes = np.zeros(len(positions), dtype=np.uint64)
+    for j in range(k):
+        p = positions + j
+        hashes = (hashes ^ padded[np.where(p < ends, p, len(ids))]) * MIX
+        hashes ^= hashes >> np.uint64(29)
+    return hashes, run_starts
+
+
+def minhash_signatures(hashes: np.ndarray, run_starts: np.ndarray, permutations: int = PERMUTATIONS,
+                       seed: int = SEED, chunk: int = CHUNK_SHINGLES) -> np.ndarray:
+    """(sections, permutations) uint32 MinHash signatures; sections without shingles get all-max rows."""
+    rng = np.random.default_rng(seed)
+    # Multiply-shift hashing: (a * x + b) mod 2^64, top 32 bits; a must be odd
+    a = rng.integers(1, 2 ** 63, size=permutations, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2 ** 63, size=permutations, dtype=np.uint64)
+    sections = len(run_starts) - 1
+    signatures = np.full((sections, permutations), np.iinfo(np.uint32).max, dtype=np.uint32)
+
+    first = 0
+    while first < sections:
+        # Whole sections per chunk, so every reduceat run lies inside it
+        last = int(np.searchsorted(run_starts, run_starts[first] + chunk, side='right')) - 1
+        last = min(max(last, first + 1), sections)
+        lo, hi = run_starts[first], run_starts[last]
+        if hi > lo:
+            block = ((hashes[lo:hi, None] * a[None, :] + b[None, :]) >> np.uint64(32)).astype(np.uint32)
+            starts = run_starts[first:last]
+            nonempty = np.flatnonzero(np.diff(run_starts[first:last + 1]) > 0)
+            signatures[first + nonempty] = np.minimum.reduceat(block, (starts[nonempty] - lo), axis=0)
+        first = last
+    return signatures
+
+
+def candidate_pairs(signatures: np.ndarray, valid: np.ndarray, bands: int = BANDS) -> np.ndarray:
+    """(i, j) pairs, i < j, sharing a bucket in at least one band; each member is paired with its bucket's first."""
+    rows = signatures.shape[1] // bands
+    candidates = np.flatnonzero(valid)
+    pairs = []
+    for band in range(bands):
+        keys = np.ascontiguousarray(signatures[candidates, band * rows:(band + 1) * rows])
+        keys = keys.view(np.dtype((np.void, keys.dtype.itemsize * rows))).ravel()
+        _, bucket, sizes = np.unique(keys, return_inverse=True, return_counts=True)
+        shared = sizes[bucket] > 1
+        if not shared.any():
+            continue
+        members = candidates[shared]
+        bucket = bucket[shared]
+        order = np.lexsort((members, bucket))
+        members, bucket = members[order], bucket[order]
+        heads = np.flatnonzero(np.concatenate(([True], bucket[1:] != bucket[:-1])))
+        leader = np.repeat(members[heads], np.diff(np.append(heads, len(members))))
+        others = members != leader
+        pairs.append(np.stack([leader[others], members[others]], axis=1))
+    if not pairs:
+        return np.zeros((0, 2), dtype=np.int64)
+    return np.unique(np.concatenate(pairs), axis=0)
+
+
+def estimated_similarity(signatures: np.ndarray, pairs: np.ndarray, block_rows: int = 65536) -> np.ndarray:
+    similarity = np.empty(len(pairs), dtype=np.float32)
+    for start in range(0, len(pairs), block_rows):
+        block = pairs[start:start + block_rows]
+        similarity[start:start + block_rows] = (signatures[block[:, 0]] == signatures[block[:, 1]]).mean(axis=1)
+    return similarity
+
+
+def cluster(count: int, pairs: np.ndarray) -> List[List[int]]:
+    """Connected components (with more than one member) of the similar pairs."""
+    parent = list(range(count))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in pairs.tolist():
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+    groups: Dict[int, List[int]] = {}
+    for i in range(count):
+        groups.setdefault(find(i), []).append(i)
+    return [members for members in groups.values() if len(members) > 1]
+
+
+def find_near_duplicates(sections: List[Dict], threshold: float = THRESHOLD, permutations: int = PERMUTATIONS,
+                         bands: int = BANDS, seed: int = SEED) -> List[Dict]:
+    """Clusters of near-duplicate sections, largest first, each with its representative."""
+    if permutations % bands:
+        raise ValueError(f"--permutations ({permutations}) must be a multiple of --bands ({bands})")
+    hashes, run_starts = shingle_hashes(sections)
+    signatures = minhash_signatures(hashes, run_starts, permutations, seed)
+    pairs = candidate_pairs(signatures, np.diff(run_starts) > 0, bands)
+    similarity = estimated_similarity(signatures, pairs)
+    logger.info(f"{len(pairs)} LSH candidate pairs, {int((similarity >= threshold).sum())} at or above {threshold}")
+
+    clusters = []
+    for members in cluster(len(sections), pairs[similarity >= threshold]):
+        representative = min(members, key=lambda i: (-sections[i]['word_count'], i))
+        others = np.array([[representative, i] for i in members if i != representative])
+        clusters.append({
+            'representative': sections[representative]['id'],
+            'members': [sections[i]['id'] for i in members],
+            'min_similarity': round(float(estimated_similarity(signatures, others).min()), 4),
+        })
+    clusters.sort(key=lambda c: (-len(c['members']), c['representative']))
+    return clusters
+
+
+def build_near_duplicates(output: Path = NEAR_DUPLICATES_PATH, data_dir: Path = DATA_DIR, **options) -> List[Dict]:
+    start = time.perf_counter()
+    sections = list(iter_sections(data_dir=data_dir))
+    clusters = find_near_duplicates(sections, **options)
+    artifact = {
+        'format': NEAR_DUPLICATES_FORMAT,
+        'documents': document_hashes(data_dir),
+        'params': {'shingle_size': SHINGLE_SIZE, 'permutations': options.get('permutations', PERMUTATIONS),
+                   'bands': options.get('bands', BANDS), 'threshold': options.get('threshold', THRESHOLD),
+                   'seed': options.get('seed', SEED)},
+        'clusters': clusters,
+    }
+    output.parent.mkdir(parents=True, exist_ok=True)
+    data = json.dumps(artifact, indent=1, ensure_ascii=False).encode('utf-8')
+    atomic_write_bytes(output, lambda f: f.write(data))
+    collapsed = sum(len(c['members']) - 1 for c in clusters)
+    logger.info(f"Found {len(clusters)} near-duplicate clusters in {len(sections)} sections; "
+                f"{collapsed} sections collapse onto representatives "
+                f"({time.perf_counter() - start:.2f}s), wrote {output}")
+    return clusters
+
+
+def load_representatives(path: Path = NEAR_DUPLICATES_PATH) -> Dict[str, str]:
+    """sectionId -> representative sectionId for every non-representative cluster member."""
+    artifact = json.loads(Path(path).read_text(encoding='utf-8'))
+    if artifact.get('format') != NEAR_DUPLICATES_FORMAT:
+        raise ValueError(f"{path} is not an {NEAR_DUPLICATES_FORMAT} artifact")
+    return {
+        member: c['representative']
+        for c in artifact['clusters'] for member in c['members'] if member != c['representative']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cluster near-duplicate sections with MinHash and LSH")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help="Write near-duplicate clusters for the converted documents")
+    build.add_argument('--data-dir', type=Path, default=DATA_DIR)
+    build.add_argument('--output', type=Path, default=NEAR_DUPLICATES_PATH)
+    build.add_argument('--threshold', type=float, default=THRESHOLD, help="Minimum estimated Jaccard similarity")
+    build.add_argument('--permutations', type=int, default=PERMUTATIONS)
+    build.add_argument('--bands', type=int, default=BANDS)
+    build.add_argument('--seed', type=int, default=SEED)
+
+    show = subparsers.add_parser('show', help="Print the largest clusters")
+    show.add_argument('--input', type=Path, default=NEAR_DUPLICATES_PATH)
+    show.add_argument('-n', type=int, default=20)
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        build_near_duplicates(args.output, args.data_dir, threshold=args.threshold,
+                              permutations=args.permutations, bands=args.bands, seed=args.seed)
+    else:
+        artifact = json.loads(args.input.read_text(encoding='utf-8'))
+        for c in artifact['clusters'][:args.n]:
+            print(json.dumps(c, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
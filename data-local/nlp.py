@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Text processing shared with the backend
+
+Python port of backend/src/utils/nlp.js (tokenize, stop words, stem,
+processText) and LocalSearchService.extractMaritimeTerms. Offline indexes
+built from these functions produce the same terms the Worker would, so
+their scores match the backend's.
+
+The JavaScript regexes are not Unicode-aware, so the port pins the same
+semantics explicitly: \\w and \\b are ASCII-only, while \\s is ECMAScript
+whitespace (which includes U+FEFF and excludes U+001C-U+001F, unlike
+Python's str.isspace).
+
+Usage:
+    python nlp.py "Fire detection requirements for OSVs"
+"""
+
+import json
+import re
+import sys
+from typing import List
+
+# ECMAScript WhiteSpace and LineTerminator code points, i.e. what \s matches in JS
+JS_WHITESPACE = (
+    '\t\n\v\f\r \u00a0\u1680'
+    + ''.join(map(chr, range(0x2000, 0x200b)))
+    + '\u2028\u2029\u202f\u205f\u3000\ufeff'
+)
+JS_SPACE = f'[{JS_WHITESPACE}]'
+
+STOP_WORDS = frozenset([
+    'the', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with',
+    'by', 'from', 'as', 'is', 'was', 'are', 'were', 'be', 'been', 'have',
+    'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should',
+    'may', 'might', 'must', 'shall', 'can', 'this', 'that', 'these', 'those',
+])
+
+NON_WORD_PATTERN = re.compile(f'[^A-Za-z0-9_{JS_WHITESPACE}]')
+SPLIT_PATTERN = re.compile(f'{JS_SPACE}+')
+STEM_PATTERN = re.compile(r'(ing|ed|s)\Z')
+
+MARITIME_PATTERNS = [
+    re.compile(pattern.replace(r'\s', JS_SPACE), re.IGNORECASE | re.ASCII)
+    for pattern in [
+        r'\b(fire\s+detection|life\s+saving|oil\s+discharge|manning\s+requirements)\b',
+        r'\b(osv|offshore\s+supply\s+vessel|supply\s+vessel)\b',
+        r'\b(cfr|code\s+of\s+federal\s+regulations)\b',
+        r'\b(abs|american\s+bureau\s+of\s+shipping)\b',
+        r'\b(solas|safety\s+of\s+life\s+at\s+sea)\b',
+        r'\b(nvic|navigation\s+and\s+vessel\s+inspection\s+circular)\b',
+        r'\b(machinery\s+space|accommodation|emergency\s+equipment)\b',
+        r'\b(drydocking|survey|inspection|certification)\b',
+    ]
+]
+
+
+def js_trim(text: str) -> str:
+    """String.prototype.trim(), which strips a different whitespace set than str.strip()."""
+    return text.strip(JS_WHITESPACE)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in SPLIT_PATTERN.split(NON_WORD_PATTERN.sub(' ', text.lower())) if token]
+
+
+def remove_stop_words(words: List[str]) -> List[str]:
+    return [word for word in words if word not in STOP_WORDS]
+
+
+def stem(word: str) -> str:
+    return STEM_PATTERN.sub('', word, count=1)
+
+
+def process_text(text: str) -> List[str]:
+    return [stem(word) for word in remove_stop_words(tokenize(text))]
+
+
+def extract_maritime_terms(text: str) -> List[str]:
+    """Multi-word domain terms as single tokens (e.g. "fire_detection"), pattern by pattern."""
+    terms = []
+    for pattern in MARITIME_PATTERNS:
+        for match in pattern.finditer(text):
+            terms.append(SPLIT_PATTERN.sub('_', match.group(0).lower()))
+    return terms
+
+
+def index_terms(text: str) -> List[str]:
+    """Terms LocalSearchService.indexDocument counts for a section's title + content."""
+    return process_text(text) + extract_maritime_terms(text)
+
+
+def main():
+    text = ' '.join(sys.argv[1:]) or sys.stdin.read()
+    print(json.dumps({'process_text': process_text(text), 'maritime_terms': extract_maritime_terms(text)}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
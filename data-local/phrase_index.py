@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Positional Phrase Index
+
+extractMaritimeTerms finds multi-word terms by running case-insensitive
+regexes over every section, and keyword search only sees the separate
+tokens. This index records token positions per section and precomputes
+postings for frequent domain n-grams (mined across the corpus, plus every
+phrase in nlp.MARITIME_PATTERNS), so a phrase query is a dictionary lookup
+for known n-grams and a positional postings intersection otherwise.
+
+Positions are offsets into nlp.tokenize(title + content): lowercase ASCII
+word tokens with stop words kept, so "safety of life at sea" is a phrase.
+Unlike the regexes, tokenization also treats punctuation as a separator
+("fire-detection" matches "fire detection").
+
+Artifact (build/phrase-index.json):
+    {
+      "format": "arrowreg-phrase-index-v1",
+      "documents": {documentId: sha256},
+      "sections": [sectionId, ...],
+      "tokens": {token: [ordinal, count, position, ..., ordinal, count, ...]},
+      "ngrams": {"fire detection": [same layout], ...}
+    }
+
+Usage:
+    python phrase_index.py build --data-dir build/synthetic
+    python phrase_index.py search "offshore supply vessel"
+    python phrase_index.py benchmark --data-dir build/synthetic
+"""
+
+import argparse
+import json
+import logging
+import re
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from embedding_store import atomic_write_bytes
+from keyword_index import document_hashes
+from nlp import JS_SPACE, MARITIME_PATTERNS, STOP_WORDS, tokenize
+from sections import BUILD_DIR, DATA_DIR, iter_sections, section_text
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+PHRASE_INDEX_FORMAT = 'arrowreg-phrase-index-v1'
+PHRASE_INDEX_PATH = BUILD_DIR / 'phrase-index.json'
+
+MAX_NGRAM = 4
+MIN_SECTIONS = 5
+MAX_NGRAMS = 5000
+
+# section ordinal -> token positions
+Postings = Dict[int, List[int]]
+
+
+def maritime_phrases() -> List[str]:
+    """Multi-word alternatives of the extractMaritimeTerms patterns, as plain phrases."""
+    phrases = []
+    for pattern in MARITIME_PATTERNS:
+        source = pattern.pattern.replace(JS_SPACE + '+', ' ')
+        for alternative in source[len(r'\b('):-len(r')\b')].split('|'):
+            if ' ' in alternative:
+                phrases.append(alternative)
+    return phrases
+
+
+def is_candidate(ngram: Tuple[str, ...]) -> bool:
+    """Domain n-grams start and end on content words and contain no bare numbers."""
+    return (ngram[0] not in STOP_WORDS and ngram[-1] not in STOP_WORDS
+            and not any(token.isdigit() for token in ngram))
+
+
+def mine_ngrams(token_lists: Iterable[List[str]], max_n: int = MAX_NGRAM, min_sections: int = MIN_SECTIONS,
+                limit: int = MAX_NGRAMS) -> List[Tuple[str, ...]]:
+    """N-grams (2..max_n tokens) found in at least min_sections sections, most widespread first.
+
+    Mined level by level (apriori): an n-gram occurs in no more sections than
+    its (n-1)-token prefix or suffix, so only windows whose prefix and suffix
+    were frequent at the previous level are counted, and a frequent n-gram is
+    identified by that (prefix, suffix) pair of IDs. Levels count all n-grams,
+    since stop words at the edges can still extend into candidates; windows
+    with a bare number are dropped up front, as no extension of them qualifies.
+    """
+    token_lists = list(token_lists)
+    # Level 1: tokens (other than bare numbers) in at least min_sections sections
+    token_counts = Counter(token for tokens in token_lists for token in set(tokens))
+    words = [token for token, count in token_counts.items() if count >= min_sections and not token.isdigit()]
+    vocabulary = {word: i for i, word in enumerate(words)}
+    total = sum(len(tokens) for tokens in token_lists)
+    # gram[i] is the ID of the frequent (n-1)-gram starting at position i, or -1
+    gram = np.fromiter((vocabulary.get(token, -1) for tokens in token_lists for token in tokens),
+                       dtype=np.int32, count=total)
+    ordinals = np.repeat(np.arange(len(token_lists), dtype=np.int32), [len(tokens) for tokens in token_lists])
+    grams = [(word,) for word in words]
+    del token_counts, vocabulary
+
+    selected = []
+    for n in range(2, max_n + 1):
+        # Windows of n tokens inside one section with a frequent prefix and suffix
+        starts = np.flatnonzero((gram[:-1] >= 0) & (gram[1:] >= 0) & (ordinals[:-1] == ordinals[1:]))
+        if not len(starts):
+            break
+        size = len(grams)
+        if size * size * len(token_lists) >= 2 ** 63:
+            raise OverflowError(f"Too many frequent {n - 1}-grams ({size}) to count {n}-grams")
+        # (prefix, suffix, section) as one integer: sorting it groups windows by n-gram, then section
+        keys = gram[starts].astype(np.int64)
+        keys *= size
+        keys += gram[starts + 1]
+        keys *= len(token_lists)
+        keys += ordinals[starts]
+        order = np.argsort(keys)
+        keys = keys[order]
+        new_section = np.empty(len(keys), dtype=bool)
+        new_section[0] = True
+        np.not_equal(keys[1:], keys[:-1], out=new_section[1:])
+        keys //= len(token_lists)
+        new_key = np.empty(len(keys), dtype=bool)
+        new_key[0] = True
+        np.not_equal(keys[1:], keys[:-1], out=new_key[1:])
+        first = np.flatnonzero(new_key)
+        counts = np.add.reduceat(new_section, first, dtype=np.int64)
+        del new_section
+
+        keep = counts >= min_sections
+        grams = [grams[key // size] + grams[key % size][-1:] for key in keys[first[keep]].tolist()]
+        selected.extend((count, ngram) for count, ngram in zip(counts[keep].tolist(), grams) if is_candidate(ngram))
+        dense = np.full(len(first), -1, dtype=np.int32)
+        dense[keep] = np.arange(len(grams))
+        del keys, first
+        gram.fill(-1)
+        gram[starts[order]] = dense[np.cumsum(new_key, dtype=np.int32) - 1]
+    selected.sort(key=lambda item: (-item[0], item[1]))
+    return [ngram for _, ngram in selected[:limit]]
+
+
+def intersect(postings: List[Postings]) -> Postings:
+    """Sections where the postings' tokens occur consecutively; positions of the first token."""
+    if not postings:
+        return {}
+    order = sorted(range(len(postings)), key=lambda i: len(postings[i]))
+    ordinals = set(postings[order[0]])
+    for i in order[1:]:
+        ordinals.intersection_update(postings[i])
+        if not ordinals:
+            return {}
+    matches = {}
+    for ordinal in sorted(ordinals):
+        starts = set(postings[0][ordinal])
+        for offset in range(1, len(postings)):
+            starts.intersection_update(position - offset for position in postings[offset][ordinal])
+            if not starts:
+                break
+        if starts:
+            matches[ordinal] = sorted(starts)
+    return matches
+
+
+class PhraseIndex:
+    """Token and n-gram positional postings over section ordinals."""
+
+    def __init__(self, section_ids: List[str], tokens: Dict[str, Postings], ngrams: Dict[str, Postings]):
+        self.section_ids = section_ids
+        self.tokens = tokens
+        self.ngrams = ngrams
+
+    @classmethod
+    def from_sections(cls, sections: Iterable[Dict], max_n: int = MAX_NGRAM, min_sections: int = MIN_SECTIONS,
+                      limit: int = MAX_NGRAMS) -> 'PhraseIndex':
+        section_ids, token_lists = [], []
+        tokens: Dict[str, Postings] = {}
+        canonical: Dict[str, str] = {}
+        for ordinal, section in enumerate(sections):
+            section_ids.append(section['id'])
+            # One string object per distinct token instead of per occurrence
+            section_tokens = [canonical.setdefault(token, token) for token in tokenize(section_text(section))]
+            token_lists.append(section_tokens)
+            for position, token in enumerate(section_tokens):
+                tokens.setdefault(token, {}).setdefault(ordinal, []).append(position)
+
+        # One sliding-window pass collects every selected n-gram's positions
+        selected = mine_ngrams(token_lists, max_n, min_sections, limit)
+        selected += [tuple(phrase.split(' ')) for phrase in maritime_phrases()]
+        phrases = {ngram: ' '.join(ngram) for ngram in selected}
+        lengths = sorted({len(ngram) for ngram in phrases})
+        ngrams: Dict[str, Postings] = {}
+        for ordinal, section_tokens in enumerate(token_lists):
+            for n in lengths:
+                for i in range(len(section_tokens) - n + 1):
+                    phrase = phrases.get(tuple(section_tokens[i:i + n]))
+                    if phrase is not None:
+                        ngrams.setdefault(phrase, {}).setdefault(ordinal, []).append(i)
+        return cls(section_ids, tokens, {phrase: ngrams[phrase] for phrase in phrases.values() if phrase in ngrams})
+
+    def intersect_phrase(self, tokens: List[str]) -> Postings:
+        postings = []
+        for token in tokens:
+            token_postings = self.tokens.get(token)
+            if not token_postings:
+                return {}
+            postings.append(token_postings)
+        return intersect(postings)
+
+    def match(self, phrase: str) -> Dict[str, List[int]]:
+        """Section ID -> start positions of the phrase, in section order."""
+        tokens = tokenize(phrase)
+        postings = self.ngrams.get(' '.join(tokens))
+        if postings is None:
+            postings = self.intersect_phrase(tokens)
+        return {self.section_ids[ordinal]: positions for ordinal, positions in postings.items()}
+
+    def search(self, phrase: str, k: int = 10) -> List[Tuple[str, int]]:
+        """Sections with the most occurrences of the phrase; ties keep section order."""
+        counts = [(section_id, len(positions)) for section_id, positions in self.match(phrase).items()]
+        return sorted(counts, key=lambda item: -item[1])[:k]
+
+    def to_artifact(self, document_hashes: Dict[str, str]) -> Dict:
+        def flatten(postings: Postings) -> List[int]:
+            return [value for ordinal, positions in postings.items()
+                    for value in (ordinal, len(positions), *positions)]
+
+        return {
+            'format': PHRASE_INDEX_FORMAT,
+            'documents': document_hashes,
+            'sections': self.section_ids,
+            'tokens': {token: flatten(self.tokens[token]) for token in sorted(self.tokens)},
+            'ngrams': {phrase: flatten(postings) for phrase, postings in self.ngrams.items()},
+        }
+
+    @classmethod
+    def from_artifact(cls, artifact: Dict) -> 'PhraseIndex':
+        if artifact.get('format') != PHRASE_INDEX_FORMAT:
+            raise ValueError(f"Not an {PHRASE_INDEX_FORMAT} artifact")
+
+        def unflatten(flat: List[int]) -> Postings:
+            postings, i = {}, 0
+            while i < len(flat):
+                count = flat[i + 1]
+                postings[flat[i]] = flat[i + 2:i + 2 + count]
+                i += 2 + count
+            return postings
+
+        return cls(
+            artifact['sections'],
+            {token: unflatten(flat) for token, flat in artifact['tokens'].items()},
+            {phrase: unflatten(flat) for phrase, flat in artifact['ngrams'].items()},
+        )
+
+    @classmethod
+    def load(cls, path: Path = PHRASE_INDEX_PATH) -> 'PhraseIndex':
+        return cls.from_artifact(json.loads(Path(path).read_text(encoding='utf-8')))
+
+
+def build_phrase_index(output: Path = PHRASE_INDEX_PATH, data_dir: Path = DATA_DIR, **options) -> PhraseIndex:
+    index = PhraseIndex.from_sections(iter_sections(data_dir=data_dir), **options)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    data = json.dumps(index.to_artifact(document_hashes(data_dir)), separators=(',', ':'))
+    atomic_write_bytes(output, lambda f: f.write(data.encode('utf-8')))
+    logger.info(f"Wrote phrase index with {len(index.ngrams)} n-grams and {len(index.tokens)} tokens "
+                f"over {len(index.section_ids)} sections to {output}")
+    return index
+
+
+def phrase_regex(phrase: str) -> re.Pattern:
+    """The extractMaritimeTerms-style regex for a phrase."""
+    words = [re.escape(word) for word in phrase.split()]
+    return re.compile(r'\b' + (JS_SPACE + '+').join(words) + r'\b', re.IGNORECASE | re.ASCII)
+
+
+def benchmark(data_dir: Path, phrases: Optional[List[str]] = None, repeat: int = 3) -> Dict:
+    """Regex scan over every section vs index lookup, per phrase."""
+    sections = list(iter_sections(data_dir=data_dir))
+    texts = [(section['id'], section_text(section)) for section in sections]
+
+    start = time.perf_counter()
+    index = PhraseIndex.from_sections(sections)
+    build_seconds = time.perf_counter() - start
+
+    if phrases is None:
+        mined = [phrase for phrase in index.ngrams if phrase not in maritime_phrases()]
+        phrases = maritime_phrases() + mined[:10] + [
+            'vessel inspection survey certificate', 'fire detection system alarm',
+        ]
+
+    results = []
+    for phrase in phrases:
+        pattern = phrase_regex(phrase)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            scanned = {section_id for section_id, text in texts if pattern.search(text)}
+        scan_ms = (time.perf_counter() - start) / repeat * 1000
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            indexed = set(index.match(phrase))
+        index_ms = (time.perf_counter() - start) / repeat * 1000
+
+        results.append({
+            'phrase': phrase,
+            'precomputed': ' '.join(tokenize(phrase)) in index.ngrams,
+            'sections': len(indexed),
+            'regex_only': len(scanned - indexed),
+            'index_only': len(indexed - scanned),
+            'regex_ms': round(scan_ms, 3),
+            'index_ms': round(index_ms, 3),
+        })
+
+    regex_total = sum(r['regex_ms'] for r in results)
+    index_total = sum(r['index_ms'] for r in results)
+    return {
+        'sections': len(sections),
+        'ngrams': len(index.ngrams),
+        'build_seconds': round(build_seconds, 2),
+        'regex_ms_total': round(regex_total, 2),
+        'index_ms_total': round(index_total, 2),
+        'speedup': round(regex_total / index_total, 1) if index_total else None,
+        'phrases': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Positional phrase / n-gram index")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help="Mine n-grams and write the phrase index")
+    build.add_argument('--data-dir', type=Path, default=DATA_DIR)
+    build.add_argument('--output', type=Path, default=PHRASE_INDEX_PATH)
+    build.add_argument('--max-n', type=int, default=MAX_NGRAM)
+    build.add_argument('--min-sections', type=int, default=MIN_SECTIONS,
+                       help="Keep n-grams found in at least this many sections")
+    build.add_argument('--limit', type=int, default=MAX_NGRAMS)
+
+    search = subparsers.add_parser('search', help="Sections containing a phrase")
+    search.add_argument('phrase', nargs='+')
+    search.add_argument('--index', type=Path, default=PHRASE_INDEX_PATH)
+    search.add_argument('-k', type=int, default=10)
+
+    bench = subparsers.add_parser('benchmark', help="Compare phrase lookups against regex scanning")
+    bench.add_argument('--data-dir', type=Path, default=DATA_DIR)
+    bench.add_argument('--phrase', action='append', default=None, help="Phrase to time (repeatable)")
+    bench.add_argument('--repeat', type=int, default=3)
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        build_phrase_index(args.output, args.data_dir, max_n=args.max_n,
+                           min_sections=args.min_sections, limit=args.limit)
+    elif args.command == 'search':
+        if args.index.exists():
+            index = PhraseIndex.load(args.index)
+        else:
+            index = PhraseIndex.from_sections(iter_sections())
+        for section_id, count in index.search(' '.join(args.phrase), args.k):
+            print(json.dumps({'id': section_id, 'occurrences': count}))
+    else:
+        print(json.dumps(benchmark(args.data_dir, args.phrase, args.repeat), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Regulation Data Pipeline
+
+Runs the offline scripts as one DAG of stages:
+
+    source (XML / PDF) -> markdown -> sections -> near-duplicates -> embeddings -> indexes -> upload
+
+Each stage is an existing script run as a subprocess from data-local/. A
+stage's cache key is a SHA-256 over its command, the source of its script
+and every local module it imports (the code version), and the content of
+its inputs. After a stage runs, its output files are copied into a
+content-addressed object store (build/pipeline/objects) and the key is
+recorded with their digests, so a later run with the same key either skips
+the stage (outputs unchanged) or restores the recorded outputs from the
+store instead of recomputing them.
+
+Dependencies come from the data: a stage depends on every stage that writes
+one of its inputs. Stages whose dependencies are done run in parallel
+(--jobs). A stage whose source inputs are absent (the XML and PDF are not
+checked in) keeps its existing outputs and counts as a source.
+
+Usage:
+    python pipeline.py                   # everything except upload and ann-index
+    python pipeline.py keyword-index typeahead --jobs 4
+    python pipeline.py --list
+    python pipeline.py upload            # also uploads the Markdown via ingest-sample-data.py
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from embedding_store import atomic_write_bytes, swap_directory
+from sections import BUILD_DIR, DATA_DIR, DOCUMENTS, SCRIPTS_DIR
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+PIPELINE_VERSION = 1
+PIPELINE_DIR = BUILD_DIR / 'pipeline'
+STATE_PATH = PIPELINE_DIR / 'state.json'
+OBJECTS_DIR = PIPELINE_DIR / 'objects'
+LOGS_DIR = PIPELINE_DIR / 'logs'
+
+MARKDOWN = list(DOCUMENTS.values())
+SECTIONS_JSONL = 'build/sections.jsonl'
+EMBEDDINGS_DIR = 'build/embeddings/hashing-768-v1'
+NEAR_DUPLICATES_JSON = 'build/near-duplicates.json'
+
+
+class Stage:
+    """One script invocation with declared input and output paths (relative to data-local/)."""
+
+    def __init__(self, name: str, command: List[str], inputs: List[str], outputs: List[str],
+                 stdout: Optional[str] = None, default: bool = True):
+        self.name = name
+        self.command = command
+        self.inputs = inputs
+        self.outputs = outputs
+        self.stdout = stdout
+        self.default = default
+
+    @property
+    def script(self) -> Path:
+        return (DATA_DIR / self.command[0]).resolve()
+
+
+STAGES = [
+    Stage('markdown-ecfr', ['ecfr_xml_to_markdown.py', '--no-citation-table', '--render-cache'],
+          inputs=['ECFR-title33.xml', 'ECFR-title46.xml'], outputs=['ECFR-title33.md', 'ECFR-title46.md']),
+    Stage('markdown-abs', ['abs_part7_pdf_parser.py', '--pdf', 'part-7-july20.pdf',
+                           '--output', 'ABS-Part-7-Structured.md', '--no-citation-table', '--render-cache'],
+          inputs=['part-7-july20.pdf'], outputs=['ABS-Part-7-Structured.md']),
+    Stage('sections', ['sections.py'], inputs=MARKDOWN, outputs=[SECTIONS_JSONL], stdout=SECTIONS_JSONL),
+    Stage('near-duplicates', ['near_duplicates.py', 'build'],
+          inputs=MARKDOWN + [SECTIONS_JSONL], outputs=[NEAR_DUPLICATES_JSON]),
+    Stage('embeddings', ['embed_sections.py', '--backend', 'hashing', '--format', 'store', '--swap',
+                         '--near-duplicates', NEAR_DUPLICATES_JSON, '--output-dir', EMBEDDINGS_DIR],
+          inputs=MARKDOWN + [SECTIONS_JSONL, NEAR_DUPLICATES_JSON], outputs=[EMBEDDINGS_DIR]),
+    Stage('keyword-index', ['keyword_index.py', 'build'],
+          inputs=MARKDOWN + [SECTIONS_JSONL], outputs=['index/keyword-index.json']),
+    Stage('citations', ['citation_table.py', 'build'],
+          inputs=MARKDOWN + [SECTIONS_JSONL], outputs=['build/citations.bin']),
+    Stage('typeahead', ['typeahead_index.py', 'build'],
+          inputs=MARKDOWN + [SECTIONS_JSONL], outputs=['build/typeahead.json']),
+    Stage('phrases', ['phrase_index.py', 'build'],
+          inputs=MARKDOWN + [SECTIONS_JSONL], outputs=['build/phrase-index.json']),
+    Stage('archive', ['corpus_archive.py', 'build'],
+          inputs=MARKDOWN + [SECTIONS_JSONL], outputs=['build/corpus.arblk']),
+    Stage('shards', ['shard_index.py', 'build', '--store', EMBEDDINGS_DIR],
+          inputs=MARKDOWN + [SECTIONS_JSONL, EMBEDDINGS_DIR], outputs=['build/shards']),
+    # Opt-in: at the corpus's size exact search is faster than IVF at usable recall (see ann_index.py)
+    Stage('ann-index', ['ann_index.py', 'build', EMBEDDINGS_DIR, '--output', 'build/ivf.bin'],
+          inputs=[EMBEDDINGS_DIR], outputs=['build/ivf.bin'], default=False),
+    Stage('upload', [str(SCRIPTS_DIR / 'setup' / 'ingest-sample-data.py'), *MARKDOWN,
+                     '--report', 'build/pipeline/ingest-report.json'],
+          inputs=MARKDOWN, outputs=['build/pipeline/ingest-report.json'], default=False),
+]
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def expand(relative: str) -> Dict[str, Path]:
+    """Files under a declared path (itself if it is a file), keyed by path relative to data-local/."""
+    path = DATA_DIR / relative
+    if path.is_dir():
+        return {
+            str(child.relative_to(DATA_DIR)): child
+            for child in sorted(path.rglob('*')) if child.is_file() and not child.name.startswith('.')
+        }
+    return {relative: path} if path.is_file() else {}
+
+
+def digests(paths: List[str]) -> Dict[str, str]:
+    return {name: file_digest(path) for relative in paths for name, path in expand(relative).items()}
+
+
+def local_modules(script: Path) -> List[Path]:
+    """The script plus every module it imports from data-local/ or scripts/, transitively."""
+    search = [script.parent, DATA_DIR, SCRIPTS_DIR]
+    found, pending = {}, [script]
+    while pending:
+        path = pending.pop()
+        if path in found:
+            continue
+        found[path] = True
+        tree = ast.parse(path.read_text(encoding='utf-8'))
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                for directory in search:
+                    candidate = directory / f"{name.split('.')[0]}.py"
+                    if candidate.exists():
+                        pending.append(candidate.resolve())
+                        break
+    return sorted(found)
+
+
+def stage_key(stage: Stage) -> str:
+    code = {str(path.relative_to(DATA_DIR.parent)): file_digest(path) for path in local_modules(stage.script)}
+    payload = {
+        'version': PIPELINE_VERSION,
+        'stage': stage.name,
+        'command': stage.command,
+        'code': code,
+        'inputs': digests(stage.inputs),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def dependencies(stages: List[Stage]) -> Dict[str, List[str]]:
+    """stage -> stages writing (a path containing) one of its inputs."""
+    graph = {}
+    for stage in stages:
+        graph[stage.name] = [
+            other.name for other in stages
+            if other is not stage and any(
+                i == o or i.startswith(o.rstrip('/') + '/') or o.startswith(i.rstrip('/') + '/')
+                for i in stage.inputs for o in other.outputs
+            )
+        ]
+    return graph
+
+
+def select(targets: List[str]) -> List[Stage]:
+    """The requested stages (default: all default stages) and everything they depend on."""
+    by_name = {stage.name: stage for stage in STAGES}
+    unknown = [name for name in targets if name not in by_name]
+    if unknown:
+        raise ValueError(f"Unknown stages: {', '.join(unknown)} (see --list)")
+    graph = dependencies(STAGES)
+    wanted = set()
+    pending = list(targets) or [stage.name for stage in STAGES if stage.default]
+    while pending:
+        name = pending.pop()
+        if name not in wanted:
+            wanted.add(name)
+            pending.extend(graph[name])
+    return [stage for stage in STAGES if stage.name in wanted]
+
+
+class Pipeline:
+    """Schedules stages over a thread pool and keeps the content-addressed run cache."""
+
+    def __init__(self, stages: List[Stage], jobs: int = 2, force: Optional[List[str]] = None, dry_run: bool = False):
+        self.stages = stages
+        self.jobs = jobs
+        self.force = set(force or [])
+        self.dry_run = dry_run
+        self.lock = threading.Lock()
+        self.state = json.loads(STATE_PATH.read_text()) if STATE_PATH.exists() else {'runs': {}}
+
+    def save_state(self):
+        PIPELINE_DIR.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(self.state, indent=2, sort_keys=True).encode('utf-8')
+        atomic_write_bytes(STATE_PATH, lambda f: f.write(data))
+
+    def store_objects(self, outputs: Dict[str, str]):
+        for relative, digest in outputs.items():
+            target = OBJECTS_DIR / digest[:2] / digest
+            if not target.exists():
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(DATA_DIR / relative, target)
+
+    def restore_objects(self, stage: Stage, outputs: Dict[str, str]) -> bool:
+        """Copy recorded outputs back; files are renamed into place and directories swapped in whole."""
+        if not all((OBJECTS_DIR / digest[:2] / digest).exists() for digest in outputs.values()):
+            return False
+        for relative in stage.outputs:
+            path = DATA_DIR / relative
+            files = {name: digest for name, digest in outputs.items() if name.startswith(relative + '/')}
+            if relative in outputs:
+                tmp_path = path.with_name(f".{path.name}.tmp")
+                path.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(OBJECTS_DIR / outputs[relative][:2] / outputs[relative], tmp_path)
+                os.replace(tmp_path, path)
+            elif files:
+                generation = path.with_name(f"{path.name}.{time.time_ns():016x}")
+                for name, digest in files.items():
+                    target = generation / name[len(relative) + 1:]
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copyfile(OBJECTS_DIR / digest[:2] / digest, target)
+                swap_directory(path, generation)
+        return True
+
+    def execute(self, stage: Stage) -> Dict:
+        """Run, skip or restore one stage; returns its result record."""
+        start = time.perf_counter()
+        missing = [path for path in stage.inputs if not (DATA_DIR / path).exists()]
+        if missing:
+            if all(expand(path) for path in stage.outputs):
+                return {'status': 'source', 'missing_inputs': missing}
+            return {'status': 'failed', 'error': f"missing inputs {missing} and no existing outputs"}
+
+        key = stage_key(stage)
+        with self.lock:
+            recorded = self.state['runs'].get(key)
+        if recorded is not None and stage.name not in self.force:
+            if digests(stage.outputs) == recorded['outputs']:
+                return {'status': 'cached', 'key': key}
+            if not self.dry_run and self.restore_objects(stage, recorded['outputs']):
+                return {'status': 'restored', 'key': key}
+        if self.dry_run:
+            return {'status': 'would-run', 'key': key}
+
+        LOGS_DIR.mkdir(parents=True, exist_ok=True)
+        command = [sys.executable, *stage.command]
+        with open(LOGS_DIR / f"{stage.name}.log", 'w', encoding='utf-8') as log:
+            if stage.stdout:
+                output = DATA_DIR / stage.stdout
+                tmp_output = output.with_name(f".{output.name}.tmp")
+                output.parent.mkdir(parents=True, exist_ok=True)
+                with open(tmp_output, 'w', encoding='utf-8') as stdout:
+                    code = subprocess.call(command, cwd=DATA_DIR, stdout=stdout, stderr=log)
+                if code == 0:
+                    os.replace(tmp_output, output)
+            else:
+                code = subprocess.call(command, cwd=DATA_DIR, stdout=log, stderr=subprocess.STDOUT)
+        seconds = round(time.perf_counter() - start, 2)
+        if code != 0:
+            return {'status': 'failed', 'key': key, 'seconds': seconds,
+                    'error': f"exit code {code}, see {LOGS_DIR / stage.name}.log"}
+
+        outputs = digests(stage.outputs)
+        self.store_objects(outputs)
+        with self.lock:
+            self.state['runs'][key] = {'stage': stage.name, 'outputs': outputs, 'finished': time.time()}
+            self.save_state()
+        return {'status': 'ran', 'key': key, 'seconds': seconds}
+
+    def run(self) -> Dict[str, Dict]:
+        names = {stage.name for stage in self.stages}
+        graph = {name: [d for d in deps if d in names] for name, deps in dependencies(self.stages).items()}
+        by_name = {stage.name: stage for stage in self.stages}
+        results: Dict[str, Dict] = {}
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            while len(results) < len(self.stages):
+                progressed = False
+                for stage in self.stages:
+                    if stage.name in results or stage.name in running.values():
+                        continue
+                    deps = graph[stage.name]
+                    if any(results.get(d, {}).get('status') in ('failed', 'blocked') for d in deps):
+                        results[stage.name] = {'status': 'blocked'}
+                        logger.info(f"{stage.name}: blocked by a failed dependency")
+                        progressed = True
+                    elif all(d in results for d in deps):
+                        running[pool.submit(self.execute, stage)] = stage.name
+                        progressed = True
+                if not running:
+                    # Blocked stages resolve without running; only a pass that resolves nothing is a cycle
+                    if not progressed:
+                        raise RuntimeError("Stage dependencies form a cycle")
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        results[name] = {'status': 'failed', 'error': str(e)}
+                    detail = results[name].get('error') or results[name].get('seconds', '')
+                    logger.info(f"{name}: {results[name]['status']} {detail}".rstrip())
+        return {name: results[name] for name in by_name}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the regulation data pipeline with stage caching")
+    parser.add_argument('targets', nargs='*',
+                        help="Stages to bring up to date (default: all but upload and ann-index)")
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count() or 1, help="Stages run in parallel")
+    parser.add_argument('--force', nargs='*', default=[], help="Re-run these stages even if cached")
+    parser.add_argument('--dry-run', action='store_true', help="Report what would run without running it")
+    parser.add_argument('--list', action='store_true', help="Show the stages and their dependencies")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, deps in dependencies(STAGES).items():
+            print(f"{name:15} <- {', '.join(deps) or '(source)'}")
+        return 0
+
+    try:
+        stages = select(args.targets)
+    except ValueError as e:
+        logger.error(str(e))
+        return 2
+
+    start = time.perf_counter()
+    results = Pipeline(stages, args.jobs, args.force, args.dry_run).run()
+    summary = {'seconds': round(time.perf_counter() - start, 2), 'stages': results}
+    PIPELINE_DIR.mkdir(parents=True, exist_ok=True)
+    (PIPELINE_DIR / 'last-run.json').write_text(json.dumps(summary, indent=2))
+    counts = {}
+    for result in results.values():
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    logger.info(f"Pipeline finished in {summary['seconds']}s: "
+                + ', '.join(f"{count} {status}" for status, count in sorted(counts.items())))
+    return 1 if any(r['status'] in ('failed', 'blocked') for r in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
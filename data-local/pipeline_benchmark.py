@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+End-to-End Pipeline Benchmark and Regression Gate
+
+Runs the offline pipeline over a fixed synthetic corpus sized like full
+Titles 33 and 46 plus ABS Part 7 (synthetic_corpus.py --xml), one stage at
+a time as its own process:
+
+    convert-ecfr  eCFR XML -> Markdown (ecfr_xml_to_markdown.py)
+    sections      sectioning / chunking into section records (sections.py)
+    near-duplicates  MinHash/LSH clusters, collapsed by the embedding stage
+    embeddings    offline hashing backend, no embedding cache (embed_sections.py)
+    keyword-index, citations, typeahead, phrases, archive, shards, ann-index
+
+Each stage's wall time and peak RSS (from the child's rusage) are compared
+with the committed baseline (benchmarks/pipeline-baseline.json). A stage
+fails the gate when its time or memory grows by more than --threshold /
+--memory-threshold over the baseline and by more than a small absolute
+noise floor. The ABS parser is not part of the run: the synthetic ABS
+document is written as Markdown, since producing a PDF needs PyMuPDF.
+
+Reports are written under reports/. Baselines depend on the machine; after
+an intentional change (or on new CI hardware) refresh them with
+--update-baseline and commit the result.
+
+Usage:
+    python pipeline_benchmark.py
+    python pipeline_benchmark.py --repeat 3 --threshold 0.3
+    python pipeline_benchmark.py --update-baseline
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sections import BUILD_DIR, DATA_DIR
+from synthetic_corpus import generate_corpus
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+REPORT_VERSION = 1
+REPO_ROOT = DATA_DIR.parent
+BASELINE_PATH = DATA_DIR / 'benchmarks' / 'pipeline-baseline.json'
+WORKSPACE_DIR = BUILD_DIR / 'pipeline-benchmark'
+
+# Roughly the section counts of the full documents: ~4,800 sections per CFR title, ~1,200 ABS
+CORPUS = {'parts': 120, 'sections_per_part': 40, 'seed': 0}
+
+# Wall time on shared runners varies by up to ~30% between runs; peak RSS is far steadier
+THRESHOLD = 0.5
+MEMORY_THRESHOLD = 0.25
+# Changes smaller than these are timer / allocator noise on short stages
+NOISE_SECONDS = 0.5
+NOISE_MB = 16.0
+
+# (stage, command); '{ws}' is the workspace directory, commands run with it as cwd
+STAGES = [
+    ('convert-ecfr', ['ecfr_xml_to_markdown.py', '--no-citation-table']),
+    ('sections', ['sections.py', '--data-dir', '{ws}']),
+    ('near-duplicates', ['near_duplicates.py', 'build', '--data-dir', '{ws}', '--output', '{ws}/near-duplicates.json']),
+    ('embeddings', ['embed_sections.py', '--data-dir', '{ws}', '--backend', 'hashing', '--format', 'store',
+                    '--no-cache', '--near-duplicates', '{ws}/near-duplicates.json', '--output-dir', '{ws}/embeddings']),
+    ('keyword-index', ['keyword_index.py', 'build', '--data-dir', '{ws}', '--output', '{ws}/keyword-index.json']),
+    ('citations', ['citation_table.py', 'build', '--data-dir', '{ws}', '--output', '{ws}/citations.bin']),
+    ('typeahead', ['typeahead_index.py', 'build', '--data-dir', '{ws}', '--output', '{ws}/typeahead.json']),
+    ('phrases', ['phrase_index.py', 'build', '--data-dir', '{ws}', '--output', '{ws}/phrase-index.json']),
+    ('archive', ['corpus_archive.py', 'build', '--data-dir', '{ws}', '--output', '{ws}/corpus.arblk']),
+    ('shards', ['shard_index.py', 'build', '--data-dir', '{ws}', '--output', '{ws}/shards',
+                '--store', '{ws}/embeddings']),
+    ('ann-index', ['ann_index.py', 'build', '{ws}/embeddings', '--output', '{ws}/ivf.bin']),
+]
+
+
+def peak_rss_mb(rusage) -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return rusage.ru_maxrss / (1 << 20 if sys.platform == 'darwin' else 1 << 10)
+
+
+def run_stage(name: str, command: List[str], workspace: Path) -> Dict:
+    """Run one stage to completion; wall time and the child's own peak RSS."""
+    argv = [sys.executable, str(DATA_DIR / command[0])]
+    argv += [part.replace('{ws}', str(workspace)) for part in command[1:]]
+    with open(workspace / f"{name}.log", 'w', encoding='utf-8') as log:
+        stdout = open(workspace / 'sections.jsonl', 'w', encoding='utf-8') if name == 'sections' else log
+        start = time.perf_counter()
+        process = subprocess.Popen(argv, cwd=workspace, stdout=stdout, stderr=log)
+        # wait4 reports this child's rusage alone, unlike RUSAGE_CHILDREN
+        _, status, rusage = os.wait4(process.pid, 0)
+        seconds = time.perf_counter() - start
+        process.returncode = os.waitstatus_to_exitcode(status)
+        if stdout is not log:
+            stdout.close()
+    if process.returncode != 0:
+        raise RuntimeError(f"{name} exited with {process.returncode}, see {workspace / name}.log")
+    return {'seconds': round(seconds, 3), 'peak_mb': round(peak_rss_mb(rusage), 1)}
+
+
+def prepare_workspace(corpus: Dict) -> Path:
+    """Generate the corpus once per parameter set; stage outputs are cleared on every run."""
+    workspace = WORKSPACE_DIR / f"p{corpus['parts']}-s{corpus['sections_per_part']}-seed{corpus['seed']}"
+    if not (workspace / 'ECFR-title46.xml').exists():
+        generate_corpus(workspace, corpus['parts'], corpus['sections_per_part'], corpus['seed'], xml=True)
+    for path in workspace.iterdir():
+        if path.is_symlink():
+            # Swapped outputs (e.g. shards) are links to generation directories
+            path.unlink()
+        elif path.is_dir():
+            shutil.rmtree(path)
+        elif path.suffix != '.xml' and path.name != 'ABS-Part-7-Structured.md':
+            path.unlink()
+    return workspace
+
+
+def run_benchmark(corpus: Dict, repeat: int = 1) -> Dict[str, Dict]:
+    """Best (minimum) time and peak memory per stage over `repeat` full runs."""
+    results: Dict[str, Dict] = {}
+    for run in range(repeat):
+        workspace = prepare_workspace(corpus)
+        for name, command in STAGES:
+            measured = run_stage(name, command, workspace)
+            logger.info(f"run {run + 1}/{repeat} {name}: {measured['seconds']:.2f}s, {measured['peak_mb']:.0f} MB")
+            best = results.setdefault(name, measured)
+            best['seconds'] = min(best['seconds'], measured['seconds'])
+            best['peak_mb'] = min(best['peak_mb'], measured['peak_mb'])
+    sections = sum(1 for _ in open(workspace / 'sections.jsonl', encoding='utf-8'))
+    results['total'] = {
+        'seconds': round(sum(stage['seconds'] for stage in results.values()), 3),
+        'peak_mb': max(stage['peak_mb'] for stage in results.values()),
+    }
+    logger.info(f"Pipeline over {sections} sections: {results['total']['seconds']:.2f}s, "
+                f"peak {results['total']['peak_mb']:.0f} MB")
+    return results
+
+
+def regressions(stages: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float,
+                memory_threshold: float) -> List[str]:
+    found = []
+    for name, measured in stages.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for metric, limit, noise, unit in (('seconds', threshold, NOISE_SECONDS, 's'),
+                                           ('peak_mb', memory_threshold, NOISE_MB, ' MB')):
+            before, after = previous[metric], measured[metric]
+            if after > before * (1 + limit) and after - before > noise:
+                found.append(f"{name}: {metric} {before}{unit} -> {after}{unit} "
+                             f"({after / before - 1:+.0%}, limit {limit:+.0%})")
+    return found
+
+
+def print_comparison(stages: Dict[str, Dict], baseline: Optional[Dict[str, Dict]]):
+    print(f"\n{'stage':<16} {'seconds':>9} {'baseline':>9} {'peak MB':>9} {'baseline':>9}")
+    for name, measured in stages.items():
+        previous = (baseline or {}).get(name, {})
+        print(f"{name:<16} {measured['seconds']:>9.2f} {previous.get('seconds', float('nan')):>9.2f} "
+              f"{measured['peak_mb']:>9.0f} {previous.get('peak_mb', float('nan')):>9.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the offline pipeline against committed baselines")
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help="Allowed relative slowdown per stage (0.25 = 25%%)")
+    parser.add_argument('--memory-threshold', type=float, default=MEMORY_THRESHOLD,
+                        help="Allowed relative peak memory growth per stage")
+    parser.add_argument('--repeat', type=int, default=1, help="Full runs; the best time per stage counts")
+    parser.add_argument('--update-baseline', action='store_true', help="Record this run as the new baseline")
+    parser.add_argument('--output', type=Path, default=None,
+                        help="Report path (default reports/pipeline-benchmark-<ts>.json)")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+        if baseline.get('report_version') != REPORT_VERSION or baseline.get('corpus') != CORPUS:
+            logger.warning("Baseline was recorded for a different report version or corpus; not comparing")
+            baseline = None
+    elif not args.update_baseline:
+        logger.warning(f"No baseline at {args.baseline}; run with --update-baseline to record one")
+
+    stages = run_benchmark(CORPUS, args.repeat)
+    report = {
+        'report_version': REPORT_VERSION,
+        'generated_at': datetime.now().isoformat(),
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(),
+                    'cpus': os.cpu_count()},
+        'corpus': CORPUS,
+        'repeat': args.repeat,
+        'stages': stages,
+    }
+    print_comparison(stages, baseline and baseline['stages'])
+
+    output = args.output or REPO_ROOT / 'reports' / f"pipeline-benchmark-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding='utf-8')
+    logger.info(f"Wrote report to {output}")
+
+    if args.update_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(report, indent=2) + '\n', encoding='utf-8')
+        logger.info(f"Recorded baseline {args.baseline}")
+        return 0
+    if baseline is None:
+        return 0
+    found = regressions(stages, baseline['stages'], args.threshold, args.memory_threshold)
+    for regression in found:
+        logger.error(f"Regression: {regression}")
+    if not found:
+        logger.info("No stage regressed beyond the thresholds")
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Scalar (int8) and Product Quantization for Section Embeddings
+
+Builds compact variants of an embedding store (see embedding_store.py) for
+memory-constrained deployments and reports, for each variant, its size and
+recall@10 against exact float32 inner-product search, so the smallest
+format that still returns the right regulations can be chosen.
+
+Variants written into the store directory:
+    sq8_codes.npy, sq8_params.npz        int8 codes with per-dimension scale/offset
+    pq{M}x8_codes.npy, pq{M}x8_codebooks.npy
+                                         M subquantizers with 256 centroids each
+    quantization-report.json             sizes, compression ratios, recall@10 and
+                                         recall 10@100 (quality as a re-ranking shortlist)
+
+Codebooks are trained offline with NumPy k-means.
+
+Recall is measured on held-out queries: sampled section vectors that are
+removed, with any identical copies, from the rows being searched, so no
+query can find itself as its top hit. With --query-vectors (e.g. real or
+golden queries embedded with the store's backend, as a .npy array) those
+are used against the whole store instead.
+
+Usage:
+    python quantize_embeddings.py build/embeddings/hashing-768-v1 --pq 16 32 96
+    python quantize_embeddings.py build/embeddings/hashing-768-v1 --query-vectors queries.npy
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from embedding_store import EmbeddingStore, atomic_write_bytes
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+PQ_CENTROIDS = 256
+SCORE_BLOCK_ROWS = 65536
+SHORTLIST_FACTOR = 10
+
+
+def squared_distances(x: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Pairwise squared L2 distances between rows of x and centroids."""
+    return (
+        np.einsum('ij,ij->i', x, x)[:, None]
+        - 2.0 * (x @ centroids.T)
+        + np.einsum('ij,ij->i', centroids, centroids)[None, :]
+    )
+
+
+def assign_clusters(x: np.ndarray, centroids: np.ndarray, block_rows: int = 16384) -> np.ndarray:
+    """Index of the nearest centroid for every row, computed in blocks to bound memory."""
+    # ||x||^2 is the same for every centroid, so it does not affect the argmin
+    centroid_norms = np.einsum('ij,ij->i', centroids, centroids)
+    labels = np.empty(len(x), dtype=np.int64)
+    for start in range(0, len(x), block_rows):
+        block = x[start:start + block_rows]
+        labels[start:start + block_rows] = np.argmin(centroid_norms - 2.0 * (block @ centroids.T), axis=1)
+    return labels
+
+
+def cluster_sums(x: np.ndarray, labels: np.ndarray, k: int) -> np.ndarray:
+    """Per-cluster sums of rows: sort by label, then one reduceat over the contiguous runs."""
+    order = np.argsort(labels, kind='stable')
+    present, starts = np.unique(labels[order], return_index=True)
+    sums = np.zeros((k, x.shape[1]), dtype=np.float64)
+    sums[present] = np.add.reduceat(x[order], starts, axis=0, dtype=np.float64)
+    return sums
+
+
+def train_kmeans(x: np.ndarray, k: int, iterations: int = 20, seed: int = 0,
+                 max_training_points: int = 65536) -> np.ndarray:
+    """Lloyd's k-means with k-means++ seeding on a random training sample; returns (k, dim) centroids."""
+    rng = np.random.default_rng(seed)
+    x = np.asarray(x, dtype=np.float32)
+    if len(x) > max_training_points:
+        x = x[rng.choice(len(x), max_training_points, replace=False)]
+    k = min(k, len(x))
+
+    # k-means++ seeding on a smaller sample; Lloyd iterations refine on the full one
+    seeds = x[rng.choice(len(x), min(len(x), k * 32), replace=False)]
+    centroids = np.empty((k, x.shape[1]), dtype=np.float32)
+    seed_norms = np.einsum('ij,ij->i', seeds, seeds)
+
+    def distances_to(centroid):
+        return np.maximum(seed_norms - 2.0 * (seeds @ centroid) + centroid @ centroid, 0)
+
+    centroids[0] = seeds[rng.integers(len(seeds))]
+    closest = distances_to(centroids[0])
+    for i in range(1, k):
+        total = closest.sum()
+        index = rng.choice(len(seeds), p=closest / total) if total > 0 else rng.integers(len(seeds))
+        centroids[i] = seeds[index]
+        np.minimum(closest, distances_to(centroids[i]), out=closest)
+
+    for _ in range(iterations):
+        labels = assign_clusters(x, centroids)
+        counts = np.bincount(labels, minlength=k)
+        sums = cluster_sums(x, labels, k)
+        nonempty = counts > 0
+        centroids[nonempty] = sums[nonempty] / counts[nonempty, None]
+        # Re-seed empty clusters on random points so every code stays usable
+        empty = np.flatnonzero(~nonempty)
+        if len(empty):
+            centroids[empty] = x[rng.choice(len(x), len(empty))]
+
+    return centroids
+
+
+def topk_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Row-wise indices of the k highest scores, best first."""
+    k = min(k, scores.shape[1])
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1)
+    return np.take_along_axis(part, order, axis=1)
+
+
+# ----------------------------------------------------------------------
+# Scalar quantization
+# ----------------------------------------------------------------------
+
+def train_scalar_quantizer(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-dimension affine int8 parameters mapping [min, max] onto [-128, 127]."""
+    low = matrix.min(axis=0).astype(np.float32)
+    high = matrix.max(axis=0).astype(np.float32)
+    scale = np.maximum(high - low, 1e-12) / 255.0
+    return scale.astype(np.float32), low
+
+
+def scalar_encode(matrix: np.ndarray, scale: np.ndarray, low: np.ndarray) -> np.ndarray:
+    codes = np.rint((matrix - low) / scale) - 128
+    return np.clip(codes, -128, 127).astype(np.int8)
+
+
+def scalar_scores(queries: np.ndarray, codes: np.ndarray, scale: np.ndarray, low: np.ndarray) -> np.ndarray:
+    """Inner products against int8 codes: q.x = (q*scale).(c+128) + q.low, one matmul per block."""
+    scaled = (queries * scale).astype(np.float32)
+    bias = queries @ low
+    scores = np.empty((len(queries), len(codes)), dtype=np.float32)
+    for start in range(0, len(codes), SCORE_BLOCK_ROWS):
+        block = codes[start:start + SCORE_BLOCK_ROWS].astype(np.float32) + 128.0
+        scores[:, start:start + SCORE_BLOCK_ROWS] = scaled @ block.T
+    return scores + bias[:, None]
+
+
+# ----------------------------------------------------------------------
+# Product quantization
+# ----------------------------------------------------------------------
+
+def pq_subspaces(dim: int, m: int) -> List[slice]:
+    if dim % m:
+        raise ValueError(f"PQ subquantizer count {m} must divide the dimension {dim}")
+    width = dim // m
+    return [slice(i * width, (i + 1) * width) for i in range(m)]
+
+
+def train_product_quantizer(matrix: np.ndarray, m: int, iterations: int = 20, seed: int = 0) -> np.ndarray:
+    """Train one codebook per subspace; returns (m, k, dim/m) codebooks with k <= 256.
+
+    Corpora with fewer than 256 sections get one centroid per section instead
+    of padding the codebooks out to 256 entries.
+    """
+    subspaces = pq_subspaces(matrix.shape[1], m)
+    k = min(PQ_CENTROIDS, len(matrix))
+    return np.stack([
+        train_kmeans(matrix[:, sub], k, iterations, seed + i) for i, sub in enumerate(subspaces)
+    ]).astype(np.float32)
+
+
+def pq_encode(matrix: np.ndarray, codebooks: np.ndarray) -> np.ndarray:
+    m = codebooks.shape[0]
+    codes = np.empty((len(matrix), m), dtype=np.uint8)
+    for i, sub in enumerate(pq_subspaces(matrix.shape[1], m)):
+        codes[:, i] = assign_clusters(np.asarray(matrix[:, sub], dtype=np.float32), codebooks[i])
+    return codes
+
+
+def pq_scores(queries: np.ndarray, codes: np.ndarray, codebooks: np.ndarray) -> np.ndarray:
+    """Asymmetric distance computation: per-query lookup tables summed over subquantizers."""
+    m = codebooks.shape[0]
+    subspaces = pq_subspaces(queries.shape[1], m)
+    # tables[i] has shape (queries, 256): inner product of each query subvector with each centroid
+    tables = [queries[:, sub] @ codebooks[i].T for i, sub in enumerate(subspaces)]
+    scores = np.zeros((len(queries), len(codes)), dtype=np.float32)
+    for i in range(m):
+        scores += tables[i][:, codes[:, i]]
+    return scores
+
+
+# ----------------------------------------------------------------------
+# Evaluation and CLI
+# ----------------------------------------------------------------------
+
+def sample_queries(matrix: np.ndarray, count: int, noise: float = 0.05, seed: int = 0) -> np.ndarray:
+    """Perturbed, renormalized corpus rows used as evaluation queries."""
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(matrix), min(count, len(matrix)), replace=False)
+    queries = np.asarray(matrix[rows], dtype=np.float32)
+    queries = queries + rng.normal(0, noise / np.sqrt(matrix.shape[1]), queries.shape).astype(np.float32)
+    norms = np.linalg.norm(queries, axis=1, keepdims=True)
+    return queries / np.where(norms > 0, norms, 1)
+
+
+def held_out_queries(matrix: np.ndarray, count: int, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """Sampled corpus vectors as queries, and the rows to hide from search (the samples and exact copies).
+
+    At most half of the distinct vectors are held out so the rest can still be searched.
+    """
+    rng = np.random.default_rng(seed)
+    _, first, groups = np.unique(matrix, axis=0, return_index=True, return_inverse=True)
+    chosen = rng.choice(len(first), min(count, len(first) // 2), replace=False)
+    queries = np.asarray(matrix[first[chosen]], dtype=np.float32)
+    norms = np.linalg.norm(queries, axis=1, keepdims=True)
+    hidden = np.flatnonzero(np.isin(groups.reshape(-1), chosen))
+    return queries / np.where(norms > 0, norms, 1), hidden
+
+
+def recall_at_k(exact: np.ndarray, approx: np.ndarray) -> float:
+    """Fraction of the exact top-k found in the approximate result lists (which may be longer)."""
+    hits = sum(len(set(e) & set(a)) for e, a in zip(exact.tolist(), approx.tolist()))
+    return hits / exact.size if exact.size else 0.0
+
+
+def evaluate(name: str, scores_fn, exact_top: np.ndarray, queries: np.ndarray, code_bytes: int,
+             overhead_bytes: int, float_bytes: int, k: int, hidden: np.ndarray) -> Dict:
+    """Score a variant; compression compares code bytes only, since codebooks are a fixed cost."""
+    start = time.perf_counter()
+    scores = scores_fn(queries)
+    scores[:, hidden] = -np.inf
+    approx_top = topk_indices(scores, k)
+    elapsed = time.perf_counter() - start
+    # How well the variant works as a shortlist for re-ranking with float vectors
+    shortlist = topk_indices(scores, k * SHORTLIST_FACTOR)
+    result = {
+        'variant': name,
+        'code_bytes': int(code_bytes),
+        'overhead_bytes': int(overhead_bytes),
+        'compression': round(float_bytes / code_bytes, 2) if code_bytes else None,
+        f'recall@{k}': round(recall_at_k(exact_top, approx_top), 4),
+        f'recall{k}@{k * SHORTLIST_FACTOR}': round(recall_at_k(exact_top, shortlist), 4),
+        'query_ms': round(elapsed / len(queries) * 1000, 4),
+    }
+    logger.info(f"{name:>10}: {code_bytes:>12,} bytes (+{overhead_bytes:,})  x{result['compression']:<6} "
+                f"recall@{k} {result[f'recall@{k}']:.4f}  "
+                f"recall{k}@{k * SHORTLIST_FACTOR} {result[f'recall{k}@{k * SHORTLIST_FACTOR}']:.4f}")
+    return result
+
+
+def quantize_store(store_dir: Path, pq_sizes: List[int], k: int = 10, query_count: int = 1000,
+                   iterations: int = 20, seed: int = 0, query_vectors: Optional[np.ndarray] = None) -> Dict:
+    """Write int8 and PQ variants of a store and return the recall report.
+
+    Recall uses query_vectors against every row if given, else held-out corpus vectors.
+    """
+    store = EmbeddingStore.open(store_dir)
+    matrix = np.asarray(store.matrix, dtype=np.float32)
+    float_bytes = matrix.nbytes
+
+    if query_vectors is not None:
+        queries = np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+        hidden = np.empty(0, dtype=np.int64)
+        query_source = 'query-vectors'
+    else:
+        queries, hidden = held_out_queries(matrix, query_count, seed)
+        query_source = 'held-out'
+    k = min(k, len(matrix) - len(hidden))
+    start = time.perf_counter()
+    scores = queries @ matrix.T
+    scores[:, hidden] = -np.inf
+    exact_top = topk_indices(scores, k)
+    exact_ms = (time.perf_counter() - start) / len(queries) * 1000
+    logger.info(f"{'float32':>10}: {float_bytes:>12,} bytes  exact search {exact_ms:.4f} ms/query")
+
+    variants = []
+
+    scale, low = train_scalar_quantizer(matrix)
+    codes = scalar_encode(matrix, scale, low)
+    atomic_write_bytes(store_dir / 'sq8_codes.npy', lambda f: np.save(f, codes))
+    atomic_write_bytes(store_dir / 'sq8_params.npz', lambda f: np.savez(f, scale=scale, low=low))
+    variants.append(evaluate(
+        'sq8', lambda q: scalar_scores(q, codes, scale, low), exact_top, queries,
+        codes.nbytes, scale.nbytes + low.nbytes, float_bytes, k, hidden,
+    ))
+
+    for m in pq_sizes:
+        if matrix.shape[1] % m:
+            logger.warning(f"Skipping PQ{m}: does not divide dimension {matrix.shape[1]}")
+            continue
+        codebooks = train_product_quantizer(matrix, m, iterations, seed)
+        pq_codes = pq_encode(matrix, codebooks)
+        atomic_write_bytes(store_dir / f'pq{m}x8_codes.npy', lambda f: np.save(f, pq_codes))
+        atomic_write_bytes(store_dir / f'pq{m}x8_codebooks.npy', lambda f: np.save(f, codebooks))
+        variants.append(evaluate(
+            f'pq{m}x8', lambda q: pq_scores(q, pq_codes, codebooks), exact_top, queries,
+            pq_codes.nbytes, codebooks.nbytes, float_bytes, k, hidden,
+        ))
+
+    report = {
+        'store': str(store_dir),
+        'model_id': store.model_id,
+        'sections': len(store),
+        'dim': store.dim,
+        'queries': len(queries),
+        'query_source': query_source,
+        'k': k,
+        'float32': {'bytes': int(float_bytes), 'query_ms': round(exact_ms, 4)},
+        'variants': variants,
+    }
+    report_path = store_dir / 'quantization-report.json'
+    atomic_write_bytes(report_path, lambda f: f.write(json.dumps(report, indent=2).encode('utf-8')))
+    logger.info(f"Wrote quantization report to {report_path}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build int8 and PQ variants of an embedding store")
+    parser.add_argument('store', type=Path, help="Embedding store directory")
+    parser.add_argument('--pq', type=int, nargs='*', default=[8, 16, 32],
+                        help="PQ subquantizer counts (each must divide the dimension)")
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=1000,
+                        help="Held-out corpus vectors used as evaluation queries")
+    parser.add_argument('--query-vectors', type=Path, default=None,
+                        help=".npy of query embeddings from the store's backend, used instead of held-out vectors")
+    parser.add_argument('--iterations', type=int, default=20, help="k-means iterations per codebook")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    query_vectors = np.load(args.query_vectors) if args.query_vectors else None
+    quantize_store(args.store, args.pq, args.k, args.queries, args.iterations, args.seed, query_vectors)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Converter Render Cache
+
+SQLite table of rendered text keyed by a hash of the converter's source code
+and the raw input fragment (an eCFR PART element, an ABS PDF page). With
+--render-cache, the converters look each fragment up here and only render
+the parts or pages whose input or converter code changed, which keeps
+watch-mode rebuilds (watch.py) to seconds.
+
+Usage:
+    python render_cache.py stats
+    python render_cache.py clear
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from sections import BUILD_DIR
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_RENDER_CACHE_PATH = BUILD_DIR / 'render-cache.sqlite'
+
+
+def code_version(source_file) -> str:
+    """SHA-256 of a converter's source, so editing parsing rules invalidates its entries."""
+    return hashlib.sha256(Path(source_file).read_bytes()).hexdigest()
+
+
+class RenderCache:
+    """Fragment renders for one converter; puts are buffered and written on close."""
+
+    def __init__(self, path: Path = DEFAULT_RENDER_CACHE_PATH, namespace: str = '', version: str = ''):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.namespace = namespace
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self.pending: List[Tuple[str, str, str, float]] = []
+        self.connection = sqlite3.connect(str(self.path))
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS renders (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                text TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            ) WITHOUT ROWID
+        """)
+        self.connection.commit()
+
+    def __enter__(self) -> 'RenderCache':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def key(self, fragment: bytes) -> str:
+        return hashlib.sha256(self.version.encode('ascii') + b'\0' + fragment).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        row = self.connection.execute(
+            "SELECT text FROM renders WHERE namespace = ? AND key = ?", (self.namespace, key)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put(self, key: str, text: str):
+        self.pending.append((self.namespace, key, text, time.time()))
+
+    def flush(self):
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO renders (namespace, key, text, last_used) VALUES (?, ?, ?, ?)", self.pending
+            )
+        self.pending = []
+
+    def close(self):
+        self.flush()
+        if self.hits or self.misses:
+            logger.info(f"Render cache {self.namespace}: {self.hits} reused, {self.misses} rendered")
+        self.connection.close()
+
+    def stats(self) -> dict:
+        rows = self.connection.execute(
+            "SELECT namespace, COUNT(*), SUM(LENGTH(text)) FROM renders GROUP BY namespace"
+        ).fetchall()
+        return {namespace: {'entries': count, 'chars': chars} for namespace, count, chars in rows}
+
+    def clear(self, namespace: Optional[str] = None) -> int:
+        with self.connection:
+            if namespace is None:
+                cursor = self.connection.execute("DELETE FROM renders")
+            else:
+                cursor = self.connection.execute("DELETE FROM renders WHERE namespace = ?", (namespace,))
+        return cursor.rowcount
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the converter render cache")
+    parser.add_argument('command', choices=['stats', 'clear'])
+    parser.add_argument('--cache', type=Path, default=DEFAULT_RENDER_CACHE_PATH)
+    parser.add_argument('--namespace', default=None, help="Limit clear to one converter (ecfr, abs)")
+    args = parser.parse_args()
+
+    cache = RenderCache(args.cache)
+    if args.command == 'stats':
+        print(json.dumps(cache.stats(), indent=2))
+    else:
+        logger.info(f"Removed {cache.clear(args.namespace)} entries")
+    cache.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Batch Top-k Search over the Embedding Store
+
+Scores a batch of query vectors against every section in an embedding store
+(see embedding_store.py) with one matrix multiply per block of store rows,
+keeping a running top-k per query via argpartition, so memory stays bounded
+by (queries x block) however large the corpus is. Queries can be raw vectors
+(.npy) or texts embedded with the backend that built the store.
+
+Results stream as JSONL, one line per query:
+    {"query": "...", "results": [{"id": "cfr46_12", "score": 0.83}, ...]}
+
+Usage:
+    python search_embeddings.py build/embeddings/hashing-768-v1 --text "fire extinguisher inspection"
+    python search_embeddings.py build/embeddings/hashing-768-v1 --queries-file questions.txt -k 5 > results.jsonl
+    python search_embeddings.py build/embeddings/hashing-768-v1 --vectors queries.npy --output results.jsonl
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from embed_sections import backend_for_model_id, create_backend, embed_texts, normalize_rows
+from embedding_store import EmbeddingStore
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BLOCK_ROWS = 16384
+QUERY_BATCH = 1024
+
+
+def search(matrix: np.ndarray, queries: np.ndarray, k: int = 10,
+           block_rows: int = BLOCK_ROWS) -> Tuple[np.ndarray, np.ndarray]:
+    """Exact inner-product top-k; returns (rows, scores), each (queries, k), best first."""
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+    k = max(min(k, len(matrix)), 0)
+    best_rows = np.empty((len(queries), 0), dtype=np.int64)
+    best_scores = np.empty((len(queries), 0), dtype=np.float32)
+    if k == 0:
+        # Slicing [:, -0:] would keep every column
+        return best_rows, best_scores
+
+    for start in range(0, len(matrix), block_rows):
+        block = np.asarray(matrix[start:start + block_rows], dtype=np.float32)
+        scores = queries @ block.T
+        if scores.shape[1] > k:
+            # Partitioning for the largest k directly avoids materializing -scores
+            part = np.argpartition(scores, -k, axis=1)[:, -k:]
+            scores = np.take_along_axis(scores, part, axis=1)
+        else:
+            part = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+
+        # Merge this block's candidates into the running top-k
+        rows = np.concatenate([best_rows, part + start], axis=1)
+        scores = np.concatenate([best_scores, scores], axis=1)
+        if rows.shape[1] > k:
+            keep = np.argpartition(scores, -k, axis=1)[:, -k:]
+            rows = np.take_along_axis(rows, keep, axis=1)
+            scores = np.take_along_axis(scores, keep, axis=1)
+        best_rows, best_scores = rows, scores
+
+    order = np.argsort(-best_scores, axis=1, kind='stable')
+    return np.take_along_axis(best_rows, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+
+def positive_int(value: str) -> int:
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
+def search_batches(store: EmbeddingStore, queries: np.ndarray, k: int = 10,
+                   batch_size: int = QUERY_BATCH) -> Iterator[Tuple[int, np.ndarray, np.ndarray]]:
+    """Yield (first query index, rows, scores) per query batch so results can be streamed."""
+    for start in range(0, len(queries), batch_size):
+        rows, scores = search(store.matrix, queries[start:start + batch_size], k)
+        yield start, rows, scores
+
+
+def embed_queries(texts: List[str], backend, batch_size: int = 256) -> np.ndarray:
+    """Embed and L2-normalize query texts with the same backend used for the store."""
+    if not texts:
+        return np.zeros((0, getattr(backend, 'dim', None) or 0), dtype=np.float32)
+    return normalize_rows(embed_texts(texts, backend, batch_size))
+
+
+def read_queries_file(path: Path) -> List[str]:
+    """One query per line; blank lines and # comments are skipped."""
+    lines = path.read_text(encoding='utf-8').splitlines()
+    return [line.strip() for line in lines if line.strip() and not line.lstrip().startswith('#')]
+
+
+def format_results(store: EmbeddingStore, rows: np.ndarray, scores: np.ndarray,
+                   labels: Optional[List[str]], offset: int) -> Iterator[str]:
+    for i, (query_rows, query_scores) in enumerate(zip(rows.tolist(), scores.tolist())):
+        record = {
+            'query': labels[offset + i] if labels else offset + i,
+            'results': [
+                {'id': store.ids[row], 'score': round(score, 6)}
+                for row, score in zip(query_rows, query_scores)
+            ],
+        }
+        yield json.dumps(record, ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Top-k section search over an embedding store")
+    parser.add_argument('store', type=Path)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--text', nargs='+', help="Query texts")
+    source.add_argument('--queries-file', type=Path, help="File with one query text per line")
+    source.add_argument('--vectors', type=Path, help=".npy file of query vectors, shape (queries, dim)")
+    parser.add_argument('-k', type=positive_int, default=10, help="Results per query (at least 1)")
+    parser.add_argument('--backend', default=None, help="Embedding backend for text queries (default: the store's)")
+    parser.add_argument('--model', default=None)
+    parser.add_argument('--batch-size', type=int, default=QUERY_BATCH, help="Queries scored per batch")
+    parser.add_argument('--output', type=Path, default=None, help="JSONL output file (default stdout)")
+    args = parser.parse_args()
+
+    store = EmbeddingStore.open(args.store)
+
+    labels = None
+    if args.vectors:
+        queries = np.load(args.vectors).astype(np.float32)
+    else:
+        labels = args.text or read_queries_file(args.queries_file)
+        if args.backend:
+            backend = create_backend(args.backend, args.model, store.dim)
+        else:
+            backend = backend_for_model_id(store.model_id)
+        queries = embed_queries(labels, backend)
+    if queries.ndim != 2 or queries.shape[1] != store.dim:
+        parser.error(f"Query vectors have shape {queries.shape}; the store has dimension {store.dim}")
+
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    start = time.perf_counter()
+    try:
+        for offset, rows, scores in search_batches(store, queries, args.k, args.batch_size):
+            for line in format_results(store, rows, scores, labels, offset):
+                output.write(line + '\n')
+            output.flush()
+    finally:
+        if args.output:
+            output.close()
+    elapsed = time.perf_counter() - start
+    logger.info(f"Searched {len(queries)} queries against {len(store)} sections in {elapsed:.3f}s "
+                f"({len(queries) / elapsed if elapsed else 0:,.0f} queries/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
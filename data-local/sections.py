@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Section records for the converted regulation documents
+
+Splits the Markdown produced by ecfr_xml_to_markdown.py and
+abs_part7_pdf_parser.py into section records exactly the way the backend's
+LocalSearchService.parseMarkdownSections does, so every offline stage keys
+its output by the same `documentId_index` section IDs the backend uses.
+
+Usage:
+    python sections.py > sections.jsonl
+    python sections.py cfr46 --data-dir build/synthetic > sections.jsonl
+"""
+
+import argparse
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from nlp import JS_SPACE, SPLIT_PATTERN, js_trim
+
+DATA_DIR = Path(__file__).resolve().parent
+BUILD_DIR = DATA_DIR / 'build'
+SCRIPTS_DIR = DATA_DIR.parent / 'scripts'
+
+# documentId -> converted Markdown file, in backend load order
+DOCUMENTS = {
+    'abs_part7': 'ABS-Part-7-Structured.md',
+    'cfr33': 'ECFR-title33.md',
+    'cfr46': 'ECFR-title46.md',
+}
+
+DOCUMENT_TITLES = {
+    'abs_part7': 'ABS Part 7: Survey After Construction',
+    'cfr33': '33 CFR: Navigation and Navigable Waters',
+    'cfr46': '46 CFR: Shipping',
+}
+
+# JS regex semantics: \s is ECMAScript whitespace and `.` stops at any line terminator,
+# so a heading line ending in \r (CRLF files) is not a heading for the backend either
+HEADER_PATTERN = re.compile(f'(#{{1,6}}){JS_SPACE}+([^\n\r\u2028\u2029]+)\\Z')
+
+SECTION_NUMBER_PATTERNS = [
+    re.compile(pattern.replace(r'\s', JS_SPACE), flags | re.ASCII)
+    for pattern, flags in [
+        (r'§\s*(\d+(?:\.\d+)*(?:-\d+)*)', 0),  # CFR sections like § 1.01-1
+        (r'Chapter\s+(\d+)', re.IGNORECASE),  # Chapters
+        (r'Part\s+(\d+)', re.IGNORECASE),  # Parts
+        (r'Section\s+(\d+)', re.IGNORECASE),  # Sections
+    ]
+]
+
+
+def extract_section_number(title: str) -> Optional[str]:
+    """Extract section numbers like "§ 1.01-1", "Chapter 1", "Part 7" from a heading."""
+    for pattern in SECTION_NUMBER_PATTERNS:
+        match = pattern.search(title)
+        if match:
+            return match.group(1)
+    return None
+
+
+def parse_markdown_sections(content: str, document_id: str) -> List[Dict]:
+    """Split Markdown into section records, mirroring parseMarkdownSections in local-search.js.
+
+    Records also carry the titles of their enclosing headings (`parents`) and the
+    UTF-8 byte offset of their heading line (`offset`), which the backend does not track.
+    """
+    sections = []
+    current = None
+    body_lines = []
+    open_headings = []  # (level, title) of the enclosing headings
+    offset = 0  # UTF-8 byte offset of the current line
+
+    def finish():
+        body = js_trim(''.join(body_lines))
+        current['content'] = body
+        current['word_count'] = len(SPLIT_PATTERN.split(body))
+        sections.append(current)
+
+    for line in content.split('\n'):
+        match = HEADER_PATTERN.match(line)
+        if match:
+            if current is not None:
+                finish()
+            title = js_trim(match.group(2))
+            level = len(match.group(1))
+            while open_headings and open_headings[-1][0] >= level:
+                open_headings.pop()
+            current = {
+                'id': f"{document_id}_{len(sections)}",
+                'document_id': document_id,
+                'index': len(sections),
+                'title': title,
+                'level': level,
+                'section_number': extract_section_number(title),
+                'parents': [heading for _, heading in open_headings],
+                'offset': offset,
+            }
+            open_headings.append((level, title))
+            body_lines = []
+        elif current is not None and js_trim(line):
+            body_lines.append(line + '\n')
+        offset += len(line.encode('utf-8')) + 1
+
+    if current is not None:
+        finish()
+
+    return sections
+
+
+def section_text(section: Dict) -> str:
+    """Text the backend indexes for a section: title followed by content."""
+    return f"{section['title']} {section['content']}"
+
+
+def load_document_sections(document_id: str, data_dir: Path = DATA_DIR) -> List[Dict]:
+    """Load and split one converted document."""
+    path = Path(data_dir) / DOCUMENTS[document_id]
+    return parse_markdown_sections(path.read_text(encoding='utf-8'), document_id)
+
+
+def iter_sections(document_ids: Optional[List[str]] = None, data_dir: Path = DATA_DIR) -> Iterator[Dict]:
+    """Yield section records for the given (default: all) documents that exist on disk."""
+    for document_id in document_ids or DOCUMENTS:
+        if (Path(data_dir) / DOCUMENTS[document_id]).exists():
+            yield from load_document_sections(document_id, data_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print section records as JSON lines")
+    parser.add_argument('documents', nargs='*', help=f"Documents (default: all of {', '.join(DOCUMENTS)})")
+    parser.add_argument('--data-dir', type=Path, default=DATA_DIR)
+    args = parser.parse_args()
+
+    for section in iter_sections(args.documents or None, args.data_dir):
+        print(json.dumps(section, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+Sharded, Lazily Loadable Search Index
+
+Splits the keyword index, section text and (optionally) embeddings into one
+shard per document part: CFR parts (#### PART n) and ABS chapters
+(# Chapter n), with front matter before the first part in its own shard.
+A query reads the small manifest and term directory once, then loads only
+the shards that can still place a section in its top k, instead of every
+document up front.
+
+Layout of the shard directory:
+    manifest.json           shard list with per-shard section ranges and
+                            term statistics, document hashes
+    terms.json              term -> [global df, shard, shard df,
+                            shard max tf/length, ...]
+    <documentId>/<part>/    keyword.json (keyword index artifact, see
+                            keyword_index.py), sections.json (section
+                            records) and, with --store, embeddings.npy and
+                            ids.json (embedding store slice)
+
+Scores use the global document frequencies and section count from the term
+directory, so sharded search returns exactly the monolithic index's scores.
+Search is max-score pruned at shard granularity. The term directory keeps
+each term's largest tf/length per shard; a shard's upper bound spends a
+section's token budget on those ratios, highest idf first. Shards are
+scored best bound first, and once k sections score above every remaining
+shard's bound the rest are never read. Each section lives in one shard, so
+a scored shard leaves its sections' scores final.
+
+`build` writes a new generation directory and swaps the output path to it
+(see embedding_store.swap_directory), so shards from an earlier, larger
+build never linger next to the new manifest.
+
+Usage:
+    python shard_index.py build --output build/shards
+    python shard_index.py benchmark --data-dir build/synthetic [--max-shard-fraction 0.4]
+"""
+
+import argparse
+import bisect
+import heapq
+import json
+import logging
+import math
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from embedding_store import EmbeddingStore, document_of, swap_directory, write_store
+from keyword_index import INDEX_FORMAT, KeywordIndex, document_hashes, rank
+from nlp import JS_SPACE, process_text
+from sections import BUILD_DIR, DATA_DIR, iter_sections
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SHARDS_FORMAT = 'arrowreg-shards-v2'
+DEFAULT_SHARD_DIR = BUILD_DIR / 'shards'
+MANIFEST_FILE = 'manifest.json'
+TERMS_FILE = 'terms.json'
+
+# documentId -> (heading level that opens a part, title pattern, shard name prefix)
+PART_HEADINGS = {
+    'cfr33': (4, re.compile(f'PART{JS_SPACE}+(\\d+)', re.IGNORECASE | re.ASCII), 'part'),
+    'cfr46': (4, re.compile(f'PART{JS_SPACE}+(\\d+)', re.IGNORECASE | re.ASCII), 'part'),
+    'abs_part7': (1, re.compile(f'Chapter{JS_SPACE}+(\\d+)', re.IGNORECASE | re.ASCII), 'chapter'),
+}
+FRONT_MATTER = 'front'
+# Benchmark gate: mean share of shards a query may score (unpruned search reads ~all of them)
+MAX_SHARD_FRACTION = 0.4
+# Slack on shard bounds so float rounding in a section's score never exceeds its bound
+BOUND_SLACK = 1e-9
+
+
+def assign_shards(sections: Iterable[Dict]) -> Dict[str, List[Dict]]:
+    """Group sections by document part, keeping document and section order."""
+    shards: Dict[str, List[Dict]] = {}
+    current = {}
+    for section in sections:
+        document_id = section['document_id']
+        level, pattern, prefix = PART_HEADINGS.get(document_id, (None, None, None))
+        if level is not None and section['level'] == level:
+            match = pattern.match(section['title'])
+            if match:
+                current[document_id] = f"{prefix}-{int(match.group(1))}"
+        shard_id = f"{document_id}/{current.get(document_id, FRONT_MATTER)}"
+        shards.setdefault(shard_id, []).append(section)
+    return shards
+
+
+def index_ranges(sections: List[Dict]) -> List[List[int]]:
+    """Contiguous [first, last] section index ranges covered by a shard."""
+    ranges = []
+    for section in sections:
+        if ranges and section['index'] == ranges[-1][1] + 1:
+            ranges[-1][1] = section['index']
+        else:
+            ranges.append([section['index'], section['index']])
+    return ranges
+
+
+def write_json(path: Path, data, compact: bool = True) -> int:
+    text = json.dumps(data, separators=(',', ':') if compact else None, indent=None if compact else 2,
+                      ensure_ascii=False)
+    path.write_text(text, encoding='utf-8')
+    return len(text.encode('utf-8'))
+
+
+def build_shards(output: Path = DEFAULT_SHARD_DIR, data_dir: Path = DATA_DIR,
+                 store_dir: Optional[Path] = None) -> Dict:
+    """Write every shard, the term directory and the manifest into a new generation; return the manifest."""
+    link = Path(output)
+    link.parent.mkdir(parents=True, exist_ok=True)
+    output = link.with_name(f"{link.name}.{time.time_ns():016x}")
+    sections = list(iter_sections(data_dir=data_dir))
+    shards = assign_shards(sections)
+    store = EmbeddingStore.open(store_dir) if store_dir else None
+    stored_ids = set(store.ids) if store else set()
+    hashes = document_hashes(data_dir)
+
+    manifest_shards = []
+    directory: Dict[str, List] = {}
+    for shard_number, (shard_id, shard_sections) in enumerate(shards.items()):
+        shard_dir = output / shard_id
+        shard_dir.mkdir(parents=True, exist_ok=True)
+        document_id = shard_sections[0]['document_id']
+
+        index = KeywordIndex.from_sections(shard_sections)
+        sizes = {
+            'keyword': write_json(shard_dir / 'keyword.json',
+                                  index.to_artifact({document_id: hashes.get(document_id)})),
+            'sections': write_json(shard_dir / 'sections.json', shard_sections),
+        }
+        if store is not None:
+            ids = [s['id'] for s in shard_sections if s['id'] in stored_ids]
+            matrix = np.asarray([store.vector(section_id) for section_id in ids], dtype=np.float32)
+            write_store(shard_dir, ids, matrix.reshape(len(ids), store.dim), store.model_id)
+            sizes['embeddings'] = (shard_dir / 'embeddings.npy').stat().st_size
+
+        for term, postings in index.postings.items():
+            entry = directory.setdefault(term, [0])
+            entry[0] += len(postings)
+            max_ratio = max(tf / index.section_lengths[section_id] for section_id, tf in postings.items())
+            entry.extend([shard_number, len(postings), max_ratio])
+
+        manifest_shards.append({
+            'id': shard_id,
+            'document_id': document_id,
+            'path': shard_id,
+            'sections': len(shard_sections),
+            'ranges': index_ranges(shard_sections),
+            'terms': len(index.postings),
+            'tokens': sum(index.section_lengths.values()),
+            'bytes': sizes,
+        })
+
+    terms_bytes = write_json(output / TERMS_FILE, directory)
+    manifest = {
+        'format': SHARDS_FORMAT,
+        'keyword_format': INDEX_FORMAT,
+        'documents': hashes,
+        'total_sections': len(sections),
+        'embedding_model': store.model_id if store else None,
+        'term_directory': {'path': TERMS_FILE, 'terms': len(directory), 'bytes': terms_bytes},
+        'shards': manifest_shards,
+    }
+    write_json(output / MANIFEST_FILE, manifest, compact=False)
+    swap_directory(link, output)
+    logger.info(f"Wrote {len(manifest_shards)} shards over {len(sections)} sections "
+                f"({len(directory)} terms) to {link}")
+    return manifest
+
+
+class ShardedIndex:
+    """Query API over a shard directory; shards are read on first use and cached."""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.manifest = json.loads((self.directory / MANIFEST_FILE).read_text(encoding='utf-8'))
+        if self.manifest.get('format') != SHARDS_FORMAT:
+            raise ValueError(f"{directory} is not an {SHARDS_FORMAT} shard directory")
+        self.terms = json.loads((self.directory / self.manifest['term_directory']['path']).read_text(encoding='utf-8'))
+        self.shards = self.manifest['shards']
+        self.total_sections = self.manifest['total_sections']
+        self.bytes_loaded = 0
+        self.last_shards: List[int] = []
+        self._keyword: Dict[int, KeywordIndex] = {}
+        self._sections: Dict[int, Dict[str, Dict]] = {}
+
+        # Per document, shard starts sorted by first section index, for section lookups
+        self._starts: Dict[str, List[Tuple[int, int, int]]] = {}
+        for number, shard in enumerate(self.shards):
+            for first, last in shard['ranges']:
+                self._starts.setdefault(shard['document_id'], []).append((first, last, number))
+        for starts in self._starts.values():
+            starts.sort()
+        # Document load order, for the monolithic index's tie order
+        self._document_order = {document_id: i for i, document_id in enumerate(self.manifest['documents'])}
+
+    def _read(self, number: int, filename: str):
+        path = self.directory / self.shards[number]['path'] / filename
+        data = path.read_bytes()
+        self.bytes_loaded += len(data)
+        return json.loads(data)
+
+    def keyword_shard(self, number: int) -> KeywordIndex:
+        if number not in self._keyword:
+            self._keyword[number] = KeywordIndex.from_artifact(self._read(number, 'keyword.json'))
+        return self._keyword[number]
+
+    def shards_for(self, query: str, sources: Optional[List[str]] = None) -> List[int]:
+        """Shards containing at least one query term (optionally limited to some documents)."""
+        numbers = set()
+        for term in dict.fromkeys(process_text(query)):
+            entry = self.terms.get(term)
+            if entry:
+                numbers.update(entry[1::3])
+        if sources:
+            numbers = {n for n in numbers if self.shards[n]['document_id'] in sources}
+        return sorted(numbers)
+
+    def idf(self, entry: List) -> float:
+        return math.log((self.total_sections + 1) / (entry[0] + 1)) + 1
+
+    def score(self, query: str, sources: Optional[List[str]] = None) -> Dict[str, float]:
+        """Every matching section's score, as KeywordIndex.score; reads all shards holding a query term."""
+        scores: Dict[str, float] = {}
+        for term in dict.fromkeys(process_text(query)):
+            entry = self.terms.get(term)
+            if not entry:
+                continue
+            idf = self.idf(entry)
+            for number in entry[1::3]:
+                if sources and self.shards[number]['document_id'] not in sources:
+                    continue
+                shard = self.keyword_shard(number)
+                for section_id, tf in shard.postings[term].items():
+                    score = tf / shard.section_lengths[section_id] * idf
+                    scores[section_id] = scores.get(section_id, 0.0) + score
+        return scores
+
+    def shard_bounds(self, terms: List[str], sources: Optional[List[str]] = None) -> Dict[int, float]:
+        """Upper bound on any section's score in each shard holding a query term.
+
+        A section scores sum(idf * tf / length) and its query-term tfs sum to
+        at most its length, so the bound fills a budget of 1 with the shard's
+        largest tf/length per term, highest idf first (a fractional knapsack).
+        """
+        ratios: Dict[int, List[Tuple[float, float]]] = {}
+        for term in terms:
+            entry = self.terms[term]
+            idf = self.idf(entry)
+            for i in range(1, len(entry), 3):
+                number = entry[i]
+                if sources and self.shards[number]['document_id'] not in sources:
+                    continue
+                ratios.setdefault(number, []).append((idf, entry[i + 2]))
+        bounds = {}
+        for number, pairs in ratios.items():
+            bound, budget = 0.0, 1.0
+            for idf, ratio in sorted(pairs, reverse=True):
+                used = min(ratio, budget)
+                bound += idf * used
+                budget -= used
+                if budget <= 0:
+                    break
+            bounds[number] = bound
+        return bounds
+
+    def search(self, query: str, k: int = 10, sources: Optional[List[str]] = None) -> List[Tuple[str, float]]:
+        """The monolithic index's top k (scores and tie order), reading only shards that can reach it."""
+        terms = [term for term in dict.fromkeys(process_text(query)) if term in self.terms]
+        bounds = self.shard_bounds(terms, sources)
+        scores: Dict[str, float] = {}
+        first_term: Dict[str, int] = {}
+        top: List[float] = []  # min-heap of the k best scores so far
+        self.last_shards = []
+        for number in sorted(bounds, key=lambda n: (-bounds[n], n)):
+            # Equal scores still need the shard: ties rank by term and load order
+            if len(top) == k and bounds[number] * (1 + BOUND_SLACK) < top[0]:
+                break
+            shard = self.keyword_shard(number)
+            self.last_shards.append(number)
+            shard_scores: Dict[str, float] = {}
+            for position, term in enumerate(terms):
+                idf = self.idf(self.terms[term])
+                for section_id, tf in shard.postings.get(term, {}).items():
+                    score = tf / shard.section_lengths[section_id] * idf
+                    shard_scores[section_id] = shard_scores.get(section_id, 0.0) + score
+                    first_term.setdefault(section_id, position)
+            scores.update(shard_scores)
+            for score in shard_scores.values():
+                if len(top) < k:
+                    heapq.heappush(top, score)
+                elif score > top[0]:
+                    heapq.heapreplace(top, score)
+
+        # The monolithic index inserts sections term by term, each term's postings in load order
+        def tie_order(section_id: str):
+            document_id, index = section_id.rsplit('_', 1)
+            return -scores[section_id], first_term[section_id], self._document_order.get(document_id, 0), int(index)
+
+        return [(section_id, scores[section_id]) for section_id in sorted(scores, key=tie_order)[:k]]
+
+    def shard_of(self, section_id: str) -> Optional[int]:
+        document_id = document_of(section_id)
+        index = int(section_id.rsplit('_', 1)[1])
+        starts = self._starts.get(document_id, [])
+        position = bisect.bisect_right(starts, (index, float('inf'))) - 1
+        if position >= 0 and starts[position][0] <= index <= starts[position][1]:
+            return starts[position][2]
+        return None
+
+    def section(self, section_id: str) -> Optional[Dict]:
+        number = self.shard_of(section_id)
+        if number is None:
+            return None
+        if number not in self._sections:
+            self._sections[number] = {s['id']: s for s in self._read(number, 'sections.json')}
+        return self._sections[number].get(section_id)
+
+    def embeddings(self, number: int) -> EmbeddingStore:
+        return EmbeddingStore.open(self.directory / self.shards[number]['path'])
+
+
+def benchmark_queries() -> List[str]:
+    """Golden queries plus the assistant benchmark queries."""
+    queries = [case['query'] for case in json.loads((DATA_DIR / 'golden_queries.json').read_text())['queries']]
+    path = DATA_DIR.parent / 'scripts' / 'benchmark-queries.txt'
+    if path.exists():
+        queries += [line.strip() for line in path.read_text().splitlines()
+                    if line.strip() and not line.startswith('#')]
+    return queries
+
+
+def benchmark(data_dir: Path, shard_dir: Path, queries: List[str], k: int = 10) -> Dict:
+    """Cold start, bytes read and lookup latency: one monolithic index vs lazily loaded shards."""
+    sections = list(iter_sections(data_dir=data_dir))
+    with tempfile.TemporaryDirectory() as tmp:
+        monolithic_path = Path(tmp) / 'keyword-index.json'
+        monolithic_path.write_text(json.dumps(
+            KeywordIndex.from_sections(sections).to_artifact(document_hashes(data_dir)), separators=(',', ':')
+        ), encoding='utf-8')
+
+        start = time.perf_counter()
+        monolithic = KeywordIndex.from_artifact(json.loads(monolithic_path.read_bytes()))
+        monolithic_start = time.perf_counter() - start
+        monolithic_bytes = monolithic_path.stat().st_size
+
+    start = time.perf_counter()
+    sharded = ShardedIndex(shard_dir)
+    sharded_start = time.perf_counter() - start
+    startup_bytes = (shard_dir / MANIFEST_FILE).stat().st_size + (shard_dir / TERMS_FILE).stat().st_size
+
+    mismatches = 0
+    monolithic_times, cold_times, warm_times, touched, touched_bytes = [], [], [], [], []
+    for query in queries:
+        t0 = time.perf_counter()
+        expected = monolithic.search(query, k)
+        t1 = time.perf_counter()
+        actual = sharded.search(query, k)
+        touched.append(len(sharded.last_shards))
+        touched_bytes.append(sum(sharded.shards[n]['bytes']['keyword'] for n in sharded.last_shards))
+        t2 = time.perf_counter()
+        sharded.search(query, k)
+        t3 = time.perf_counter()
+        monolithic_times.append(t1 - t0)
+        cold_times.append(t2 - t1)
+        warm_times.append(t3 - t2)
+        mismatches += actual != expected
+
+    def ms(values):
+        return round(sum(values) / len(values) * 1000, 3) if values else 0.0
+
+    return {
+        'sections': len(sections),
+        'shards': len(sharded.shards),
+        'queries': len(queries),
+        'monolithic': {'startup_ms': round(monolithic_start * 1000, 2), 'startup_bytes': monolithic_bytes,
+                       'mean_query_ms': ms(monolithic_times)},
+        'sharded': {'startup_ms': round(sharded_start * 1000, 2), 'startup_bytes': startup_bytes,
+                    'mean_first_query_ms': ms(cold_times), 'mean_warm_query_ms': ms(warm_times),
+                    'mean_shards_touched': round(sum(touched) / len(touched), 2) if touched else 0,
+                    'max_shards_touched': max(touched, default=0),
+                    'mean_keyword_bytes_per_query': round(sum(touched_bytes) / len(touched_bytes)) if touched else 0,
+                    'bytes_loaded_after_queries': sharded.bytes_loaded},
+        'ranking_mismatches': mismatches,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and benchmark the sharded search index")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help="Write shards, term directory and manifest")
+    build.add_argument('--data-dir', type=Path, default=DATA_DIR)
+    build.add_argument('--output', type=Path, default=DEFAULT_SHARD_DIR)
+    build.add_argument('--store', type=Path, default=None, help="Embedding store to shard alongside")
+
+    bench = subparsers.add_parser('benchmark', help="Compare sharded lookups against one monolithic index")
+    bench.add_argument('--data-dir', type=Path, default=DATA_DIR)
+    bench.add_argument('--shards', type=Path, default=None, help="Existing shard directory (default: build one)")
+    bench.add_argument('-k', type=int, default=10)
+    bench.add_argument('--max-shard-fraction', type=float, default=MAX_SHARD_FRACTION,
+                       help="Fail when queries score more than this share of shards on average")
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        build_shards(args.output, args.data_dir, args.store)
+        return 0
+
+    shard_dir = args.shards
+    if shard_dir is None:
+        shard_dir = BUILD_DIR / 'shards-benchmark'
+        build_shards(shard_dir, args.data_dir)
+    results = benchmark(args.data_dir, shard_dir, benchmark_queries(), args.k)
+    print(json.dumps(results, indent=2))
+    ceiling = args.max_shard_fraction * results['shards']
+    failed = bool(results['ranking_mismatches'])
+    if results['sharded']['mean_shards_touched'] > ceiling:
+        logger.error(f"Queries score {results['sharded']['mean_shards_touched']} shards on average, "
+                     f"over the ceiling of {ceiling:.1f} ({args.max_shard_fraction:.0%} of {results['shards']})")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
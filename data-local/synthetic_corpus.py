@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Synthetic Regulation Corpus Generator
+
+Writes deterministic, CFR- and ABS-shaped Markdown (the same heading layout
+ecfr_xml_to_markdown.py and abs_part7_pdf_parser.py produce) under the
+standard document file names, so any offline stage can be benchmarked at
+full-corpus scale with `--data-dir` instead of the small sample documents.
+
+With --xml the CFR titles are written as eCFR-shaped XML instead
+(ECFR-title33.xml, ECFR-title46.xml), so conversion can be timed too; run
+ecfr_xml_to_markdown.py in the output directory to produce their Markdown.
+
+Usage:
+    python synthetic_corpus.py --output build/synthetic --parts 40 --sections-per-part 60
+    python synthetic_corpus.py --output build/synthetic-xml --xml
+"""
+
+import argparse
+import logging
+import random
+import sys
+from pathlib import Path
+from typing import List
+from xml.sax.saxutils import escape
+
+from sections import BUILD_DIR, DOCUMENTS
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTPUT = BUILD_DIR / 'synthetic'
+
+VOCABULARY = (
+    "vessel inspection survey certificate master owner operator crew manning navigation "
+    "bridge lighting signal anchor hull structure stability passenger cargo tank barge tow "
+    "ballast water discharge pollution oil equipment machinery boiler pressure electrical "
+    "installation lifeboat liferaft davit station alarm detection extinguishing sprinkler "
+    "drill record log officer engineer license endorsement examination approval marine "
+    "inspector district commander port waterway bridge clearance channel mooring pilot "
+    "requirement standard procedure condition damage repair drydock interval annual "
+    "periodic intermediate renewal offshore supply towing fishing tanker ferry "
+    "construction arrangement material steel weld plating frame deck compartment "
+    "watertight door closure ventilation accommodation emergency escape exit"
+).split()
+
+PHRASES = [
+    "fire detection", "life saving", "oil discharge", "manning requirements",
+    "offshore supply vessel", "machinery space", "emergency equipment",
+    "safety of life at sea", "code of federal regulations", "american bureau of shipping",
+]
+
+FILLER = "the and of to in for with by on or as is be shall must may this that".split()
+
+# documentId -> (title heading, first part number)
+TITLES = {
+    'cfr33': ('Title 33—Navigation and Navigable Waters', 100),
+    'cfr46': ('Title 46—Shipping', 10),
+}
+
+
+AUTHORITY = "46 U.S.C. 3306, 3703; Department of Homeland Security Delegation No. 0170.1."
+AMENDMENT_DATE = "Jan. 2, 2025"
+MONTHS = "Jan. Feb. Mar. Apr. May June July Aug. Sept. Oct. Nov. Dec.".split()
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    """Zipf-weighted domain words with stop words and occasional multi-word terms."""
+    tokens = []
+    while len(tokens) < words:
+        roll = rng.random()
+        if roll < 0.3:
+            tokens.append(rng.choice(FILLER))
+        elif roll < 0.36:
+            tokens.append(rng.choice(PHRASES))
+        else:
+            rank = min(int(rng.paretovariate(1.1)) - 1, len(VOCABULARY) - 1)
+            tokens.append(VOCABULARY[rank] if rng.random() < 0.5 else rng.choice(VOCABULARY))
+    text = ' '.join(tokens)
+    return text[0].upper() + text[1:] + '.'
+
+
+def heading_words(rng: random.Random, count: int) -> str:
+    return ' '.join(rng.choice(VOCABULARY) for _ in range(count)).title()
+
+
+def body(rng: random.Random, paragraphs: int) -> List[str]:
+    return [' '.join(sentence(rng, rng.randint(8, 24)) for _ in range(rng.randint(2, 5))) for _ in range(paragraphs)]
+
+
+def cfr_document(document_id: str, parts: int, sections_per_part: int, rng: random.Random) -> str:
+    title, first_part = TITLES[document_id]
+    lines = [f"# {title}", "", f"**Title:** {document_id[3:]}", "", "---", ""]
+    lines.append("## CHAPTER I—COAST GUARD, DEPARTMENT OF HOMELAND SECURITY")
+    for p in range(parts):
+        part_number = first_part + p * 3
+        lines.append(f"\n#### PART {part_number}—{heading_words(rng, 3).upper()}\n")
+        lines.append("**Authority:** 46 U.S.C. 3306; Department of Homeland Security Delegation No. 0170.1.\n")
+        for s in range(sections_per_part):
+            lines.append(f"\n###### § {part_number}.{(s + 1) * 5} {heading_words(rng, rng.randint(2, 6))}.\n")
+            for paragraph in body(rng, rng.randint(1, 4)):
+                lines.append(f"\n{paragraph}\n")
+    return '\n'.join(lines)
+
+
+def source_citation(rng: random.Random) -> str:
+    """A Federal Register source line like "CGD 95-072, 60 FR 50462, Sept. 29, 1995"."""
+    year = rng.randint(1970, 2020)
+    return (f"CGD {year % 100:02d}-{rng.randint(1, 200):03d}, {year - 1935} FR {rng.randint(1000, 60000)}, "
+            f"{rng.choice(MONTHS)} {rng.randint(1, 28)}, {year}")
+
+
+def cfr_xml(document_id: str, parts: int, sections_per_part: int, rng: random.Random) -> str:
+    """eCFR XML for a title with the DIV1/DIV3/DIV5/DIV8 layout ecfr_xml_to_markdown.py reads."""
+    title, first_part = TITLES[document_id]
+    number = document_id[3:]
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<ECFR>',
+        f'<FDSYS><TITLE>{escape(title)}</TITLE><IDNO TYPE="title">{number}</IDNO>'
+        f'<AMDDATE>{AMENDMENT_DATE}</AMDDATE></FDSYS>',
+        f'<DIV1 N="{number}" TYPE="TITLE"><HEAD>{escape(title)}</HEAD>',
+        '<DIV3 N="I" TYPE="CHAPTER"><HEAD>CHAPTER I—COAST GUARD, DEPARTMENT OF HOMELAND SECURITY</HEAD>',
+    ]
+    for p in range(parts):
+        part_number = first_part + p * 3
+        source = source_citation(rng)
+        lines.append(f'<DIV5 N="{part_number}" TYPE="PART"><HEAD>PART {part_number}—{heading_words(rng, 3).upper()}</HEAD>')
+        lines.append(f'<AUTH><HED>Authority:</HED><PSPACE>{AUTHORITY}</PSPACE></AUTH>')
+        lines.append(f'<SOURCE><HED>Source:</HED><PSPACE>{source}, unless otherwise noted.</PSPACE></SOURCE>')
+        if p % 7 == 0:
+            lines.append('<EDNOTE><HED>Editorial Note:</HED><PSPACE>Nomenclature changes to part '
+                         f'{part_number} appear at {source_citation(rng)}.</PSPACE></EDNOTE>')
+        for s in range(sections_per_part):
+            section_number = f"{part_number}.{(s + 1) * 5}"
+            lines.append(f'<DIV8 N="{section_number}" TYPE="SECTION">'
+                         f'<HEAD>§ {section_number} {heading_words(rng, rng.randint(2, 6))}.</HEAD>')
+            for paragraph in body(rng, rng.randint(1, 4)):
+                lines.append(f'<P>{escape(paragraph)}</P>')
+            lines.append(f'<CITA>[{source}]</CITA></DIV8>')
+        lines.append('</DIV5>')
+    lines.extend(['</DIV3>', '</DIV1>', '</ECFR>'])
+    return '\n'.join(lines)
+
+
+def abs_document(chapters: int, sections_per_part: int, rng: random.Random) -> str:
+    lines = ["# ABS Rules for Survey After Construction - Part 7\n"]
+    for c in range(1, chapters + 1):
+        lines.append(f"\n# Chapter {c}: {heading_words(rng, 3)}\n")
+        for s in range(1, max(2, sections_per_part // 10) + 1):
+            lines.append(f"\n## Section {s}: {heading_words(rng, 3)}\n")
+            for i in range(1, 11):
+                lines.append(f"\n### {i} {heading_words(rng, rng.randint(2, 5))}\n")
+                for paragraph in body(rng, rng.randint(1, 3)):
+                    lines.append(f"{paragraph}\n")
+    return '\n'.join(lines)
+
+
+def generate_corpus(output: Path = DEFAULT_OUTPUT, parts: int = 40, sections_per_part: int = 60,
+                    seed: int = 0, xml: bool = False) -> Path:
+    """Write all three documents (with xml, the CFR titles as XML sources) into output and return it."""
+    output = Path(output)
+    output.mkdir(parents=True, exist_ok=True)
+    for document_id, filename in DOCUMENTS.items():
+        rng = random.Random(f"{seed}:{document_id}")
+        if document_id == 'abs_part7':
+            text = abs_document(max(1, parts // 4), sections_per_part, rng)
+        elif xml:
+            filename = Path(filename).with_suffix('.xml').name
+            text = cfr_xml(document_id, parts, sections_per_part, rng)
+        else:
+            text = cfr_document(document_id, parts, sections_per_part, rng)
+        (output / filename).write_text(text, encoding='utf-8')
+        logger.info(f"Wrote {output / filename} ({len(text) / 1e6:.1f} MB)")
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic regulation corpus")
+    parser.add_argument('--output', type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument('--parts', type=int, default=40, help="Parts per CFR title (ABS chapters = parts / 4)")
+    parser.add_argument('--sections-per-part', type=int, default=60)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--xml', action='store_true', help="Write the CFR titles as eCFR XML sources")
+    args = parser.parse_args()
+
+    generate_corpus(args.output, args.parts, args.sections_per_part, args.seed, args.xml)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
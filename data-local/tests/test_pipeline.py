@@ -0,0 +1,58 @@
+"""Scheduler tests for pipeline.Pipeline (stages are not executed as subprocesses)."""
+
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pipeline  # noqa: E402
+
+
+class ScriptedPipeline(pipeline.Pipeline):
+    """Pipeline whose stages succeed or fail as scripted instead of running."""
+
+    def __init__(self, stages, failing, jobs=2):
+        super().__init__(stages, jobs=jobs)
+        self.failing = set(failing)
+        self.executed = []
+
+    def execute(self, stage):
+        with self.lock:
+            self.executed.append(stage.name)
+        if stage.name in self.failing:
+            return {'status': 'failed', 'error': 'scripted failure'}
+        return {'status': 'ran'}
+
+
+class PipelineRunTest(unittest.TestCase):
+    def test_failed_stage_blocks_dependents_without_raising(self):
+        stages = pipeline.select(['keyword-index'])
+        runner = ScriptedPipeline(stages, failing=['sections'])
+
+        results = runner.run()
+
+        self.assertEqual(results['sections']['status'], 'failed')
+        self.assertEqual(results['keyword-index']['status'], 'blocked')
+        self.assertNotIn('keyword-index', runner.executed)
+
+    def test_blocking_propagates_through_the_graph(self):
+        stages = pipeline.select(['embeddings', 'citations'])
+        runner = ScriptedPipeline(stages, failing=['near-duplicates'], jobs=1)
+
+        results = runner.run()
+
+        self.assertEqual(results['near-duplicates']['status'], 'failed')
+        self.assertEqual(results['embeddings']['status'], 'blocked')
+        self.assertEqual(results['citations']['status'], 'ran')
+
+    def test_cycle_is_reported(self):
+        first = pipeline.Stage('first', ['sections.py'], inputs=['b.txt'], outputs=['a.txt'])
+        second = pipeline.Stage('second', ['sections.py'], inputs=['a.txt'], outputs=['b.txt'])
+
+        with self.assertRaises(RuntimeError):
+            ScriptedPipeline([first, second], failing=[]).run()
+
+
+if __name__ == '__main__':
+    unittest.main()
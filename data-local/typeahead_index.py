@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Typeahead Prefix Index
+
+Offline-built completions for partial citations ("46 CFR 10") and title
+fragments ("stability te"), so the UI can suggest as the user types without
+running a search per keystroke. Completion keys are:
+
+    citation   normalized citations from citation_table.py ("46 cfr 109.213")
+    title      section titles without their numbering ("emergency training")
+    word       title words, weighted by how many titles contain them
+
+Keys are normalized (lowercase, "§" and "C.F.R." folded, whitespace
+collapsed) and kept in one sorted array. The top N completions of every
+prefix up to --max-prefix characters are precomputed, so typical lookups
+are a single dict access; longer prefixes binary-search the sorted keys
+and rank the (short) matching range.
+
+Artifact (build/typeahead.json):
+    {
+      "format": "arrowreg-typeahead-v1",
+      "documents": {documentId: sha256},
+      "keys": [key, ...],                          sorted
+      "entries": [[kind, text, sectionId, title, weight], ...],   parallel to keys
+      "completions": {prefix: [key ordinal, ...]}  best first
+    }
+
+Usage:
+    python typeahead_index.py build --data-dir build/synthetic
+    python typeahead_index.py complete "46 CFR 10"
+    python typeahead_index.py benchmark --data-dir build/synthetic
+"""
+
+import argparse
+import bisect
+import heapq
+import json
+import logging
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from citation_table import section_citations
+from embedding_store import atomic_write_bytes
+from keyword_index import document_hashes
+from nlp import STOP_WORDS, tokenize
+from sections import BUILD_DIR, DATA_DIR, SCRIPTS_DIR, iter_sections
+
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+from perf_stats import latency_summary  # noqa: E402
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+TYPEAHEAD_FORMAT = 'arrowreg-typeahead-v1'
+TYPEAHEAD_PATH = BUILD_DIR / 'typeahead.json'
+TOP_N = 10
+MAX_PREFIX = 8
+MIN_WORD_LENGTH = 3
+
+# Tie-break between kinds with equal weight
+KIND_ORDER = {'citation': 0, 'title': 1, 'word': 2}
+
+CFR_NOTATION = re.compile(r'c\.?\s*f\.?\s*r\.?', re.IGNORECASE)
+TITLE_NUMBERING = re.compile(
+    r'^(?:§\s*[\d.\-]+|part\s+\d+\s*[—–-]|chapter\s+\d+:?|section\s+\d+:?|\d+(?:\.\d+)*)\s*',
+    re.IGNORECASE,
+)
+
+
+def normalize_prefix(text: str) -> str:
+    """Fold what users type into key space; a trailing space is kept since it ends a word."""
+    text = CFR_NOTATION.sub('cfr', text.replace('§', ' ')).lower()
+    trailing = text[-1:].isspace()
+    text = ' '.join(text.split())
+    return text + ' ' if trailing and text else text
+
+
+def title_key(title: str) -> str:
+    return normalize_prefix(TITLE_NUMBERING.sub('', title)).rstrip(' .')
+
+
+class TypeaheadIndex:
+    """Sorted completion keys with precomputed top-N completions per short prefix."""
+
+    def __init__(self, keys: List[str], entries: List[list], completions: Dict[str, List[int]]):
+        self.keys = keys
+        self.entries = entries
+        self.completions = completions
+
+    @classmethod
+    def from_sections(cls, sections: Iterable[Dict], top_n: int = TOP_N,
+                      max_prefix: int = MAX_PREFIX) -> 'TypeaheadIndex':
+        sections = list(sections)
+        candidates: Dict[str, list] = {}
+
+        def add(key: str, kind: str, text: str, section: Optional[Dict]):
+            if not key:
+                return
+            entry = candidates.get(key)
+            if entry is None:
+                candidates[key] = [kind, text, section and section['id'], section and section['title'], 1]
+            else:
+                entry[4] += 1
+
+        for citation, section in section_citations(sections):
+            add(normalize_prefix(citation), 'citation', citation, section)
+        for section in sections:
+            key = title_key(section['title'])
+            add(key, 'title', section['title'], section)
+            for word in dict.fromkeys(tokenize(key)):
+                if len(word) >= MIN_WORD_LENGTH and word not in STOP_WORDS and not word.isdigit():
+                    if word != key:
+                        add(word, 'word', word, None)
+
+        keys = sorted(candidates)
+        entries = [candidates[key] for key in keys]
+        order = sorted(range(len(keys)), key=lambda i: cls.rank(keys[i], entries[i]))
+
+        # Visiting keys best-first fills every prefix list in rank order
+        completions: Dict[str, List[int]] = {}
+        for i in order:
+            key = keys[i]
+            for length in range(1, min(len(key), max_prefix) + 1):
+                best = completions.setdefault(key[:length], [])
+                if len(best) < top_n:
+                    best.append(i)
+        return cls(keys, entries, completions)
+
+    @staticmethod
+    def rank(key: str, entry: list):
+        return -entry[4], KIND_ORDER[entry[0]], len(key), key
+
+    def _as_dict(self, i: int) -> Dict:
+        kind, text, section_id, title, weight = self.entries[i]
+        return {'text': text, 'kind': kind, 'section_id': section_id, 'title': title, 'weight': weight}
+
+    def complete(self, text: str, n: int = TOP_N) -> List[Dict]:
+        """Best completions for what the user has typed so far."""
+        prefix = normalize_prefix(text)
+        if not prefix:
+            return []
+        precomputed = self.completions.get(prefix)
+        if precomputed is not None:
+            return [self._as_dict(i) for i in precomputed[:n]]
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + '\U0010ffff', lo)
+        best = heapq.nsmallest(n, range(lo, hi), key=lambda i: self.rank(self.keys[i], self.entries[i]))
+        return [self._as_dict(i) for i in best]
+
+    def to_artifact(self, document_hashes: Dict[str, str]) -> Dict:
+        return {
+            'format': TYPEAHEAD_FORMAT,
+            'documents': document_hashes,
+            'keys': self.keys,
+            'entries': self.entries,
+            'completions': self.completions,
+        }
+
+    @classmethod
+    def from_artifact(cls, artifact: Dict) -> 'TypeaheadIndex':
+        if artifact.get('format') != TYPEAHEAD_FORMAT:
+            raise ValueError(f"Not an {TYPEAHEAD_FORMAT} artifact")
+        return cls(artifact['keys'], artifact['entries'], artifact['completions'])
+
+    @classmethod
+    def load(cls, path: Path = TYPEAHEAD_PATH) -> 'TypeaheadIndex':
+        return cls.from_artifact(json.loads(Path(path).read_text(encoding='utf-8')))
+
+
+def build_typeahead(output: Path = TYPEAHEAD_PATH, data_dir: Path = DATA_DIR, **options) -> TypeaheadIndex:
+    index = TypeaheadIndex.from_sections(iter_sections(data_dir=data_dir), **options)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    data = json.dumps(index.to_artifact(document_hashes(data_dir)), separators=(',', ':'), ensure_ascii=False)
+    atomic_write_bytes(output, lambda f: f.write(data.encode('utf-8')))
+    logger.info(f"Wrote typeahead index with {len(index.keys)} keys and "
+                f"{len(index.completions)} precomputed prefixes to {output}")
+    return index
+
+
+def benchmark(index: TypeaheadIndex, typed: List[str], repeat: int = 3) -> Dict:
+    """Latency of every keystroke prefix of the typed strings."""
+    prefixes = [text[:length] for text in typed for length in range(1, len(text) + 1)]
+    latencies = []
+    for _ in range(repeat):
+        for prefix in prefixes:
+            start = time.perf_counter()
+            index.complete(prefix)
+            latencies.append(time.perf_counter() - start)
+    return {
+        'keys': len(index.keys),
+        'precomputed_prefixes': len(index.completions),
+        'keystrokes': len(prefixes),
+        'latency': latency_summary(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Typeahead completions over citations and section titles")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help="Write the typeahead artifact")
+    build.add_argument('--data-dir', type=Path, default=DATA_DIR)
+    build.add_argument('--output', type=Path, default=TYPEAHEAD_PATH)
+    build.add_argument('--top-n', type=int, default=TOP_N)
+    build.add_argument('--max-prefix', type=int, default=MAX_PREFIX,
+                       help="Precompute completions for prefixes up to this many characters")
+
+    complete = subparsers.add_parser('complete', help="Complete a partial citation or title")
+    complete.add_argument('text', nargs='+')
+    complete.add_argument('--index', type=Path, default=TYPEAHEAD_PATH)
+    complete.add_argument('-n', type=int, default=TOP_N)
+
+    bench = subparsers.add_parser('benchmark', help="Time completions for every keystroke of sample inputs")
+    bench.add_argument('--data-dir', type=Path, default=DATA_DIR)
+    bench.add_argument('--typed', action='append', default=None, help="Input to type (repeatable)")
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        build_typeahead(args.output, args.data_dir, top_n=args.top_n, max_prefix=args.max_prefix)
+    elif args.command == 'complete':
+        if args.index.exists():
+            index = TypeaheadIndex.load(args.index)
+        else:
+            index = TypeaheadIndex.from_sections(iter_sections())
+        for completion in index.complete(' '.join(args.text), args.n):
+            print(json.dumps(completion, ensure_ascii=False))
+    else:
+        index = TypeaheadIndex.from_sections(iter_sections(data_dir=args.data_dir))
+        typed = args.typed or [
+            '46 CFR 109.213', '33 C.F.R. § 151.10', 'ABS 7-1-2/3', 'stability tests passenger',
+            'fire detection', 'lifeboat davit', 'emergency escape', 'manning requirements',
+        ]
+        print(json.dumps(benchmark(index, typed), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
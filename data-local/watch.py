@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Watch Mode for the Regulation Data Pipeline
+
+Polls the pipeline's source files (eCFR XML, ABS PDF) and the converter
+code, waits until edits settle (--debounce), then brings the artifacts up to
+date with pipeline.py. Each rebuild is incremental at every level:
+
+  - converters run with --render-cache, so only changed eCFR parts and PDF
+    pages are re-rendered
+  - stages whose inputs and code are unchanged are skipped (stage cache)
+  - embeddings are computed only for changed section text (embedding cache)
+
+Artifacts are swapped in atomically (files by rename, the embedding store by
+re-pointing its symlink), so the backend and other readers never see a
+half-written Markdown file, index or store.
+
+Usage:
+    python watch.py                       # build once, then watch
+    python watch.py --debounce 2 keyword-index embeddings
+    python watch.py --once                # single incremental build
+"""
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from pipeline import STAGES, Pipeline, dependencies, local_modules, select
+from sections import DATA_DIR
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+POLL_SECONDS = 0.5
+DEBOUNCE_SECONDS = 1.0
+SOURCE_PATTERNS = ['*.xml', '*.pdf']
+
+Snapshot = Dict[Path, Optional[Tuple[int, int]]]
+
+
+def watched_paths() -> List[Path]:
+    """Source inputs no stage produces, plus the code of the stages that read them."""
+    graph = dependencies(STAGES)
+    paths = []
+    for stage in STAGES:
+        if not stage.default or graph[stage.name]:
+            continue
+        paths.extend(DATA_DIR / path for path in stage.inputs)
+        paths.extend(local_modules(stage.script))
+    return list(dict.fromkeys(paths))
+
+
+def snapshot(paths: List[Path]) -> Snapshot:
+    """(mtime, size) per path; None for paths that do not exist (yet)."""
+    state = {}
+    for path in paths:
+        try:
+            stat = path.stat()
+            state[path] = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            state[path] = None
+    return state
+
+
+def untracked_sources(paths: List[Path]) -> List[Path]:
+    """XML/PDF files in data-local/ that no pipeline stage reads."""
+    known = set(paths)
+    return sorted(path for pattern in SOURCE_PATTERNS for path in DATA_DIR.glob(pattern) if path not in known)
+
+
+def settle(paths: List[Path], current: Snapshot, debounce: float, poll: float) -> Snapshot:
+    """Wait until nothing has changed for `debounce` seconds; return the final snapshot."""
+    quiet_since = time.monotonic()
+    while time.monotonic() - quiet_since < debounce:
+        time.sleep(poll)
+        latest = snapshot(paths)
+        if latest != current:
+            current = latest
+            quiet_since = time.monotonic()
+    return current
+
+
+def rebuild(targets: List[str], jobs: int) -> bool:
+    """One incremental build; failures are logged and reported, never raised, so watching continues."""
+    start = time.perf_counter()
+    try:
+        results = Pipeline(select(targets), jobs).run()
+    except Exception as e:
+        logger.error(f"Rebuild failed after {time.perf_counter() - start:.2f}s: {e}")
+        return False
+    for name, result in results.items():
+        if result['status'] == 'failed':
+            logger.error(f"{name} failed: {result.get('error', 'unknown error')}")
+    ran = [name for name, result in results.items() if result['status'] in ('ran', 'restored')]
+    failed = [name for name, result in results.items() if result['status'] in ('failed', 'blocked')]
+    logger.info(f"Rebuilt in {time.perf_counter() - start:.2f}s: "
+                f"{', '.join(ran) or 'nothing to do'}" + (f"; failed: {', '.join(failed)}" if failed else ""))
+    return not failed
+
+
+def watch(targets: List[str], jobs: int, debounce: float = DEBOUNCE_SECONDS, poll: float = POLL_SECONDS,
+          initial: bool = True):
+    paths = watched_paths()
+    for path in untracked_sources(paths):
+        logger.warning(f"{path.name} is not an input of any pipeline stage; add a stage to convert it")
+    logger.info(f"Watching {len(paths)} files (poll {poll}s, debounce {debounce}s)")
+
+    previous = snapshot(paths)
+    if initial:
+        rebuild(targets, jobs)
+    while True:
+        time.sleep(poll)
+        current = snapshot(paths)
+        if current == previous:
+            continue
+        changed = [path.name for path in paths if current[path] != previous[path]]
+        logger.info(f"Changed: {', '.join(changed)}")
+        previous = settle(paths, current, debounce, poll)
+        rebuild(targets, jobs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild pipeline artifacts when sources change")
+    parser.add_argument('targets', nargs='*', help="Stages to keep up to date (default: all but upload)")
+    parser.add_argument('--jobs', '-j', type=int, default=2)
+    parser.add_argument('--debounce', type=float, default=DEBOUNCE_SECONDS,
+                        help="Seconds without further changes before rebuilding")
+    parser.add_argument('--poll', type=float, default=POLL_SECONDS, help="Seconds between checks")
+    parser.add_argument('--once', action='store_true', help="Run one incremental build and exit")
+    parser.add_argument('--no-initial', action='store_true', help="Do not build before the first change")
+    args = parser.parse_args()
+
+    if args.once:
+        return 0 if rebuild(args.targets, args.jobs) else 1
+    try:
+        watch(args.targets, args.jobs, args.debounce, args.poll, initial=not args.no_initial)
+    except KeyboardInterrupt:
+        logger.info("Stopped watching")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
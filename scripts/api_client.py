@@ -0,0 +1,248 @@
+"""
+Shared OpenAI API client for the ArrowReg scripts
+
+Provides one place to load credentials and configuration (environment,
+backend/.dev.vars and config/openai_config.json) and one way to build an
+OpenAI client: a pooled keep-alive HTTP transport, a consistent timeout and
+retry/backoff policy, and request timing hooks.
+
+Usage:
+    from api_client import create_client, load_settings
+
+    settings = load_settings()
+    client = create_client(settings)
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+from perf_stats import latency_summary
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEV_VARS_PATH = REPO_ROOT / "backend" / ".dev.vars"
+CONFIG_PATH = REPO_ROOT / "config" / "openai_config.json"
+
+# Transport policy shared by every script
+MAX_CONNECTIONS = 64
+MAX_KEEPALIVE_CONNECTIONS = 32
+KEEPALIVE_EXPIRY = 60.0
+CONNECT_TIMEOUT = 10.0
+REQUEST_TIMEOUT = 120.0
+# The SDK retries 408/409/429/5xx and connection errors with exponential
+# backoff plus jitter, honouring Retry-After headers.
+MAX_RETRIES = 5
+
+RETRYABLE_STATUS_CODES = {408, 409, 429} | set(range(500, 600))
+
+OBJECT_ID_PATTERN = re.compile(r'^(file-|vs_|asst_|thread_|run_|msg_|step_)')
+
+
+class ClientSettings:
+    """Credentials and resource IDs resolved from the environment and .dev.vars"""
+
+    def __init__(self, api_key, base_url=None, assistant_id=None, vector_store_ids=None):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.assistant_id = assistant_id
+        self.vector_store_ids = vector_store_ids or []
+
+
+def load_dev_vars(path=DEV_VARS_PATH):
+    """Parse a KEY=value .dev.vars file, ignoring blank lines and comments"""
+    values = {}
+    path = Path(path)
+    if not path.exists():
+        return values
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#') and '=' in line:
+                key, value = line.split('=', 1)
+                values[key.strip()] = value.strip()
+    return values
+
+
+def update_dev_vars(updates, path=DEV_VARS_PATH):
+    """Set keys in .dev.vars, keeping existing lines, comments and order"""
+    path = Path(path)
+    lines = path.read_text().splitlines() if path.exists() else [
+        "# ArrowReg Backend Development Environment",
+        "# This file contains development environment variables for Cloudflare Workers",
+        "",
+    ]
+    remaining = dict(updates)
+
+    for i, line in enumerate(lines):
+        stripped = line.strip()
+        if stripped and not stripped.startswith('#') and '=' in stripped:
+            key = stripped.split('=', 1)[0].strip()
+            if key in remaining:
+                lines[i] = f"{key}={remaining.pop(key)}"
+
+    lines.extend(f"{key}={value}" for key, value in remaining.items())
+    path.write_text('\n'.join(lines) + '\n')
+    return path
+
+
+def load_settings(require_key=True, dev_vars_path=DEV_VARS_PATH):
+    """Resolve settings, preferring environment variables over .dev.vars"""
+    dev_vars = load_dev_vars(dev_vars_path)
+
+    def lookup(key):
+        return os.getenv(key) or dev_vars.get(key) or None
+
+    api_key = lookup('OPENAI_API_KEY')
+    if require_key:
+        if not api_key:
+            print("❌ Error: OPENAI_API_KEY not set in the environment or backend/.dev.vars")
+            print("Please set your API key: export OPENAI_API_KEY='sk-your-key-here'")
+            sys.exit(1)
+        if not api_key.startswith('sk-'):
+            print("❌ Error: Invalid OpenAI API key format")
+            sys.exit(1)
+
+    vector_store_ids = lookup('VECTOR_STORE_IDS')
+    return ClientSettings(
+        api_key=api_key,
+        base_url=lookup('OPENAI_BASE_URL'),
+        assistant_id=lookup('OPENAI_ASSISTANT_ID'),
+        vector_store_ids=[v for v in (vector_store_ids or '').split(',') if v],
+    )
+
+
+def load_openai_config(path=CONFIG_PATH):
+    """Load config/openai_config.json written by the setup scripts"""
+    path = Path(path)
+    if not path.exists():
+        print("❌ OpenAI configuration not found. Run setup-openai.py first.")
+        sys.exit(1)
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_openai_config(config, path=CONFIG_PATH):
+    """Write config/openai_config.json, creating the directory if needed"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(config, f, indent=2)
+    return path
+
+
+class RequestTiming:
+    """Timing of a single HTTP attempt, passed to timing hooks"""
+
+    def __init__(self, method, path, status_code, seconds):
+        self.method = method
+        self.path = path
+        self.status_code = status_code
+        self.seconds = seconds
+
+    @property
+    def endpoint(self):
+        """Path with object IDs collapsed, e.g. /v1/vector_stores/{id}/files"""
+        parts = ['{id}' if OBJECT_ID_PATTERN.match(part) else part for part in self.path.split('/')]
+        return f"{self.method} {'/'.join(parts)}"
+
+
+class RequestStats:
+    """Timing hook that aggregates attempts and latencies per endpoint"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.status_counts = {}
+
+    def __call__(self, timing):
+        with self.lock:
+            self.latencies.setdefault(timing.endpoint, []).append(timing.seconds)
+            self.status_counts[timing.status_code] = self.status_counts.get(timing.status_code, 0) + 1
+
+    def summary(self):
+        with self.lock:
+            return {
+                "endpoints": {
+                    endpoint: latency_summary(values)
+                    for endpoint, values in sorted(self.latencies.items())
+                },
+                "status_counts": {str(k): v for k, v in sorted(self.status_counts.items())},
+            }
+
+
+class RetryCounter:
+    """Timing hook that counts retried attempts seen by the calling thread
+
+    The SDK retries on the thread that issued the call, so reading the count
+    right after a call attributes its retries to that call. A retryable
+    response is counted only once another attempt follows it; the last
+    attempt of a call that gave up is dropped by take().
+    """
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def __call__(self, timing):
+        if getattr(self.local, 'pending', False):
+            self.local.count = getattr(self.local, 'count', 0) + 1
+        self.local.pending = timing.status_code in RETRYABLE_STATUS_CODES
+
+    def take(self):
+        """Return and reset the retry count for the current thread"""
+        count = getattr(self.local, 'count', 0)
+        self.local.count = 0
+        self.local.pending = False
+        return count
+
+
+def build_http_client(timing_hooks=(), max_connections=MAX_CONNECTIONS):
+    """Build the pooled keep-alive httpx transport shared by API calls"""
+    import httpx
+
+    hooks = list(timing_hooks)
+
+    def on_request(request):
+        request.extensions['arrowreg_start'] = time.perf_counter()
+
+    def on_response(response):
+        start = response.request.extensions.get('arrowreg_start')
+        if start is None:
+            return
+        timing = RequestTiming(
+            response.request.method,
+            response.request.url.path,
+            response.status_code,
+            time.perf_counter() - start,
+        )
+        for hook in hooks:
+            hook(timing)
+
+    return httpx.Client(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=min(MAX_KEEPALIVE_CONNECTIONS, max_connections),
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT),
+        follow_redirects=True,
+        event_hooks={'request': [on_request], 'response': [on_response]} if hooks else {},
+    )
+
+
+def create_client(settings=None, timing_hooks=(), max_connections=MAX_CONNECTIONS, max_retries=MAX_RETRIES):
+    """Create an OpenAI client on the shared transport and retry policy"""
+    import httpx
+    from openai import OpenAI
+
+    settings = settings or load_settings()
+    return OpenAI(
+        api_key=settings.api_key,
+        base_url=settings.base_url,
+        max_retries=max_retries,
+        timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT),
+        http_client=build_http_client(timing_hooks, max_connections),
+    )
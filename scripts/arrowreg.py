@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+ArrowReg Command Line
+One entry point for the data converters, the local index tools and the
+OpenAI ingest/setup scripts.
+
+Subcommands are resolved lazily: `arrowreg.py --help` imports nothing but
+the standard library, and each subcommand's script (and its dependencies,
+e.g. PyMuPDF for parse-abs or openai for ingest) is only loaded when that
+subcommand runs. Scripts keep their own arguments, so
+`arrowreg.py convert-ecfr --help` shows the converter's options.
+
+`startup` runs subcommands' --help under `python -X importtime` and fails
+when a command imports a heavy module it does not declare or exceeds the
+startup budget, so a top-level `import fitz` cannot creep back in. The
+budget covers only what a command adds: modules the bare interpreter
+(site) or arrowreg.py itself already imports are not counted, and each
+command takes its best of --runs runs, since single runs are noisy.
+
+Usage:
+    python3 arrowreg.py convert-ecfr --all --render-cache
+    python3 arrowreg.py parse-abs --pdf abs-part7.pdf
+    python3 arrowreg.py ingest --report reports/ingest.json
+    python3 arrowreg.py startup [--budget-ms 100] [--runs 3] [command ...]
+"""
+
+import argparse
+import json
+import os
+import re
+import runpy
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Modules too slow to import (or too often missing) to load at startup
+HEAVY_MODULES = ('fitz', 'numpy', 'openai', 'httpx')
+STARTUP_BUDGET_MS = 100.0
+STARTUP_RUNS = 3
+
+
+class Command:
+    """A script run as a subcommand, and the heavy modules it may import on load"""
+
+    def __init__(self, script, help, heavy=(), help_check=True):
+        self.script = script
+        self.help = help
+        self.heavy = heavy
+        # Scripts without an argument parser would run for real on --help
+        self.help_check = help_check
+
+
+COMMANDS = {
+    'convert-ecfr': Command('data-local/ecfr_xml_to_markdown.py', "Convert eCFR XML titles to Markdown"),
+    'parse-abs': Command('data-local/abs_part7_pdf_parser.py', "Parse the ABS Part 7 PDF to Markdown"),
+    'pipeline': Command('data-local/pipeline.py', "Build data artifacts with the stage cache", heavy=('numpy',)),
+    'watch': Command('data-local/watch.py', "Rebuild artifacts when sources change", heavy=('numpy',)),
+    'embed': Command('data-local/embed_sections.py', "Embed sections into the vector store", heavy=('numpy',)),
+    'search': Command('data-local/search_embeddings.py', "Query the local embeddings", heavy=('numpy',)),
+    'keyword-index': Command('data-local/keyword_index.py', "Build the TF-IDF keyword index", heavy=('numpy',)),
+    'citations': Command('data-local/citation_table.py', "Build or query the citation table", heavy=('numpy',)),
+    'typeahead': Command('data-local/typeahead_index.py', "Build or query typeahead completions",
+                         heavy=('numpy',)),
+    'benchmark': Command('data-local/pipeline_benchmark.py', "Time the pipeline against committed baselines"),
+    'near-duplicates': Command('data-local/near_duplicates.py', "Cluster near-duplicate sections (MinHash/LSH)",
+                               heavy=('numpy',)),
+    'archive': Command('data-local/corpus_archive.py', "Build or read the block-compressed corpus archive",
+                       heavy=('numpy',)),
+    'editions': Command('data-local/edition_store.py', "Record or read dated editions of the corpus",
+                        heavy=('numpy',)),
+    'render-cache': Command('data-local/render_cache.py', "Inspect or clear the converter render cache"),
+    'ingest': Command('scripts/setup/ingest-sample-data.py', "Upload sample documents to OpenAI vector stores"),
+    'setup': Command('scripts/setup/setup-openai.py', "Create or reconcile the vector stores and assistant"),
+    'setup-assistant': Command('scripts/setup-new-assistant.py', "Create or update the v2 assistant",
+                               help_check=False),
+}
+
+IMPORT_TIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$')
+
+
+def run_command(name, argv):
+    """Run a subcommand's script as __main__ with its own argv"""
+    path = REPO_ROOT / COMMANDS[name].script
+    # Scripts import their siblings, as when started from their own directory
+    sys.path.insert(0, str(path.parent))
+    sys.argv = [str(path), *argv]
+    runpy.run_path(str(path), run_name='__main__')
+    return 0
+
+
+def import_profile(argv):
+    """Parse `python -X importtime arrowreg.py <argv>` (bare interpreter if argv is None) into imported modules"""
+    target = ['-c', 'pass'] if argv is None else [str(Path(__file__).resolve()), *argv]
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', *target],
+        capture_output=True, text=True, env={**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'},
+    )
+    top_level, modules = {}, {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, module = int(match.group(2)), match.group(3), match.group(4)
+        modules[module] = cumulative
+        if not indent:
+            top_level[module] = cumulative
+    return {
+        'exit_code': result.returncode,
+        'top_level': top_level,
+        'modules': modules,
+    }
+
+
+def added_ms(profile, base):
+    """Import time of the top-level imports that `base` did not already make"""
+    return sum(us for module, us in profile['top_level'].items() if module not in base['top_level']) / 1000
+
+
+def best_profile(argv, base, runs):
+    """The run (of `runs`) with the least import time added over `base`"""
+    profiles = [import_profile(argv) for _ in range(runs)]
+    best = min(profiles, key=lambda profile: added_ms(profile, base))
+    best['exit_code'] = max(profile['exit_code'] for profile in profiles)
+    best['import_ms'] = round(added_ms(best, base), 2)
+    return best
+
+
+def startup_check(names, budget_ms, runs=STARTUP_RUNS):
+    """Profile `--help` of each command; returns (report, failures)"""
+    report, failures = {}, []
+    interpreter = best_profile(None, {'top_level': {}}, runs)
+    top = best_profile(['--help'], interpreter, runs)
+    for name in [None, *names]:
+        label = name or '(top level)'
+        # Commands are charged only for what they import beyond arrowreg.py's own startup
+        profile = best_profile([name, '--help'], top, runs) if name else top
+        allowed = COMMANDS[name].heavy if name else ()
+        heavy = sorted({module.split('.')[0] for module in profile['modules']} & set(HEAVY_MODULES))
+        unexpected = [module for module in heavy if module not in allowed]
+        report[label] = {
+            'import_ms': profile['import_ms'],
+            'modules': len(profile['modules']),
+            'heavy': heavy,
+            'slowest': sorted(profile['modules'].items(), key=lambda item: -item[1])[:5],
+        }
+        if profile['exit_code'] != 0:
+            failures.append(f"{label}: --help exited with {profile['exit_code']}")
+        if unexpected:
+            failures.append(f"{label}: imports {', '.join(unexpected)} on startup")
+        if not allowed and profile['import_ms'] > budget_ms:
+            failures.append(f"{label}: {profile['import_ms']:.1f} ms of imports exceeds {budget_ms:.0f} ms")
+    return report, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='arrowreg', description="ArrowReg data, index and OpenAI setup commands",
+        epilog="Run `arrowreg <command> --help` for a command's own options.",
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True, metavar='command')
+    for name, command in COMMANDS.items():
+        # Arguments (including --help) are left for the script to parse
+        subparsers.add_parser(name, help=command.help, add_help=False)
+
+    startup = subparsers.add_parser('startup', help="Check subcommand startup imports with -X importtime")
+    startup.add_argument('commands', nargs='*', help="Commands to check (default: all)")
+    startup.add_argument('--budget-ms', type=float, default=STARTUP_BUDGET_MS,
+                         help="Import time a command without heavy modules may add to startup")
+    startup.add_argument('--runs', type=int, default=STARTUP_RUNS, help="Runs per command; the best one counts")
+    startup.add_argument('--verbose', action='store_true', help="Print the per-command profile as JSON")
+
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        return run_command(sys.argv[1], sys.argv[2:])
+    args = parser.parse_args()
+
+    names = args.commands or [name for name, command in COMMANDS.items() if command.help_check]
+    unknown = [name for name in names if name not in COMMANDS]
+    if unknown:
+        parser.error(f"unknown command(s): {', '.join(unknown)}")
+    report, failures = startup_check(names, args.budget_ms, args.runs)
+    if args.verbose:
+        print(json.dumps(report, indent=2))
+    for label, entry in report.items():
+        heavy = f"  [{', '.join(entry['heavy'])}]" if entry['heavy'] else ""
+        print(f"{label:<16} {entry['import_ms']:>8.1f} ms  {entry['modules']:>4} modules{heavy}")
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ Startup imports within budget")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
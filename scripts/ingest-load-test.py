@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Ingest Load Test Harness for ArrowReg
+Drives the ingest path (file upload + vector store attach) from
+ingest-sample-data.py at increasing document counts and reports
+throughput and tail latency.
+
+By default a local OpenAI stand-in server is started in-process, so no API
+key or network access is needed. Pass --base-url to target another server.
+
+Usage:
+    python3 ingest-load-test.py --docs 1000,10000,100000 --concurrency 32
+    python3 ingest-load-test.py --docs 1000 --latency-ms 25 --rate-limit 800 --error-rate 0.01
+"""
+
+import argparse
+import importlib.util
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import openai_stand_in
+from api_client import ClientSettings, RequestStats, create_client
+from perf_stats import latency_summary
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+SAMPLE_PARAGRAPH = (
+    "(a) Each vessel must be fitted with an automatic fire detection and alarm system. "
+    "(b) The system must provide coverage for all machinery spaces, accommodation spaces "
+    "and control stations, and must be tested weekly when the vessel is in service.\n"
+)
+
+
+def load_ingest_module():
+    """Import ingest-sample-data.py despite its hyphenated filename"""
+    path = SCRIPTS_DIR / "setup" / "ingest-sample-data.py"
+    spec = importlib.util.spec_from_file_location("ingest_sample_data", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def synthetic_document(index, paragraphs):
+    """Build a deterministic synthetic CFR section as (filename, payload)"""
+    title = 46 if index % 2 == 0 else 33
+    part = 100 + index % 100
+    filename = f"{title}_cfr_{part}_{index:06d}.txt"
+    body = f"{title} CFR {part}.{index % 1000} - Synthetic load test section {index}\n\n"
+    body += SAMPLE_PARAGRAPH * paragraphs
+    return filename, body.encode("utf-8")
+
+
+def create_load_test_stores(client):
+    """Create the vector stores the ingest path routes documents into"""
+    stores = {}
+    for name in ("CFR Title 46 - Shipping", "CFR Title 33 - Navigation and Navigable Waters"):
+        stores[name] = client.beta.vector_stores.create(name=f"{name} (load test)").id
+    return stores
+
+
+def run_load(client, ingest, doc_count, concurrency, paragraphs):
+    """Ingest doc_count synthetic documents and return the measured results"""
+    vector_stores = create_load_test_stores(client)
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def ingest_one(index):
+        filename, payload = synthetic_document(index, paragraphs)
+        start = time.perf_counter()
+        ingest.upload_document(client, filename, payload, vector_stores)
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(ingest_one, i) for i in range(doc_count)]
+        for future in as_completed(futures):
+            error = future.exception()
+            if error is not None:
+                errors.append(str(error))
+    wall = time.perf_counter() - start
+
+    return {
+        "documents": doc_count,
+        "succeeded": len(latencies),
+        "failed": len(errors),
+        "wall_seconds": round(wall, 3),
+        "docs_per_second": round(len(latencies) / wall, 2) if wall > 0 else None,
+        "latency": latency_summary(latencies),
+        "sample_errors": errors[:5],
+    }
+
+
+def fetch_stand_in_stats(server):
+    if server is None:
+        return None
+    with server.state.lock:
+        return dict(server.state.stats)
+
+
+def print_result(result):
+    latency = result["latency"]
+    print(f"   📦 {result['documents']:>7,} docs  "
+          f"{result['docs_per_second']:>9,.1f} docs/s  "
+          f"p50 {latency.get('p50_ms', 0):8.1f} ms  "
+          f"p95 {latency.get('p95_ms', 0):8.1f} ms  "
+          f"p99 {latency.get('p99_ms', 0):8.1f} ms  "
+          f"failed {result['failed']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the ArrowReg ingest path")
+    parser.add_argument("--docs", default="1000,10000,100000",
+                        help="Comma-separated document counts to run")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent ingest workers")
+    parser.add_argument("--paragraphs", type=int, default=4, help="Paragraphs per synthetic document")
+    parser.add_argument("--base-url", default=None,
+                        help="Target an already running server instead of an in-process stand-in")
+    parser.add_argument("--api-key", default="sk-stand-in")
+    parser.add_argument("--output", type=Path, default=None, help="Write the JSON report here")
+    openai_stand_in.add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.base_url
+    if base_url is None:
+        server = openai_stand_in.start_server(openai_stand_in.config_from_args(args))
+        base_url = openai_stand_in.server_base_url(server)
+        print(f"🧪 Started OpenAI stand-in at {base_url}")
+
+    request_stats = RequestStats()
+    client = create_client(
+        ClientSettings(api_key=args.api_key, base_url=base_url),
+        timing_hooks=[request_stats],
+        max_connections=max(args.concurrency, 1),
+    )
+    ingest = load_ingest_module()
+    doc_counts = [int(n) for n in args.docs.split(",") if n.strip()]
+
+    print(f"🚀 Ingest load test: {doc_counts} docs, concurrency {args.concurrency}")
+    results = []
+    for doc_count in doc_counts:
+        result = run_load(client, ingest, doc_count, args.concurrency, args.paragraphs)
+        results.append(result)
+        print_result(result)
+
+    report = {
+        "base_url": base_url,
+        "concurrency": args.concurrency,
+        "paragraphs": args.paragraphs,
+        "runs": results,
+        "requests": request_stats.summary(),
+        "stand_in_stats": fetch_stand_in_stats(server),
+    }
+
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"💾 Report written to {args.output}")
+
+    if server is not None:
+        server.shutdown()
+
+    return 0 if all(r["failed"] == 0 for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""
+Idempotent reconciliation of ArrowReg OpenAI resources
+
+Setup scripts describe the vector stores and assistants they want as specs.
+The helpers here list what already exists, match it by the `arrowreg_key`
+metadata tag (falling back to the resource name for objects created before
+tagging), and create or update only what differs from the spec. Re-running
+setup is then a handful of list calls instead of a full rebuild.
+"""
+
+MANAGED_BY = "arrowreg-setup"
+
+# The Assistants API links at most one vector store to an assistant (or thread)
+MAX_ASSISTANT_VECTOR_STORES = 1
+
+# Outcomes reported for each reconciled resource
+CREATED = "created"
+UPDATED = "updated"
+UNCHANGED = "unchanged"
+
+
+def resource_metadata(key, extra=None):
+    """Metadata that tags a resource as managed by the setup scripts"""
+    metadata = {"managed_by": MANAGED_BY, "arrowreg_key": key}
+    metadata.update(extra or {})
+    return metadata
+
+
+def list_all(list_method):
+    """Collect every object from a paginated SDK list call"""
+    return list(list_method(limit=100, order="desc"))
+
+
+def find_matches(resources, key, name):
+    """Return resources tagged with key, or untagged ones with the same name, newest first"""
+    tagged = [r for r in resources if (r.metadata or {}).get("arrowreg_key") == key]
+    if tagged:
+        return tagged
+    return [r for r in resources if r.name == name and not (r.metadata or {}).get("arrowreg_key")]
+
+
+def merged_metadata(actual, expected):
+    """Spec metadata over the existing tags, so keys the spec doesn't set survive updates"""
+    return {**(actual or {}), **expected}
+
+
+def metadata_differs(actual, expected):
+    actual = actual or {}
+    return any(actual.get(k) != v for k, v in expected.items())
+
+
+def normalize_tools(tools):
+    """Reduce tool definitions to the fields the setup scripts control"""
+    normalized = []
+    for tool in tools:
+        tool = tool if isinstance(tool, dict) else tool.model_dump(exclude_none=True)
+        entry = {"type": tool["type"]}
+        if tool["type"] == "function":
+            function = tool["function"]
+            entry["function"] = {
+                "name": function.get("name"),
+                "description": function.get("description"),
+                "parameters": function.get("parameters"),
+            }
+        normalized.append(entry)
+    return sorted(normalized, key=lambda t: (t["type"], t.get("function", {}).get("name") or ""))
+
+
+def vector_store_ids_of(tool_resources):
+    if tool_resources is None:
+        return []
+    if not isinstance(tool_resources, dict):
+        tool_resources = tool_resources.model_dump(exclude_none=True)
+    return sorted((tool_resources.get("file_search") or {}).get("vector_store_ids") or [])
+
+
+def validate_assistant_spec(spec):
+    """Reject specs the Assistants API would refuse, before any request is made"""
+    vector_store_ids = vector_store_ids_of(spec.get("tool_resources"))
+    if len(vector_store_ids) > MAX_ASSISTANT_VECTOR_STORES:
+        raise ValueError(
+            f"An assistant can link at most {MAX_ASSISTANT_VECTOR_STORES} vector store "
+            f"({len(vector_store_ids)} given: {', '.join(vector_store_ids)})"
+        )
+
+
+def assistant_differences(assistant, spec):
+    """Return the names of spec fields that differ on an existing assistant"""
+    differences = []
+    if assistant.name != spec["name"]:
+        differences.append("name")
+    if (assistant.instructions or "").strip() != spec["instructions"].strip():
+        differences.append("instructions")
+    if assistant.model != spec["model"]:
+        differences.append("model")
+    temperature = 1.0 if assistant.temperature is None else assistant.temperature
+    if "temperature" in spec and abs(temperature - spec["temperature"]) > 1e-6:
+        differences.append("temperature")
+    if normalize_tools(assistant.tools) != normalize_tools(spec["tools"]):
+        differences.append("tools")
+    if "tool_resources" in spec and (
+        vector_store_ids_of(assistant.tool_resources) != vector_store_ids_of(spec["tool_resources"])
+    ):
+        differences.append("tool_resources")
+    if metadata_differs(assistant.metadata, spec["metadata"]):
+        differences.append("metadata")
+    return differences
+
+
+def reconcile_vector_store(client, spec, existing, dry_run=False):
+    """Create or update one vector store to match spec; return (id, action, duplicates)
+
+    spec: {"key", "name", "metadata"}. Duplicates are other matching stores,
+    newest first, left untouched for the caller to report or prune.
+    """
+    matches = find_matches(existing, spec["key"], spec["name"])
+    if not matches:
+        if dry_run:
+            return None, CREATED, []
+        vector_store = client.beta.vector_stores.create(name=spec["name"], metadata=spec["metadata"])
+        return vector_store.id, CREATED, []
+
+    current, duplicates = matches[0], matches[1:]
+    if current.name == spec["name"] and not metadata_differs(current.metadata, spec["metadata"]):
+        return current.id, UNCHANGED, duplicates
+
+    if not dry_run:
+        # Merged like the assistant's, so the arrowreg_key tag and user-added keys survive
+        client.beta.vector_stores.update(
+            vector_store_id=current.id,
+            name=spec["name"],
+            metadata=merged_metadata(current.metadata, spec["metadata"]),
+        )
+    return current.id, UPDATED, duplicates
+
+
+def reconcile_assistant(client, spec, existing, dry_run=False):
+    """Create or update one assistant to match spec; return (id, action, changed_fields, duplicates)
+
+    spec: {"key", "name", "instructions", "model", "tools", "temperature",
+    "tool_resources", "metadata"}; temperature and tool_resources are only
+    compared when the spec sets them. Raises ValueError for a spec the API
+    would reject (e.g. more than one vector store).
+    """
+    validate_assistant_spec(spec)
+    fields = {k: v for k, v in spec.items() if k != "key"}
+    matches = find_matches(existing, spec["key"], spec["name"])
+    if not matches:
+        if dry_run:
+            return None, CREATED, list(fields), []
+        assistant = client.beta.assistants.create(**fields)
+        return assistant.id, CREATED, list(fields), []
+
+    current, duplicates = matches[0], matches[1:]
+    differences = assistant_differences(current, spec)
+    if not differences:
+        return current.id, UNCHANGED, [], duplicates
+
+    if not dry_run:
+        # Metadata is merged so informational keys (e.g. creation time) survive updates
+        updates = {field: fields[field] for field in differences if field in fields}
+        if "metadata" in updates:
+            updates["metadata"] = merged_metadata(current.metadata, spec["metadata"])
+        client.beta.assistants.update(assistant_id=current.id, **updates)
+    return current.id, UPDATED, differences, duplicates
+
+
+def prune(client, duplicates, kind, dry_run=False):
+    """Delete duplicate managed resources; only objects tagged by setup are removed"""
+    deleted = []
+    for resource in duplicates:
+        if (resource.metadata or {}).get("managed_by") != MANAGED_BY:
+            continue
+        if not dry_run:
+            if kind == "vector_store":
+                client.beta.vector_stores.delete(vector_store_id=resource.id)
+            else:
+                client.beta.assistants.delete(assistant_id=resource.id)
+        deleted.append(resource.id)
+    return deleted
@@ -0,0 +1,759 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI-compatible stand-in server for ArrowReg scripts
+
+Implements the subset of the OpenAI REST API used by the setup and ingest
+scripts (models, files, vector_stores, assistants, threads, messages and
+runs) entirely in memory, with configurable latency, rate limiting and
+error injection so the scripts can be exercised and load-tested offline.
+
+Usage:
+    python3 openai_stand_in.py --port 8765 --latency-ms 20 --rate-limit 500
+    export OPENAI_BASE_URL="http://127.0.0.1:8765/v1"
+    export OPENAI_API_KEY="sk-stand-in"
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import types
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_ANSWER = (
+    "Each OSV must be fitted with an automatic fire detection and alarm system "
+    "covering machinery and accommodation spaces, as required by 46 CFR 109.213 [1]."
+)
+
+# The real API links at most this many vector stores to an assistant or thread
+MAX_VECTOR_STORE_IDS = 1
+
+# Share of a streamed run's duration spent before the first token arrives
+FIRST_TOKEN_FRACTION = 0.3
+
+
+class StandInConfig:
+    """Behaviour knobs for the stand-in server"""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, rate_limit=0.0, error_rate=0.0,
+                 index_delay_ms=0.0, run_delay_ms=200.0, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_limit = rate_limit  # requests per second, 0 disables limiting
+        self.error_rate = error_rate  # probability of an injected 500 per request
+        self.index_delay_ms = index_delay_ms
+        self.run_delay_ms = run_delay_ms
+        self.random = random.Random(seed)
+
+
+class TokenBucket:
+    """Thread-safe token bucket used to emulate API rate limits"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.capacity = max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token; return 0 on success or the seconds until one is available"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+
+class StandInState:
+    """In-memory resource store shared by all request handler threads"""
+
+    def __init__(self, config):
+        self.config = config
+        self.lock = threading.Lock()
+        self.files = {}
+        self.file_contents = {}
+        self.vector_stores = {}
+        self.vector_store_files = {}
+        self.assistants = {}
+        self.threads = {}
+        self.messages = {}
+        self.runs = {}
+        self.stats = {"requests": 0, "rate_limited": 0, "injected_errors": 0}
+        self.bucket = TokenBucket(config.rate_limit) if config.rate_limit > 0 else None
+
+    @staticmethod
+    def new_id(prefix):
+        return f"{prefix}{uuid.uuid4().hex[:24]}"
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+
+def paginate(items, query):
+    """Apply OpenAI-style cursor pagination (limit/order/after) to a list of objects"""
+    order = query.get("order", ["desc"])[0]
+    limit = int(query.get("limit", ["20"])[0])
+    after = query.get("after", [None])[0]
+
+    items = sorted(items, key=lambda item: (item["created_at"], item["id"]), reverse=(order == "desc"))
+    if after:
+        ids = [item["id"] for item in items]
+        if after in ids:
+            items = items[ids.index(after) + 1:]
+
+    page = items[:limit]
+    return {
+        "object": "list",
+        "data": page,
+        "first_id": page[0]["id"] if page else None,
+        "last_id": page[-1]["id"] if page else None,
+        "has_more": len(items) > limit,
+    }
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Routes OpenAI REST calls onto the in-memory StandInState"""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "ArrowRegStandIn/1.0"
+    disable_nagle_algorithm = True
+
+    routes = [
+        ("GET", r"/v1/models", "list_models"),
+        ("POST", r"/v1/files", "create_file"),
+        ("GET", r"/v1/files", "list_files"),
+        ("GET", r"/v1/files/(?P<file_id>[^/]+)", "retrieve_file"),
+        ("DELETE", r"/v1/files/(?P<file_id>[^/]+)", "delete_file"),
+        ("POST", r"/v1/vector_stores", "create_vector_store"),
+        ("GET", r"/v1/vector_stores", "list_vector_stores"),
+        ("GET", r"/v1/vector_stores/(?P<vs_id>[^/]+)", "retrieve_vector_store"),
+        ("POST", r"/v1/vector_stores/(?P<vs_id>[^/]+)", "update_vector_store"),
+        ("DELETE", r"/v1/vector_stores/(?P<vs_id>[^/]+)", "delete_vector_store"),
+        ("POST", r"/v1/vector_stores/(?P<vs_id>[^/]+)/files", "create_vector_store_file"),
+        ("GET", r"/v1/vector_stores/(?P<vs_id>[^/]+)/files", "list_vector_store_files"),
+        ("GET", r"/v1/vector_stores/(?P<vs_id>[^/]+)/files/(?P<file_id>[^/]+)", "retrieve_vector_store_file"),
+        ("POST", r"/v1/assistants", "create_assistant"),
+        ("GET", r"/v1/assistants", "list_assistants"),
+        ("GET", r"/v1/assistants/(?P<assistant_id>[^/]+)", "retrieve_assistant"),
+        ("POST", r"/v1/assistants/(?P<assistant_id>[^/]+)", "update_assistant"),
+        ("DELETE", r"/v1/assistants/(?P<assistant_id>[^/]+)", "delete_assistant"),
+        ("POST", r"/v1/threads", "create_thread"),
+        ("GET", r"/v1/threads/(?P<thread_id>[^/]+)", "retrieve_thread"),
+        ("POST", r"/v1/threads/(?P<thread_id>[^/]+)/messages", "create_message"),
+        ("GET", r"/v1/threads/(?P<thread_id>[^/]+)/messages", "list_messages"),
+        ("POST", r"/v1/threads/(?P<thread_id>[^/]+)/runs", "create_run"),
+        ("GET", r"/v1/threads/(?P<thread_id>[^/]+)/runs/(?P<run_id>[^/]+)", "retrieve_run"),
+        ("GET", r"/_stand_in/stats", "get_stats"),
+    ]
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def log_message(self, format, *args):
+        # Keep the console quiet under load; stats are exposed via /_stand_in/stats
+        pass
+
+    # ------------------------------------------------------------------
+    # Request plumbing
+    # ------------------------------------------------------------------
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def do_DELETE(self):
+        self.dispatch("DELETE")
+
+    def dispatch(self, method):
+        parsed = urlparse(self.path)
+        self.query = parse_qs(parsed.query)
+        body = self.read_body()
+        path = parsed.path.rstrip("/")
+
+        for route_method, pattern, handler_name in self.routes:
+            if route_method != method:
+                continue
+            match = re.fullmatch(pattern, path)
+            if not match:
+                continue
+
+            if not path.startswith("/_stand_in") and not self.apply_faults():
+                return
+            try:
+                status, payload = getattr(self, handler_name)(body, **match.groupdict())
+            except KeyError as e:
+                status, payload = 404, self.error_body(f"No such object: {e}", "invalid_request_error")
+            except ValueError as e:
+                status, payload = 400, self.error_body(str(e), "invalid_request_error")
+            if isinstance(payload, types.GeneratorType):
+                self.send_event_stream(payload)
+            else:
+                self.send_json(status, payload)
+            return
+
+        self.send_json(404, self.error_body(f"Unknown route {method} {path}", "invalid_request_error"))
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def apply_faults(self):
+        """Apply latency, rate limiting and error injection; return False if a fault response was sent"""
+        config = self.state.config
+        self.state.count("requests")
+
+        if config.latency_ms or config.jitter_ms:
+            delay = config.latency_ms + config.random.uniform(0, config.jitter_ms)
+            time.sleep(delay / 1000.0)
+
+        if self.state.bucket is not None:
+            wait = self.state.bucket.acquire()
+            if wait > 0:
+                self.state.count("rate_limited")
+                self.send_json(
+                    429,
+                    self.error_body("Rate limit reached for requests", "requests"),
+                    headers={"retry-after-ms": str(int(wait * 1000) + 1)},
+                )
+                return False
+
+        if config.error_rate and config.random.random() < config.error_rate:
+            self.state.count("injected_errors")
+            self.send_json(500, self.error_body("Injected server error", "server_error"))
+            return False
+
+        return True
+
+    def send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_event_stream(self, events):
+        """Send (event, data) pairs as a chunked Server-Sent Events response"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def write_chunk(data):
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        for event, data in events:
+            write_chunk(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+        write_chunk(b"event: done\ndata: [DONE]\n\n")
+        write_chunk(b"")
+
+    @staticmethod
+    def error_body(message, error_type):
+        return {"error": {"message": message, "type": error_type, "param": None, "code": None}}
+
+    def json_body(self, body):
+        return json.loads(body) if body else {}
+
+    def multipart_body(self, body):
+        """Parse a multipart/form-data upload into (fields, files)"""
+        header = f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode("utf-8")
+        message = BytesParser(policy=HTTP).parsebytes(header + body)
+        fields, files = {}, {}
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            filename = part.get_filename()
+            payload = part.get_payload(decode=True) or b""
+            if filename is not None:
+                files[name] = (filename, payload)
+            else:
+                fields[name] = payload.decode("utf-8")
+        return fields, files
+
+    # ------------------------------------------------------------------
+    # Models and files
+    # ------------------------------------------------------------------
+
+    def list_models(self, body):
+        return 200, {"object": "list", "data": [
+            {"id": "gpt-4-turbo-preview", "object": "model", "created": 0, "owned_by": "stand-in"},
+        ]}
+
+    def create_file(self, body):
+        fields, files = self.multipart_body(body)
+        if "file" not in files:
+            raise ValueError("Missing required parameter: 'file'")
+        filename, payload = files["file"]
+        file_obj = {
+            "id": StandInState.new_id("file-"),
+            "object": "file",
+            "bytes": len(payload),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": fields.get("purpose", "assistants"),
+            "status": "processed",
+        }
+        with self.state.lock:
+            self.state.files[file_obj["id"]] = file_obj
+            self.state.file_contents[file_obj["id"]] = payload
+        return 200, file_obj
+
+    def list_files(self, body):
+        with self.state.lock:
+            files = list(self.state.files.values())
+        return 200, {"object": "list", "data": files}
+
+    def retrieve_file(self, body, file_id):
+        with self.state.lock:
+            return 200, self.state.files[file_id]
+
+    def delete_file(self, body, file_id):
+        with self.state.lock:
+            del self.state.files[file_id]
+            self.state.file_contents.pop(file_id, None)
+        return 200, {"id": file_id, "object": "file", "deleted": True}
+
+    # ------------------------------------------------------------------
+    # Vector stores
+    # ------------------------------------------------------------------
+
+    def vector_store_view(self, vs_id):
+        """Return a vector store with file counts refreshed from its files"""
+        store = self.state.vector_stores[vs_id]
+        files = [self.vector_store_file_view(vs_id, f) for f in self.state.vector_store_files[vs_id]]
+        counts = {"in_progress": 0, "completed": 0, "failed": 0, "cancelled": 0}
+        for vs_file in files:
+            counts[vs_file["status"]] += 1
+        store["file_counts"] = {**counts, "total": len(files)}
+        store["usage_bytes"] = sum(vs_file["usage_bytes"] for vs_file in files)
+        store["status"] = "in_progress" if counts["in_progress"] else "completed"
+        return store
+
+    def vector_store_file_view(self, vs_id, file_id):
+        vs_file = self.state.vector_store_files[vs_id][file_id]
+        if vs_file["status"] == "in_progress" and time.monotonic() >= vs_file["_ready_at"]:
+            vs_file["status"] = "completed"
+        return {k: v for k, v in vs_file.items() if not k.startswith("_")}
+
+    def create_vector_store(self, body):
+        params = self.json_body(body)
+        store = {
+            "id": StandInState.new_id("vs_"),
+            "object": "vector_store",
+            "created_at": int(time.time()),
+            "name": params.get("name"),
+            "metadata": params.get("metadata") or {},
+            "expires_after": params.get("expires_after"),
+            "last_active_at": int(time.time()),
+        }
+        with self.state.lock:
+            self.state.vector_stores[store["id"]] = store
+            self.state.vector_store_files[store["id"]] = {}
+            for file_id in params.get("file_ids") or []:
+                self.attach_file(store["id"], file_id)
+            return 200, self.vector_store_view(store["id"])
+
+    def list_vector_stores(self, body):
+        with self.state.lock:
+            stores = [self.vector_store_view(vs_id) for vs_id in self.state.vector_stores]
+        return 200, paginate(stores, self.query)
+
+    def retrieve_vector_store(self, body, vs_id):
+        with self.state.lock:
+            return 200, self.vector_store_view(vs_id)
+
+    def update_vector_store(self, body, vs_id):
+        params = self.json_body(body)
+        with self.state.lock:
+            store = self.state.vector_stores[vs_id]
+            for key in ("name", "metadata", "expires_after"):
+                if key in params:
+                    store[key] = params[key]
+            return 200, self.vector_store_view(vs_id)
+
+    def delete_vector_store(self, body, vs_id):
+        with self.state.lock:
+            del self.state.vector_stores[vs_id]
+            del self.state.vector_store_files[vs_id]
+        return 200, {"id": vs_id, "object": "vector_store.deleted", "deleted": True}
+
+    def attach_file(self, vs_id, file_id):
+        """Attach an uploaded file to a vector store; caller must hold the state lock"""
+        if file_id not in self.state.files:
+            raise ValueError(f"No file with id '{file_id}'")
+        delay = self.state.config.index_delay_ms / 1000.0
+        vs_file = {
+            "id": file_id,
+            "object": "vector_store.file",
+            "created_at": int(time.time()),
+            "vector_store_id": vs_id,
+            "status": "in_progress" if delay > 0 else "completed",
+            "usage_bytes": self.state.files[file_id]["bytes"],
+            "last_error": None,
+            "_ready_at": time.monotonic() + delay,
+        }
+        self.state.vector_store_files[vs_id][file_id] = vs_file
+        return vs_file
+
+    def create_vector_store_file(self, body, vs_id):
+        params = self.json_body(body)
+        with self.state.lock:
+            if vs_id not in self.state.vector_stores:
+                raise KeyError(vs_id)
+            self.attach_file(vs_id, params.get("file_id"))
+            return 200, self.vector_store_file_view(vs_id, params["file_id"])
+
+    def list_vector_store_files(self, body, vs_id):
+        with self.state.lock:
+            files = [self.vector_store_file_view(vs_id, f) for f in self.state.vector_store_files[vs_id]]
+        return 200, paginate(files, self.query)
+
+    def retrieve_vector_store_file(self, body, vs_id, file_id):
+        with self.state.lock:
+            return 200, self.vector_store_file_view(vs_id, file_id)
+
+    # ------------------------------------------------------------------
+    # Assistants
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def check_tool_resources(params):
+        """Reject tool_resources the real API would refuse (400 via ValueError)"""
+        file_search = (params.get("tool_resources") or {}).get("file_search") or {}
+        ids = file_search.get("vector_store_ids") or []
+        if len(ids) > MAX_VECTOR_STORE_IDS:
+            raise ValueError(
+                f"Invalid 'tool_resources.file_search.vector_store_ids': array too long. Expected an array "
+                f"with maximum length {MAX_VECTOR_STORE_IDS}, but got an array with length {len(ids)} instead."
+            )
+
+    def create_assistant(self, body):
+        params = self.json_body(body)
+        self.check_tool_resources(params)
+        assistant = {
+            "id": StandInState.new_id("asst_"),
+            "object": "assistant",
+            "created_at": int(time.time()),
+            "name": params.get("name"),
+            "description": params.get("description"),
+            "model": params.get("model"),
+            "instructions": params.get("instructions"),
+            "tools": params.get("tools") or [],
+            "tool_resources": params.get("tool_resources") or {},
+            "metadata": params.get("metadata") or {},
+            "temperature": params.get("temperature", 1.0),
+            "top_p": params.get("top_p", 1.0),
+            "response_format": "auto",
+        }
+        with self.state.lock:
+            self.state.assistants[assistant["id"]] = assistant
+        return 200, assistant
+
+    def list_assistants(self, body):
+        with self.state.lock:
+            assistants = list(self.state.assistants.values())
+        return 200, paginate(assistants, self.query)
+
+    def retrieve_assistant(self, body, assistant_id):
+        with self.state.lock:
+            return 200, self.state.assistants[assistant_id]
+
+    def update_assistant(self, body, assistant_id):
+        params = self.json_body(body)
+        self.check_tool_resources(params)
+        with self.state.lock:
+            assistant = self.state.assistants[assistant_id]
+            assistant.update(params)
+            return 200, assistant
+
+    def delete_assistant(self, body, assistant_id):
+        with self.state.lock:
+            del self.state.assistants[assistant_id]
+        return 200, {"id": assistant_id, "object": "assistant.deleted", "deleted": True}
+
+    # ------------------------------------------------------------------
+    # Threads, messages and runs
+    # ------------------------------------------------------------------
+
+    def create_thread(self, body):
+        params = self.json_body(body)
+        self.check_tool_resources(params)
+        thread = {
+            "id": StandInState.new_id("thread_"),
+            "object": "thread",
+            "created_at": int(time.time()),
+            "metadata": params.get("metadata") or {},
+            "tool_resources": params.get("tool_resources") or {},
+        }
+        with self.state.lock:
+            self.state.threads[thread["id"]] = thread
+            self.state.messages[thread["id"]] = []
+            for message in params.get("messages") or []:
+                self.add_message(thread["id"], message.get("role", "user"), message.get("content", ""))
+        return 200, thread
+
+    def retrieve_thread(self, body, thread_id):
+        with self.state.lock:
+            return 200, self.state.threads[thread_id]
+
+    def add_message(self, thread_id, role, text, annotations=None, assistant_id=None, run_id=None):
+        """Append a message to a thread; caller must hold the state lock"""
+        message = {
+            "id": StandInState.new_id("msg_"),
+            "object": "thread.message",
+            "created_at": int(time.time()),
+            "thread_id": thread_id,
+            "role": role,
+            "status": "completed",
+            "content": [{"type": "text", "text": {"value": text, "annotations": annotations or []}}],
+            "assistant_id": assistant_id,
+            "run_id": run_id,
+            "attachments": [],
+            "metadata": {},
+            "_seq": len(self.state.messages[thread_id]),
+        }
+        self.state.messages[thread_id].append(message)
+        return message
+
+    @staticmethod
+    def message_view(message):
+        return {k: v for k, v in message.items() if not k.startswith("_")}
+
+    def create_message(self, body, thread_id):
+        params = self.json_body(body)
+        content = params.get("content", "")
+        if isinstance(content, list):
+            content = " ".join(part.get("text", "") for part in content if part.get("type") == "text")
+        with self.state.lock:
+            if thread_id not in self.state.threads:
+                raise KeyError(thread_id)
+            message = self.add_message(thread_id, params.get("role", "user"), content)
+        return 200, self.message_view(message)
+
+    def list_messages(self, body, thread_id):
+        order = self.query.get("order", ["desc"])[0]
+        limit = int(self.query.get("limit", ["20"])[0])
+        with self.state.lock:
+            messages = sorted(self.state.messages[thread_id], key=lambda m: m["_seq"], reverse=(order == "desc"))
+            page = [self.message_view(m) for m in messages[:limit]]
+        return 200, {
+            "object": "list",
+            "data": page,
+            "first_id": page[0]["id"] if page else None,
+            "last_id": page[-1]["id"] if page else None,
+            "has_more": len(messages) > limit,
+        }
+
+    def create_run(self, body, thread_id):
+        params = self.json_body(body)
+        with self.state.lock:
+            if thread_id not in self.state.threads:
+                raise KeyError(thread_id)
+            assistant = self.state.assistants[params["assistant_id"]]
+            run = {
+                "id": StandInState.new_id("run_"),
+                "object": "thread.run",
+                "created_at": int(time.time()),
+                "thread_id": thread_id,
+                "assistant_id": assistant["id"],
+                "status": "queued",
+                "model": params.get("model") or assistant["model"],
+                "instructions": params.get("instructions") or assistant["instructions"],
+                "tools": assistant["tools"],
+                "last_error": None,
+                "started_at": None,
+                "completed_at": None,
+                "metadata": params.get("metadata") or {},
+                "_ready_at": time.monotonic() + self.state.config.run_delay_ms / 1000.0,
+            }
+            if params.get("stream"):
+                # The stream posts the answer itself, after its last token
+                run["_streamed"] = True
+            self.state.runs[run["id"]] = run
+            if params.get("stream"):
+                return 200, self.stream_run(run)
+            return 200, self.run_view(run)
+
+    def stream_run(self, run):
+        """Yield (event, data) pairs emulating a streamed run, with tokens spread over the run delay
+
+        State is read and updated under the lock but every event is yielded
+        after releasing it, so a slow client never blocks other requests.
+        """
+        with self.state.lock:
+            created = self.run_view(run)
+            in_progress = self.run_view(run)
+        yield "thread.run.created", created
+        yield "thread.run.in_progress", in_progress
+
+        run_seconds = self.state.config.run_delay_ms / 1000.0
+        time.sleep(run_seconds * FIRST_TOKEN_FRACTION)
+
+        words = DEFAULT_ANSWER.split(" ")
+        chunks = [" ".join(words[i:i + 4]) + " " for i in range(0, len(words), 4)]
+        chunks[-1] = chunks[-1].rstrip()
+        message_id = StandInState.new_id("msg_")
+        yield "thread.message.created", {
+            "id": message_id, "object": "thread.message", "created_at": int(time.time()),
+            "thread_id": run["thread_id"], "role": "assistant", "status": "in_progress",
+            "content": [], "assistant_id": run["assistant_id"], "run_id": run["id"],
+            "attachments": [], "metadata": {},
+        }
+
+        chunk_delay = run_seconds * (1 - FIRST_TOKEN_FRACTION) / len(chunks)
+        for chunk in chunks:
+            yield "thread.message.delta", {
+                "id": message_id,
+                "object": "thread.message.delta",
+                "delta": {"content": [{"index": 0, "type": "text", "text": {"value": chunk}}]},
+            }
+            time.sleep(chunk_delay)
+
+        with self.state.lock:
+            if run["status"] != "completed":
+                self.complete_run(run)["id"] = message_id
+            completed_message = self.message_view(self.run_message(run))
+            completed_run = self.run_view(run)
+        yield "thread.message.completed", completed_message
+        yield "thread.run.completed", completed_run
+
+    def retrieve_run(self, body, thread_id, run_id):
+        with self.state.lock:
+            run = self.state.runs[run_id]
+            if run["thread_id"] != thread_id:
+                raise KeyError(run_id)
+            return 200, self.run_view(run)
+
+    def run_view(self, run):
+        """Advance a run through queued -> in_progress -> completed; caller must hold the state lock"""
+        if run["status"] == "queued":
+            run["status"] = "in_progress"
+            run["started_at"] = int(time.time())
+        elif run["status"] == "in_progress" and not run.get("_streamed") and time.monotonic() >= run["_ready_at"]:
+            self.complete_run(run)
+        return {k: v for k, v in run.items() if not k.startswith("_")}
+
+    def complete_run(self, run):
+        """Mark a run completed and post its answer once; caller must hold the state lock"""
+        if run["status"] == "completed":
+            return self.run_message(run)
+        run["status"] = "completed"
+        run["completed_at"] = int(time.time())
+        return self.add_message(
+            run["thread_id"], "assistant", DEFAULT_ANSWER,
+            annotations=self.answer_annotations(run["assistant_id"]),
+            assistant_id=run["assistant_id"], run_id=run["id"],
+        )
+
+    def run_message(self, run):
+        """The answer a completed run posted; caller must hold the state lock"""
+        return next(m for m in self.state.messages[run["thread_id"]] if m.get("run_id") == run["id"])
+
+    def answer_annotations(self, assistant_id):
+        """Cite the first file found in the assistant's vector stores, if any"""
+        store_ids = (
+            self.state.assistants[assistant_id]
+            .get("tool_resources", {})
+            .get("file_search", {})
+            .get("vector_store_ids", [])
+        )
+        for vs_id in store_ids:
+            for file_id in self.state.vector_store_files.get(vs_id, {}):
+                start = DEFAULT_ANSWER.index("[1]")
+                return [{
+                    "type": "file_citation",
+                    "text": "[1]",
+                    "start_index": start,
+                    "end_index": start + 3,
+                    "file_citation": {"file_id": file_id, "quote": ""},
+                }]
+        return []
+
+    def get_stats(self, body):
+        with self.state.lock:
+            return 200, {
+                **self.state.stats,
+                "files": len(self.state.files),
+                "vector_stores": len(self.state.vector_stores),
+                "assistants": len(self.state.assistants),
+                "threads": len(self.state.threads),
+            }
+
+
+def start_server(config, host="127.0.0.1", port=0):
+    """Start the stand-in server on a background thread and return it"""
+    server = ThreadingHTTPServer((host, port), StandInHandler)
+    server.daemon_threads = True
+    server.state = StandInState(config)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def server_base_url(server):
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}/v1"
+
+
+def add_config_arguments(parser):
+    """Register the stand-in behaviour flags on an argparse parser"""
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Fixed latency added to every request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform random latency added on top")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Requests per second before 429s (0 = unlimited)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of an injected 500 per request")
+    parser.add_argument("--index-delay-ms", type=float, default=0.0, help="Time a vector store file stays in_progress")
+    parser.add_argument("--run-delay-ms", type=float, default=200.0, help="Time a run takes to complete")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for jitter and error injection")
+
+
+def config_from_args(args):
+    return StandInConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        rate_limit=args.rate_limit,
+        error_rate=args.error_rate,
+        index_delay_ms=args.index_delay_ms,
+        run_delay_ms=args.run_delay_ms,
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), StandInHandler)
+    server.daemon_threads = True
+    server.state = StandInState(config_from_args(args))
+
+    print(f"🧪 OpenAI stand-in listening on {server_base_url(server)}")
+    print(f"   export OPENAI_BASE_URL={server_base_url(server)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stand-in stopped")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Assistant Query Benchmark for ArrowReg
+Replays a file of maritime queries against the assistant with N concurrent
+threads/runs and reports percentiles for thread creation, time to first
+token, total completion time and citation count.
+
+Runs against the real API (assistant from the environment, backend/.dev.vars
+or config/openai_config.json) or against an in-process OpenAI stand-in.
+
+Usage:
+    python3 query-benchmark.py --concurrency 8
+    python3 query-benchmark.py --stand-in --concurrency 32 --repeat 5 --run-delay-ms 800
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import openai_stand_in
+from api_client import (
+    CONFIG_PATH, ClientSettings, RequestStats, create_client, load_openai_config, load_settings
+)
+from perf_stats import distribution_summary, latency_summary
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+DEFAULT_QUERIES = SCRIPTS_DIR / "benchmark-queries.txt"
+RUN_INSTRUCTIONS = "Provide a concise answer with specific regulation citations."
+
+
+def load_queries(path):
+    """Read one query per line, skipping blanks and # comments"""
+    with open(path, 'r') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+
+def count_citations(message):
+    """Count file citation annotations in a completed assistant message"""
+    count = 0
+    for part in message.content:
+        if part.type == 'text':
+            count += sum(1 for a in part.text.annotations if a.type == 'file_citation')
+    return count
+
+
+def run_query(client, assistant_id, query):
+    """Create a thread, stream one run and return its timings"""
+    result = {'query': query}
+
+    start = time.perf_counter()
+    thread = client.beta.threads.create()
+    result['thread_seconds'] = time.perf_counter() - start
+
+    client.beta.threads.messages.create(thread_id=thread.id, role="user", content=query)
+
+    start = time.perf_counter()
+    stream = client.beta.threads.runs.create(
+        thread_id=thread.id,
+        assistant_id=assistant_id,
+        instructions=RUN_INSTRUCTIONS,
+        stream=True,
+    )
+    for event in stream:
+        if event.event == 'thread.message.delta' and 'first_token_seconds' not in result:
+            result['first_token_seconds'] = time.perf_counter() - start
+        elif event.event == 'thread.message.completed':
+            result['citations'] = result.get('citations', 0) + count_citations(event.data)
+        elif event.event == 'thread.run.completed':
+            result['completion_seconds'] = time.perf_counter() - start
+        elif event.event in ('thread.run.failed', 'thread.run.cancelled', 'thread.run.expired'):
+            last_error = event.data.last_error
+            result['error'] = last_error.message if last_error else event.event
+
+    if 'completion_seconds' not in result and 'error' not in result:
+        result['error'] = 'stream ended before run completed'
+    return result
+
+
+def setup_stand_in_assistant(client):
+    """Create an assistant backed by a vector store with one file, so runs cite it"""
+    file_obj = client.files.create(
+        file=("46_cfr_109_fire_detection.txt", b"46 CFR 109.213 - Fire detection systems"),
+        purpose='assistants',
+    )
+    vector_store = client.beta.vector_stores.create(name="Benchmark", file_ids=[file_obj.id])
+    assistant = client.beta.assistants.create(
+        name="ArrowReg Benchmark Assistant",
+        model="gpt-4-turbo-preview",
+        tools=[{"type": "file_search"}],
+        tool_resources={"file_search": {"vector_store_ids": [vector_store.id]}},
+    )
+    return assistant.id
+
+
+def resolve_assistant_id(settings):
+    if settings.assistant_id:
+        return settings.assistant_id
+    if CONFIG_PATH.exists():
+        return load_openai_config()['assistant_id']
+    print("❌ No assistant ID found. Set OPENAI_ASSISTANT_ID or run setup-openai.py first.")
+    sys.exit(1)
+
+
+def run_benchmark(client, assistant_id, queries, concurrency):
+    """Replay queries with a pool of concurrent workers and collect results"""
+    results = []
+    lock = threading.Lock()
+
+    def worker(query):
+        try:
+            result = run_query(client, assistant_id, query)
+        except Exception as e:
+            result = {'query': query, 'error': str(e)}
+        with lock:
+            results.append(result)
+            done = len(results)
+        if done % max(1, len(queries) // 10) == 0:
+            print(f"   {done}/{len(queries)} queries complete")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, queries))
+    return results, time.perf_counter() - start
+
+
+def summarize_results(results, wall_seconds):
+    ok = [r for r in results if 'error' not in r]
+    return {
+        'queries': len(results),
+        'succeeded': len(ok),
+        'failed': len(results) - len(ok),
+        'wall_seconds': round(wall_seconds, 3),
+        'queries_per_second': round(len(ok) / wall_seconds, 3) if wall_seconds else None,
+        'thread_creation': latency_summary([r['thread_seconds'] for r in ok]),
+        'time_to_first_token': latency_summary([r['first_token_seconds'] for r in ok if 'first_token_seconds' in r]),
+        'total_completion': latency_summary([r['completion_seconds'] for r in ok]),
+        'citations': distribution_summary([r.get('citations', 0) for r in ok]),
+        'sample_errors': [r['error'] for r in results if 'error' in r][:5],
+    }
+
+
+def print_summary(summary):
+    print(f"\n📊 {summary['succeeded']}/{summary['queries']} queries, "
+          f"{summary['queries_per_second']} queries/s")
+    for label, key in (("Thread creation", 'thread_creation'),
+                       ("First token", 'time_to_first_token'),
+                       ("Total completion", 'total_completion')):
+        stats = summary[key]
+        if stats['count']:
+            print(f"   {label:<17} p50 {stats['p50_ms']:9.1f} ms  "
+                  f"p95 {stats['p95_ms']:9.1f} ms  p99 {stats['p99_ms']:9.1f} ms")
+    citations = summary['citations']
+    if citations['count']:
+        print(f"   {'Citations':<17} p50 {citations['p50']:>9}     "
+              f"p95 {citations['p95']:>9}     mean {citations['mean']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ArrowReg assistant under concurrent queries")
+    parser.add_argument('--queries', type=Path, default=DEFAULT_QUERIES, help="File with one query per line")
+    parser.add_argument('--concurrency', type=int, default=4, help="Concurrent threads/runs")
+    parser.add_argument('--repeat', type=int, default=1, help="Replay the query file this many times")
+    parser.add_argument('--assistant-id', default=None, help="Override the configured assistant")
+    parser.add_argument('--stand-in', action='store_true', help="Run against an in-process OpenAI stand-in")
+    parser.add_argument('--output', type=Path, default=None, help="Write the JSON report here")
+    openai_stand_in.add_config_arguments(parser)
+    args = parser.parse_args()
+
+    queries = load_queries(args.queries) * args.repeat
+    request_stats = RequestStats()
+    server = None
+
+    if args.stand_in:
+        server = openai_stand_in.start_server(openai_stand_in.config_from_args(args))
+        settings = ClientSettings(api_key="sk-stand-in", base_url=openai_stand_in.server_base_url(server))
+        print(f"🧪 Started OpenAI stand-in at {settings.base_url}")
+    else:
+        settings = load_settings()
+
+    client = create_client(settings, timing_hooks=[request_stats], max_connections=max(args.concurrency, 1))
+
+    if args.assistant_id:
+        assistant_id = args.assistant_id
+    elif args.stand_in:
+        assistant_id = setup_stand_in_assistant(client)
+    else:
+        assistant_id = resolve_assistant_id(settings)
+
+    print(f"🚀 Benchmarking {len(queries)} queries against {assistant_id} with concurrency {args.concurrency}")
+    results, wall_seconds = run_benchmark(client, assistant_id, queries, args.concurrency)
+    summary = summarize_results(results, wall_seconds)
+    print_summary(summary)
+
+    if args.output:
+        report = {
+            'generated_at': datetime.now().isoformat(),
+            'assistant_id': assistant_id,
+            'base_url': settings.base_url,
+            'concurrency': args.concurrency,
+            'summary': summary,
+            'requests': request_stats.summary(),
+            'results': results,
+        }
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"💾 Report written to {args.output}")
+
+    if server is not None:
+        server.shutdown()
+
+    return 0 if summary['failed'] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,13 +3,48 @@
 Setup new OpenAI Assistant for ArrowReg with proper citation and follow-up support
 """
 
-import os
 import sys
 import json
 from datetime import datetime
-from openai import OpenAI
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from api_client import create_client, load_settings, save_openai_config, update_dev_vars, CONFIG_PATH, DEV_VARS_PATH
+from openai_resources import (
+    MAX_ASSISTANT_VECTOR_STORES, UPDATED, find_matches, list_all, reconcile_assistant, resource_metadata
+)
+
+ASSISTANT_KEY = "assistant:maritime-compliance-v2"
+
+def resolve_vector_store_ids(settings):
+    """The vector store to link: VECTOR_STORE_IDS if it names exactly one, else the
+    assistant store recorded by setup-openai.py
+
+    The Assistants API links at most one vector store, so several candidates
+    without an explicit choice are an error rather than a guess.
+    """
+    if len(settings.vector_store_ids) > MAX_ASSISTANT_VECTOR_STORES:
+        raise ValueError(
+            f"VECTOR_STORE_IDS lists {len(settings.vector_store_ids)} stores but an assistant can link "
+            f"at most {MAX_ASSISTANT_VECTOR_STORES}; set it to the one the assistant should search"
+        )
+    if settings.vector_store_ids:
+        return settings.vector_store_ids
+    if CONFIG_PATH.exists():
+        with open(CONFIG_PATH, 'r') as f:
+            config = json.load(f)
+        if config.get('assistant_vector_store_id'):
+            return [config['assistant_vector_store_id']]
+        candidates = config.get('vector_store_ids') or [vs['id'] for vs in config.get('vector_stores', [])]
+        if len(candidates) > MAX_ASSISTANT_VECTOR_STORES:
+            raise ValueError(
+                f"{CONFIG_PATH} lists {len(candidates)} vector stores and no assistant_vector_store_id; "
+                f"re-run setup/setup-openai.py to create the merged store the assistant links"
+            )
+        return candidates
+    return []
+
 def create_optimized_assistant():
     """Create a new OpenAI assistant optimized for citations and follow-ups"""
     
@@ -17,24 +52,8 @@ def create_optimized_assistant():
     print("=" * 50)
     
     # Get API key from environment or .dev.vars
-    api_key = os.getenv('OPENAI_API_KEY')
-    
-    # Try to read from .dev.vars if not in environment
-    if not api_key:
-        try:
-            with open('../backend/.dev.vars', 'r') as f:
-                for line in f:
-                    if line.startswith('OPENAI_API_KEY='):
-                        api_key = line.split('=', 1)[1].strip()
-                        break
-        except FileNotFoundError:
-            pass
-    
-    if not api_key:
-        print("❌ OpenAI API key not found!")
-        sys.exit(1)
-    
-    client = OpenAI(api_key=api_key)
+    settings = load_settings()
+    client = create_client(settings)
     
     # Enhanced instructions for citations and follow-ups
     instructions = """You are ArrowReg, an expert maritime compliance assistant specializing in US Coast Guard regulations, with deep knowledge of 33 CFR (Navigation and Navigable Waters) and 46 CFR (Shipping).
@@ -77,44 +96,59 @@ When uncertain, explicitly state uncertainty and provide the most relevant secti
 Focus on practical compliance requirements and actionable guidance."""
 
     try:
-        # Create the new assistant
-        print("\n📚 Creating Assistant with enhanced citation support...")
-        assistant = client.beta.assistants.create(
-            name="ArrowReg Maritime Compliance Expert v2",
-            instructions=instructions,
-            model="gpt-4-turbo-preview",
-            tools=[{"type": "file_search"}],
-            temperature=0.3,
-            metadata={
+        vector_store_ids = resolve_vector_store_ids(settings)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    if not vector_store_ids:
+        print("❌ No vector store IDs found in VECTOR_STORE_IDS or config/openai_config.json")
+        print("   Run setup/setup-openai.py first to create the vector stores.")
+        sys.exit(1)
+    
+    try:
+        # Reuse the v2 assistant if it already exists, updating only what differs
+        print("\n📚 Reconciling Assistant with enhanced citation support...")
+        spec = {
+            "key": ASSISTANT_KEY,
+            "name": "ArrowReg Maritime Compliance Expert v2",
+            "instructions": instructions,
+            "model": "gpt-4-turbo-preview",
+            "tools": [{"type": "file_search"}],
+            "temperature": 0.3,
+            "tool_resources": {"file_search": {"vector_store_ids": vector_store_ids}},
+            "metadata": resource_metadata(ASSISTANT_KEY, {
                 "version": "2.0",
-                "created": datetime.now().isoformat(),
                 "features": "enhanced_citations,follow_up_support,ecfr_links"
-            }
-        )
-        
-        print(f"✅ New Assistant created: {assistant.id}")
-        
-        # Link existing vector store
-        existing_vector_store_id = "vs_68a7360da98481919be1e1308374589a"
-        
-        print(f"\n📂 Linking existing vector store: {existing_vector_store_id}")
-        
-        # Update assistant with vector store
-        client.beta.assistants.update(
-            assistant_id=assistant.id,
-            tool_resources={
-                "file_search": {
-                    "vector_store_ids": [existing_vector_store_id]
-                }
-            }
-        )
-        
-        print(f"✅ Vector store linked successfully")
+            })
+        }
+        existing = list_all(client.beta.assistants.list)
+        if not any(find_matches(existing, spec["key"], spec["name"])):
+            spec["metadata"]["created"] = datetime.now().isoformat()
+        assistant_id, action, changed, duplicates = reconcile_assistant(client, spec, existing)
+        
+        detail = f" [{', '.join(changed)}]" if action == UPDATED else ""
+        print(f"✅ Assistant {action}: {assistant_id}{detail}")
+        print(f"📂 Linked vector store: {', '.join(vector_store_ids)}")
+        if duplicates:
+            print(f"⚠️  Duplicate v2 assistants exist: {', '.join(d.id for d in duplicates)}")
+        
+        # Merge into the existing configuration: ingest-sample-data.py and
+        # setup-openai.py still need its vector_stores and other fields
+        config_path = CONFIG_PATH
+        old_config = {}
+        if config_path.exists():
+            with open(config_path, 'r') as f:
+                old_config = json.load(f)
+            backup_path = config_path.with_suffix('.json.backup')
+            print(f"\n📦 Backing up old config to: {backup_path}")
+            with open(backup_path, 'w') as f:
+                json.dump(old_config, f, indent=2)
         
-        # Save new configuration
         new_config = {
-            "assistant_id": assistant.id,
-            "vector_store_ids": [existing_vector_store_id],
+            **old_config,
+            "assistant_id": assistant_id,
+            "vector_store_ids": vector_store_ids,
+            "assistant_vector_store_id": vector_store_ids[0],
             "created_at": datetime.now().isoformat(),
             "version": "2.0",
             "features": {
@@ -125,39 +159,15 @@ Focus on practical compliance requirements and actionable guidance."""
             }
         }
         
-        # Backup old config
-        config_path = Path("config/openai_config.json")
-        if config_path.exists():
-            backup_path = config_path.with_suffix('.json.backup')
-            print(f"\n📦 Backing up old config to: {backup_path}")
-            with open(config_path, 'r') as f:
-                old_config = json.load(f)
-            with open(backup_path, 'w') as f:
-                json.dump(old_config, f, indent=2)
-        
         # Save new config
-        with open(config_path, 'w') as f:
-            json.dump(new_config, f, indent=2)
+        save_openai_config(new_config)
         
         print(f"\n💾 New configuration saved to: {config_path}")
         
         # Update .dev.vars
-        dev_vars_path = Path("backend/.dev.vars")
-        if dev_vars_path.exists():
+        if DEV_VARS_PATH.exists():
             print("\n📝 Updating .dev.vars with new assistant ID...")
-            
-            with open(dev_vars_path, 'r') as f:
-                lines = f.readlines()
-            
-            # Update the assistant ID line
-            for i, line in enumerate(lines):
-                if line.startswith('OPENAI_ASSISTANT_ID='):
-                    lines[i] = f'OPENAI_ASSISTANT_ID={assistant.id}\n'
-                    break
-            
-            with open(dev_vars_path, 'w') as f:
-                f.writelines(lines)
-            
+            update_dev_vars({'OPENAI_ASSISTANT_ID': assistant_id})
             print("✅ .dev.vars updated")
         
         # Test the assistant
@@ -176,7 +186,7 @@ Focus on practical compliance requirements and actionable guidance."""
         # Run the assistant
         run = client.beta.threads.runs.create(
             thread_id=thread.id,
-            assistant_id=assistant.id
+            assistant_id=assistant_id
         )
         
         print("✅ Test message sent successfully")
@@ -184,13 +194,13 @@ Focus on practical compliance requirements and actionable guidance."""
         print(f"   Run ID: {run.id}")
         
         print("\n" + "=" * 50)
-        print("🎉 SUCCESS! New assistant created and configured")
+        print(f"🎉 SUCCESS! Assistant {action} and configured")
         print("=" * 50)
         
         print("\n📋 SUMMARY:")
         print(f"   Old Assistant ID: asst_AHnxWKbaP2DiOAgUndkstHx3")
-        print(f"   New Assistant ID: {assistant.id}")
-        print(f"   Vector Store ID: {existing_vector_store_id}")
+        print(f"   New Assistant ID: {assistant_id}")
+        print(f"   Vector Store IDs: {', '.join(vector_store_ids)}")
         print(f"   Model: gpt-4-turbo-preview")
         print(f"   Temperature: 0.3")
         
@@ -5,25 +5,33 @@ Uploads sample regulation documents to OpenAI vector stores
 
 Usage:
     export OPENAI_API_KEY="sk-your-key-here"
-    python3 ingest-sample-data.py
+    python3 ingest-sample-data.py [--report reports/ingest.json | --report reports/ingest.csv]
+    python3 ingest-sample-data.py ../../data-local/ECFR-title46.md ../../data-local/ECFR-title33.md
+
+With document paths (e.g. the converted Markdown from data-local/), those
+files are uploaded instead of the built-in sample CFR documents.
+
+Per-file metrics (bytes, upload, attach and indexing times, retries) and
+aggregate percentiles and MB/s are written to the report at the end.
 """
 
-import os
+import argparse
+import csv
 import json
 import sys
 import time
+from datetime import datetime
 from pathlib import Path
-from openai import OpenAI
 
-def load_config():
-    """Load OpenAI configuration"""
-    config_file = Path("config/openai_config.json")
-    if not config_file.exists():
-        print("❌ OpenAI configuration not found. Run setup-openai.py first.")
-        sys.exit(1)
-    
-    with open(config_file, 'r') as f:
-        return json.load(f)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from api_client import REPO_ROOT, RetryCounter, create_client, load_openai_config, load_settings
+from perf_stats import latency_summary
+
+REPORT_FIELDS = [
+    'filename', 'file_id', 'vector_store', 'bytes', 'upload_seconds',
+    'attach_seconds', 'indexing_seconds', 'indexing_status', 'retries', 'error'
+]
 
 def create_sample_cfr_documents():
     """Create sample CFR document content for testing"""
@@ -152,44 +160,104 @@ def create_sample_cfr_documents():
     
     return created_files
 
-def upload_documents_to_vector_stores(client, config, document_files):
+def select_vector_store(filename, vector_stores):
+    """Pick the vector store name a document belongs in based on its filename"""
+    name = filename.lower()
+    if "46_cfr" in name or "title46" in name:
+        return "CFR Title 46 - Shipping"
+    elif "33_cfr" in name or "title33" in name:
+        return "CFR Title 33 - Navigation and Navigable Waters"
+    elif name.startswith("abs"):
+        return "ABS Rules and Guides"
+    else:
+        return list(vector_stores.keys())[0]  # Default to first store
+
+def upload_document(client, filename, payload, vector_stores, record=None, shared_store_id=None):
+    """Upload a single document and attach it to its vector store
+    
+    If shared_store_id is given (the merged store the assistant searches), the
+    file is attached there as well. If a record dict is given, upload and
+    attach timings are stored in it; attach_seconds covers both attaches.
+    """
+    record = record if record is not None else {}
+    
+    start = time.perf_counter()
+    file_obj = client.files.create(
+        file=(filename, payload),
+        purpose='assistants'
+    )
+    record['upload_seconds'] = time.perf_counter() - start
+    record['file_id'] = file_obj.id
+    
+    store_name = select_vector_store(filename, vector_stores)
+    if store_name not in vector_stores:
+        return file_obj, None
+    
+    # Add file to vector store
+    start = time.perf_counter()
+    client.beta.vector_stores.files.create(
+        vector_store_id=vector_stores[store_name],
+        file_id=file_obj.id
+    )
+    record['attached_at'] = time.perf_counter()
+    record['vector_store'] = store_name
+    record['vector_store_id'] = vector_stores[store_name]
+    
+    if shared_store_id and shared_store_id != vector_stores[store_name]:
+        client.beta.vector_stores.files.create(vector_store_id=shared_store_id, file_id=file_obj.id)
+    record['attach_seconds'] = time.perf_counter() - start
+    
+    return file_obj, store_name
+
+def wait_for_indexing(client, records, timeout=300, poll_interval=1.0):
+    """Poll attached files until indexing finishes, recording completion time per file"""
+    pending = [r for r in records if r.get('vector_store_id')]
+    deadline = time.perf_counter() + timeout
+    
+    while pending and time.perf_counter() < deadline:
+        still_pending = []
+        for record in pending:
+            vs_file = client.beta.vector_stores.files.retrieve(
+                vector_store_id=record['vector_store_id'],
+                file_id=record['file_id']
+            )
+            if vs_file.status == 'in_progress':
+                still_pending.append(record)
+            else:
+                record['indexing_status'] = vs_file.status
+                record['indexing_seconds'] = time.perf_counter() - record['attached_at']
+        pending = still_pending
+        if pending:
+            time.sleep(poll_interval)
+    
+    for record in pending:
+        record['indexing_status'] = 'timeout'
+
+def upload_documents_to_vector_stores(client, config, document_files, records=None, retry_counter=None):
     """Upload documents to appropriate vector stores"""
     print("📤 Uploading documents to vector stores...")
     
     vector_stores = {vs['name']: vs['id'] for vs in config['vector_stores']}
+    shared_store_id = config.get('assistant_vector_store_id')
     
     uploaded_files = []
     
     for doc_path in document_files:
+        record = {'filename': doc_path.name, 'bytes': doc_path.stat().st_size}
+        if records is not None:
+            records.append(record)
         try:
             print(f"   Uploading: {doc_path.name}")
             
-            # Upload file to OpenAI
+            # Upload file to OpenAI and add it to its vector store
             with open(doc_path, 'rb') as f:
-                file_obj = client.files.create(
-                    file=f,
-                    purpose='assistants'
+                file_obj, store_name = upload_document(
+                    client, doc_path.name, f.read(), vector_stores, record, shared_store_id
                 )
             
             print(f"   ✅ File uploaded: {file_obj.id}")
             
-            # Determine appropriate vector store based on filename
-            if "46_cfr" in doc_path.name:
-                store_name = "CFR Title 46 - Shipping"
-            elif "33_cfr" in doc_path.name:
-                store_name = "CFR Title 33 - Navigation and Navigable Waters"
-            else:
-                store_name = list(vector_stores.keys())[0]  # Default to first store
-            
-            if store_name in vector_stores:
-                store_id = vector_stores[store_name]
-                
-                # Add file to vector store
-                client.beta.vector_stores.files.create(
-                    vector_store_id=store_id,
-                    file_id=file_obj.id
-                )
-                
+            if store_name:
                 print(f"   ✅ Added to vector store: {store_name}")
                 uploaded_files.append({
                     'file_id': file_obj.id,
@@ -197,14 +265,56 @@ def upload_documents_to_vector_stores(client, config, document_files):
                     'vector_store': store_name
                 })
             
-            # Small delay to avoid rate limiting
-            time.sleep(1)
-            
         except Exception as e:
+            record['error'] = str(e)
             print(f"   ❌ Failed to upload {doc_path.name}: {str(e)}")
+        
+        finally:
+            if retry_counter is not None:
+                record['retries'] = retry_counter.take()
     
     return uploaded_files
 
+def summarize_ingest(records, wall_seconds):
+    """Aggregate per-file records into throughput and latency percentiles"""
+    uploaded = [r for r in records if 'upload_seconds' in r]
+    total_bytes = sum(r['bytes'] for r in uploaded)
+    upload_seconds = sum(r['upload_seconds'] for r in uploaded)
+    
+    return {
+        'files': len(records),
+        'uploaded': len(uploaded),
+        'failed': sum(1 for r in records if r.get('error')),
+        'total_bytes': total_bytes,
+        'wall_seconds': round(wall_seconds, 3),
+        'wall_mb_per_second': round(total_bytes / 1e6 / wall_seconds, 4) if wall_seconds else None,
+        'upload_mb_per_second': round(total_bytes / 1e6 / upload_seconds, 4) if upload_seconds else None,
+        'retries': sum(r.get('retries', 0) for r in records),
+        'upload': latency_summary([r['upload_seconds'] for r in uploaded]),
+        'attach': latency_summary([r['attach_seconds'] for r in uploaded if 'attach_seconds' in r]),
+        'indexing': latency_summary([r['indexing_seconds'] for r in records if 'indexing_seconds' in r]),
+    }
+
+def write_ingest_report(records, summary, report_path):
+    """Write per-file metrics and the aggregate summary as JSON or CSV"""
+    report_path = Path(report_path)
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    rows = [{field: record.get(field) for field in REPORT_FIELDS} for record in records]
+    
+    if report_path.suffix == '.csv':
+        with open(report_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        # CSV holds the per-file rows; aggregates go alongside as JSON
+        with open(report_path.with_suffix('.summary.json'), 'w') as f:
+            json.dump(summary, f, indent=2)
+    else:
+        with open(report_path, 'w') as f:
+            json.dump({'generated_at': datetime.now().isoformat(), 'summary': summary, 'files': rows}, f, indent=2)
+    
+    return report_path
+
 def test_assistant_query(client, assistant_id):
     """Test the assistant with a sample query"""
     print("🧪 Testing assistant with sample query...")
@@ -263,30 +373,56 @@ def test_assistant_query(client, assistant_id):
         return False
 
 def main():
+    parser = argparse.ArgumentParser(description="Upload sample regulation documents to OpenAI vector stores")
+    parser.add_argument('documents', nargs='*', type=Path,
+                        help="Files to upload (default: the built-in sample CFR documents)")
+    parser.add_argument('--report', type=Path,
+                        default=REPO_ROOT / 'reports' / f"ingest-{datetime.now():%Y%m%d-%H%M%S}.json",
+                        help="Per-file metrics report (.json or .csv)")
+    parser.add_argument('--indexing-timeout', type=float, default=300,
+                        help="Seconds to wait for vector store indexing to finish")
+    args = parser.parse_args()
+    missing = [str(path) for path in args.documents if not path.is_file()]
+    if missing:
+        parser.error(f"documents not found: {', '.join(missing)}")
+    
     print("📚 Ingesting sample regulation data...")
     
     # Check prerequisites
-    api_key = os.getenv('OPENAI_API_KEY')
-    if not api_key:
-        print("❌ Error: OPENAI_API_KEY environment variable not set")
-        sys.exit(1)
-    
-    client = OpenAI(api_key=api_key)
+    retry_counter = RetryCounter()
+    client = create_client(load_settings(), timing_hooks=[retry_counter])
     
     # Load configuration
-    config = load_config()
+    config = load_openai_config()
     print(f"✅ Loaded configuration for assistant: {config['assistant_id']}")
     
     try:
-        # Create sample documents
-        print("📝 Creating sample CFR documents...")
-        document_files = create_sample_cfr_documents()
+        if args.documents:
+            document_files = args.documents
+            print(f"📝 Uploading {len(document_files)} documents")
+        else:
+            # Create sample documents
+            print("📝 Creating sample CFR documents...")
+            document_files = create_sample_cfr_documents()
         
         # Upload documents to vector stores
-        uploaded_files = upload_documents_to_vector_stores(client, config, document_files)
+        records = []
+        start = time.perf_counter()
+        uploaded_files = upload_documents_to_vector_stores(client, config, document_files, records, retry_counter)
         
         print(f"\n✅ Successfully uploaded {len(uploaded_files)} documents")
         
+        # Wait for vector store indexing and report metrics
+        print("⏳ Waiting for vector store indexing...")
+        wait_for_indexing(client, records, timeout=args.indexing_timeout)
+        summary = summarize_ingest(records, time.perf_counter() - start)
+        report_path = write_ingest_report(records, summary, args.report)
+        
+        print(f"📊 {summary['uploaded']} files, {summary['total_bytes']:,} bytes, "
+              f"{summary['wall_mb_per_second']} MB/s, {summary['retries']} retries, "
+              f"indexing p95 {summary['indexing'].get('p95_ms')} ms")
+        print(f"💾 Ingest report written to {report_path}")
+        
         # Test assistant
         if test_assistant_query(client, config['assistant_id']):
             print("\n🎉 Sample data ingestion complete!")
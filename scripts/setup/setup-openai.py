@@ -3,16 +3,33 @@
 OpenAI Assistant Setup Script for ArrowReg
 Creates the AI assistant and vector stores for maritime compliance
 
+Re-running is cheap: by default existing vector stores and the assistant
+are matched by their `arrowreg_key` metadata (or name) and only created or
+updated where they differ from VECTOR_STORE_CONFIGS and the assistant spec.
+
+The Assistants API links at most one vector store to an assistant, so the
+assistant searches the store named by ASSISTANT_VECTOR_STORE_KEY (a merged
+store that ingest-sample-data.py attaches every document to); the topic
+stores stay available for per-source retrieval.
+
 Usage:
     export OPENAI_API_KEY="sk-your-key-here"
-    python3 setup-openai.py
+    python3 setup-openai.py [--mode reconcile|create] [--dry-run] [--prune]
 """
 
-import os
-import json
+import argparse
 import sys
 from pathlib import Path
-from openai import OpenAI
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from api_client import create_client, load_settings, save_openai_config, update_dev_vars, DEV_VARS_PATH
+from openai_resources import (
+    CREATED, UNCHANGED, UPDATED, list_all, prune, reconcile_assistant, reconcile_vector_store, resource_metadata,
+    validate_assistant_spec
+)
+
+ACTION_ICONS = {CREATED: "✅", UPDATED: "🔄", UNCHANGED: "✔️ "}
 
 # Configuration
 ASSISTANT_NAME = "ArrowReg Maritime Compliance Assistant"
@@ -36,42 +53,88 @@ Guidelines:
 - Stay current with regulatory updates
 """
 
+ASSISTANT_KEY = "assistant:maritime-compliance"
+ASSISTANT_MODEL = "gpt-4-turbo-preview"
+ASSISTANT_TEMPERATURE = 0.1  # Lower temperature for more factual responses
+ASSISTANT_TOOLS = [
+    {"type": "file_search"},
+    {
+        "type": "function",
+        "function": {
+            "name": "get_weather_conditions",
+            "description": "Get current maritime weather conditions for regulatory context",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "latitude": {"type": "number", "description": "Latitude coordinate"},
+                    "longitude": {"type": "number", "description": "Longitude coordinate"},
+                    "vessel_type": {"type": "string", "description": "Type of vessel (OSV, tanker, cargo, etc.)"}
+                },
+                "required": ["latitude", "longitude"]
+            }
+        }
+    }
+]
+
 VECTOR_STORE_CONFIGS = [
     {
+        "key": "vector_store:cfr-title-33",
         "name": "CFR Title 33 - Navigation and Navigable Waters",
-        "description": "Complete CFR Title 33 covering navigation rules, port regulations, and environmental compliance",
-        "file_search": True
+        "description": "Complete CFR Title 33 covering navigation rules, port regulations, and environmental compliance"
     },
     {
+        "key": "vector_store:cfr-title-46",
         "name": "CFR Title 46 - Shipping", 
-        "description": "Complete CFR Title 46 covering vessel construction, equipment, manning, and operation",
-        "file_search": True
+        "description": "Complete CFR Title 46 covering vessel construction, equipment, manning, and operation"
     },
     {
+        "key": "vector_store:abs-rules",
         "name": "ABS Rules and Guides",
-        "description": "American Bureau of Shipping classification rules and guidance notes",
-        "file_search": True
+        "description": "American Bureau of Shipping classification rules and guidance notes"
     },
     {
+        "key": "vector_store:nvic-safety-alerts",
         "name": "NVIC and Maritime Safety Alerts",
-        "description": "Navigation and Vessel Inspection Circulars and safety alerts",
-        "file_search": True
+        "description": "Navigation and Vessel Inspection Circulars and safety alerts"
+    },
+    {
+        "key": "vector_store:all-regulations",
+        "name": "ArrowReg Maritime Regulations",
+        "description": "Every ingested regulation document; the store linked to the assistant"
     }
 ]
 
-def check_api_key():
-    """Verify OpenAI API key is available"""
-    api_key = os.getenv('OPENAI_API_KEY')
-    if not api_key:
-        print("❌ Error: OPENAI_API_KEY environment variable not set")
-        print("Please set your API key: export OPENAI_API_KEY='sk-your-key-here'")
-        sys.exit(1)
-    
-    if not api_key.startswith('sk-'):
-        print("❌ Error: Invalid OpenAI API key format")
-        sys.exit(1)
-    
-    return api_key
+# The one vector store the assistant searches (must be a VECTOR_STORE_CONFIGS key)
+ASSISTANT_VECTOR_STORE_KEY = "vector_store:all-regulations"
+
+def vector_store_spec(config):
+    """Desired state of a vector store from its VECTOR_STORE_CONFIGS entry"""
+    return {
+        "key": config['key'],
+        "name": config['name'],
+        "metadata": resource_metadata(config['key'], {"description": config['description']})
+    }
+
+def assistant_vector_store(vector_stores):
+    """The entry of vector_stores linked to the assistant, or None if it wasn't set up"""
+    name = next(c['name'] for c in VECTOR_STORE_CONFIGS if c['key'] == ASSISTANT_VECTOR_STORE_KEY)
+    return next((vs for vs in vector_stores if vs['name'] == name), None)
+
+def assistant_spec(vector_store_ids):
+    """Desired state of the maritime compliance assistant (at most one vector store)"""
+    spec = {
+        "key": ASSISTANT_KEY,
+        "name": ASSISTANT_NAME,
+        "instructions": ASSISTANT_INSTRUCTIONS,
+        "model": ASSISTANT_MODEL,
+        "tools": ASSISTANT_TOOLS,
+        "temperature": ASSISTANT_TEMPERATURE,
+        "metadata": resource_metadata(ASSISTANT_KEY)
+    }
+    if vector_store_ids:
+        spec["tool_resources"] = {"file_search": {"vector_store_ids": vector_store_ids}}
+    validate_assistant_spec(spec)
+    return spec
 
 def create_vector_stores(client):
     """Create vector stores for different regulation types"""
@@ -82,9 +145,10 @@ def create_vector_stores(client):
         try:
             print(f"   Creating: {config['name']}")
             
+            spec = vector_store_spec(config)
             vector_store = client.beta.vector_stores.create(
-                name=config['name'],
-                file_search=config.get('file_search', True)
+                name=spec['name'],
+                metadata=spec['metadata']
             )
             
             vector_stores.append({
@@ -100,141 +164,166 @@ def create_vector_stores(client):
     
     return vector_stores
 
+def reconcile_vector_stores(client, dry_run=False, prune_duplicates=False):
+    """Match existing vector stores to VECTOR_STORE_CONFIGS, creating or updating only what differs"""
+    print("📚 Reconciling vector stores...")
+    existing = list_all(client.beta.vector_stores.list)
+    print(f"   Found {len(existing)} existing vector stores")
+    vector_stores = []
+    
+    for config in VECTOR_STORE_CONFIGS:
+        try:
+            store_id, action, duplicates = reconcile_vector_store(
+                client, vector_store_spec(config), existing, dry_run=dry_run
+            )
+            print(f"   {ACTION_ICONS[action]} {action.capitalize()}: {config['name']} ({store_id or 'pending'})")
+            
+            if duplicates:
+                ids = ', '.join(d.id for d in duplicates)
+                if prune_duplicates:
+                    deleted = prune(client, duplicates, "vector_store", dry_run=dry_run)
+                    verb = "Would prune" if dry_run else "Pruned"
+                    print(f"   🗑️  {verb} {len(deleted)} duplicate(s): {ids}")
+                else:
+                    print(f"   ⚠️  Duplicates left in place (use --prune): {ids}")
+            
+            if store_id:
+                vector_stores.append({
+                    'id': store_id,
+                    'name': config['name'],
+                    'description': config['description'],
+                    'action': action
+                })
+            
+        except Exception as e:
+            print(f"   ❌ Failed to reconcile {config['name']}: {str(e)}")
+    
+    return vector_stores
+
 def create_assistant(client, vector_store_ids):
     """Create the maritime compliance assistant"""
     print("🤖 Creating OpenAI assistant...")
     
     try:
-        # Prepare tools
-        tools = [
-            {"type": "file_search"},
-            {
-                "type": "function",
-                "function": {
-                    "name": "get_weather_conditions",
-                    "description": "Get current maritime weather conditions for regulatory context",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "latitude": {"type": "number", "description": "Latitude coordinate"},
-                            "longitude": {"type": "number", "description": "Longitude coordinate"},
-                            "vessel_type": {"type": "string", "description": "Type of vessel (OSV, tanker, cargo, etc.)"}
-                        },
-                        "required": ["latitude", "longitude"]
-                    }
-                }
-            }
-        ]
+        fields = {k: v for k, v in assistant_spec(vector_store_ids).items() if k != 'key'}
+        assistant = client.beta.assistants.create(**fields)
         
-        # Create tool resources
-        tool_resources = {}
-        if vector_store_ids:
-            tool_resources["file_search"] = {
-                "vector_store_ids": vector_store_ids
-            }
+        print(f"✅ Created assistant: {assistant.id}")
+        return assistant.id
         
-        assistant = client.beta.assistants.create(
-            name=ASSISTANT_NAME,
-            instructions=ASSISTANT_INSTRUCTIONS,
-            model="gpt-4-turbo-preview",
-            tools=tools,
-            tool_resources=tool_resources,
-            temperature=0.1  # Lower temperature for more factual responses
+    except Exception as e:
+        print(f"❌ Failed to create assistant: {str(e)}")
+        return None
+
+def reconcile_maritime_assistant(client, vector_store_ids, dry_run=False, prune_duplicates=False):
+    """Update the existing maritime assistant in place, creating it only if missing"""
+    print("🤖 Reconciling OpenAI assistant...")
+    
+    try:
+        existing = list_all(client.beta.assistants.list)
+        assistant_id, action, changed, duplicates = reconcile_assistant(
+            client, assistant_spec(vector_store_ids), existing, dry_run=dry_run
         )
+        detail = f" [{', '.join(changed)}]" if action == UPDATED else ""
+        print(f"{ACTION_ICONS[action]} {action.capitalize()} assistant: {assistant_id or 'pending'}{detail}")
         
-        print(f"✅ Created assistant: {assistant.id}")
-        return assistant
+        if duplicates:
+            ids = ', '.join(d.id for d in duplicates)
+            if prune_duplicates:
+                deleted = prune(client, duplicates, "assistant", dry_run=dry_run)
+                verb = "Would prune" if dry_run else "Pruned"
+                print(f"🗑️  {verb} {len(deleted)} duplicate assistant(s): {ids}")
+            else:
+                print(f"⚠️  Duplicate assistants left in place (use --prune): {ids}")
+        
+        return assistant_id
         
     except Exception as e:
-        print(f"❌ Failed to create assistant: {str(e)}")
+        print(f"❌ Failed to reconcile assistant: {str(e)}")
         return None
 
 def save_configuration(assistant_id, vector_stores):
     """Save configuration to files"""
     print("💾 Saving configuration...")
     
-    # Create config directory
-    config_dir = Path("config")
-    config_dir.mkdir(exist_ok=True)
+    linked = assistant_vector_store(vector_stores)
     
     # Save OpenAI configuration
     config = {
         "assistant_id": assistant_id,
         "vector_stores": vector_stores,
+        "assistant_vector_store_id": linked['id'] if linked else None,
         "created_at": str(Path(__file__).stat().st_mtime),
-        "model": "gpt-4-turbo-preview"
+        "model": ASSISTANT_MODEL
     }
     
-    config_file = config_dir / "openai_config.json"
-    with open(config_file, 'w') as f:
-        json.dump(config, f, indent=2)
-    
+    config_file = save_openai_config(config)
     print(f"✅ Saved configuration to {config_file}")
     
     # Update backend .dev.vars
-    backend_dir = Path("backend")
-    if backend_dir.exists():
-        dev_vars_file = backend_dir / ".dev.vars"
-        
-        # Read existing vars
-        existing_vars = {}
-        if dev_vars_file.exists():
-            with open(dev_vars_file, 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith('#') and '=' in line:
-                        key, value = line.split('=', 1)
-                        existing_vars[key] = value
-        
-        # Update with new values
-        existing_vars['OPENAI_ASSISTANT_ID'] = assistant_id
-        existing_vars['VECTOR_STORE_IDS'] = ','.join([vs['id'] for vs in vector_stores])
-        
-        # Write updated vars
-        with open(dev_vars_file, 'w') as f:
-            f.write("# ArrowReg Backend Development Environment\n")
-            f.write("# This file contains development environment variables for Cloudflare Workers\n\n")
-            
-            for key, value in existing_vars.items():
-                f.write(f"{key}={value}\n")
-        
-        print(f"✅ Updated {dev_vars_file}")
+    if DEV_VARS_PATH.parent.exists():
+        update_dev_vars({
+            'OPENAI_ASSISTANT_ID': assistant_id,
+            'VECTOR_STORE_IDS': linked['id'] if linked else ''
+        })
+        print(f"✅ Updated {DEV_VARS_PATH}")
     
     return config
 
 def main():
+    parser = argparse.ArgumentParser(description="Set up OpenAI vector stores and assistant for ArrowReg")
+    parser.add_argument('--mode', choices=['reconcile', 'create'], default='reconcile',
+                        help="reconcile existing resources (default) or always create new ones")
+    parser.add_argument('--dry-run', action='store_true', help="Show what reconcile would change without changing it")
+    parser.add_argument('--prune', action='store_true', help="Delete duplicate resources previously created by setup")
+    args = parser.parse_args()
+    
     print("🚀 Setting up OpenAI for ArrowReg...")
     
     # Check prerequisites
-    api_key = check_api_key()
-    client = OpenAI(api_key=api_key)
+    client = create_client(load_settings())
     
     try:
-        # Test API connection
-        print("🔌 Testing OpenAI API connection...")
-        models = client.models.list()
-        print("✅ OpenAI API connection successful")
-        
-        # Create vector stores
-        vector_stores = create_vector_stores(client)
+        if args.mode == 'create':
+            # Test API connection
+            print("🔌 Testing OpenAI API connection...")
+            models = client.models.list()
+            print("✅ OpenAI API connection successful")
+            
+            vector_stores = create_vector_stores(client)
+        else:
+            # Listing the vector stores doubles as the connection test
+            vector_stores = reconcile_vector_stores(client, dry_run=args.dry_run, prune_duplicates=args.prune)
         
         if not vector_stores:
-            print("⚠️  No vector stores created, but continuing with assistant...")
+            print("⚠️  No vector stores available, but continuing with assistant...")
+        
+        linked = assistant_vector_store(vector_stores)
+        if not linked:
+            print("⚠️  The assistant's vector store is unavailable; it will be set up without file search data")
+        vector_store_ids = [linked['id']] if linked else []
+        if args.mode == 'create':
+            assistant_id = create_assistant(client, vector_store_ids)
+        else:
+            assistant_id = reconcile_maritime_assistant(
+                client, vector_store_ids, dry_run=args.dry_run, prune_duplicates=args.prune
+            )
         
-        # Create assistant
-        vector_store_ids = [vs['id'] for vs in vector_stores]
-        assistant = create_assistant(client, vector_store_ids)
+        if args.dry_run:
+            print("\n🔍 Dry run complete; no resources or configuration were changed")
+            return None
         
-        if not assistant:
-            print("❌ Failed to create assistant")
+        if not assistant_id:
+            print("❌ Failed to set up assistant")
             sys.exit(1)
         
         # Save configuration
-        config = save_configuration(assistant.id, vector_stores)
+        config = save_configuration(assistant_id, vector_stores)
         
         print("\n🎉 OpenAI setup complete!")
-        print(f"   Assistant ID: {assistant.id}")
+        print(f"   Assistant ID: {assistant_id}")
         print(f"   Vector Stores: {len(vector_stores)}")
+        print(f"   Assistant searches: {config['assistant_vector_store_id'] or 'no vector store'}")
         print(f"   Config saved: config/openai_config.json")
         
         print("\n📋 Next steps:")